@@ -1,16 +1,21 @@
 import streamlit as st
-import os, shutil, threading, hashlib, re, difflib
+import os, shutil, threading, hashlib, re, difflib, sqlite3
+import ctypes, ctypes.util, select, struct, sys, collections, queue, random, fnmatch
 from datetime import datetime
+from stat import S_ISREG
 from string import ascii_uppercase
 from send2trash import send2trash
+from transfer import move_file, TransferCancelled
 import time
 import concurrent.futures
-
-#for text to voice 
-import pyttsx3
+import heapq, itertools, json, uuid, tempfile
+from array import array
 
 # to recognize voice
 import speech_recognition as sr
+from tts import SpeechWorker, NORMAL, URGENT
+from intents import parse as parse_command, extensions_for
+from speech import CalibrationProfile, CaptureService, get_backend, listen, open_input_device
 
 st.set_page_config(
     page_title="Echo File Assistant Pro",
@@ -118,70 +123,109 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # voice part 
+# fixed confirmations, pre-rendered to disk so they play instantly
+SPOKEN_PHRASES = [
+    "File uploaded successfully!", "Upload failed!", "File not found.",
+    "File moved to recycle bin successfully!", "Found file. What is the new name?",
+    "File renamed successfully!", "Rename failed!", "No files found to sort", "No duplicate files found",
+]
+
 @st.cache_resource
-def get_voice_engine():
-    """Cached voice engine for better performance"""
-    try:
-        engine = pyttsx3.init()
-        engine.setProperty('rate', 160) 
-        engine.setProperty('volume', 1.0)
-        
-        voices = engine.getProperty('voices')
-        for voice in voices:
-            if "en-us" in voice.id.lower() or "english" in voice.name.lower():
-                engine.setProperty('voice', voice.id)
-                break
-        return engine
-    except Exception:
-        return None
+def get_speech_worker():
+    """One TTS thread for the whole app, so speak() never holds up a rerun"""
+    return SpeechWorker(phrases=SPOKEN_PHRASES)
 
-def speak(text: str):
-    """Enhanced TTS with better error handling"""
+def speak(text: str, priority=NORMAL, interrupt=False):
+    """Queue text for the TTS worker and return straight away"""
     try:
-        engine = get_voice_engine()
-        if engine:
-            engine.say(text)
-            engine.runAndWait()
+        get_speech_worker().say(text, priority=priority, interrupt=interrupt)
     except Exception:
         pass 
 
+@st.cache_resource
+def get_speech_backend():
+    """Offline streaming recognizer when a Vosk model is installed, Google otherwise"""
+    return get_backend()
+
+@st.cache_resource
+def get_voice_profile():
+    """Saved noise calibration, shared by every session"""
+    return CalibrationProfile()
+
 def listen_once(timeout=5, phrase_time_limit=8):
     """Enhanced speech recognition with better feedback"""
-    recognizer = sr.Recognizer()
+    backend = get_speech_backend()
+    status_container = st.empty()
+    # user bolne wala hai - jo bhi bol rahe the woh band, warna mic khud ki awaaz sunega
+    try:
+        get_speech_worker().interrupt()
+    except Exception:
+        pass
     
-    with sr.Microphone() as source:
-        recognizer.adjust_for_ambient_noise(source, duration=0.5)
-        
-        status_container = st.empty()
+    profile = get_voice_profile()
+    capture_service = get_capture_service()
+    
+    def show_partial(text):
+        if text:
+            status_container.info(f"🎤 {text}...")
+    
+    def capture():
         status_container.info("🎤 Listening... Speak now!")
-        
-        try:
-            audio = recognizer.listen(
-                source, 
-                timeout=timeout, 
-                phrase_time_limit=phrase_time_limit
+        if capture_service.running:
+            # mic pehle se khula hai - ring buffer se shuru ke syllables bhi mil jaate hain
+            return capture_service.next_utterance(timeout=timeout + phrase_time_limit)
+        with open_input_device() as source:
+            # pehli baar hi 0.5s ka calibration, uske baad profile khud adjust hota rehta hai
+            if not profile.calibrated:
+                profile.calibrate(source, duration=0.5)
+            return listen(
+                source, backend,
+                timeout=timeout,
+                phrase_time_limit=phrase_time_limit,
+                profile=profile,
+                on_partial=show_partial
             )
-            status_container.info("🔄 Processing speech...")
+    
+    try:
+        text = capture()
+        status_container.empty()
+        return text.strip()
             
-            text = recognizer.recognize_google(audio, language="en-IN")
-            status_container.empty()
-            return text.strip()
-                
-        except sr.WaitTimeoutError:
-            status_container.warning("⏰ Listening timeout.")
-            time.sleep(1)
-            status_container.empty()
-            return None
-        except sr.UnknownValueError:
-            status_container.warning("❌ Could not understand audio.")
-            time.sleep(1)
-            status_container.empty()
-            return None
-        except Exception as e:
-            status_container.error(f"🎤 Error: {e}")
-            time.sleep(1)
-            status_container.empty()
-            return None
+    except sr.WaitTimeoutError:
+        status_container.warning("⏰ Listening timeout.")
+        time.sleep(1)
+        status_container.empty()
+        return None
+    except sr.UnknownValueError:
+        status_container.warning("❌ Could not understand audio.")
+        time.sleep(1)
+        status_container.empty()
+        return None
+    except Exception as e:
+        status_container.error(f"🎤 Error: {e}")
+        time.sleep(1)
+        status_container.empty()
+        return None
+
+@st.cache_resource
+def get_capture_service():
+    """Always-on mic + wake word, only started from the sidebar toggle"""
+    return CaptureService(get_speech_backend(), get_voice_profile())
+
+@st.fragment(run_every=0.5)
+def poll_voice_commands():
+    """Picks up wake-word commands from the capture service and runs them"""
+    service = get_capture_service()
+    if service.error:
+        st.caption(f"🎧 Capture stopped: {service.error}")
+        return
+    heard = service.take_commands(current_session_id())
+    if not heard:
+        return
+    for command in heard:
+        st.session_state.wake_command = command
+        st.session_state.wake_result = process_global_voice_command(command)
+    st.rerun()
 
 # file operations 
 def get_full_path(folder_name: str):
@@ -208,207 +252,2983 @@ def get_full_path(folder_name: str):
     guess = os.path.join(home, folder_name)
     return guess if os.path.exists(guess) else None
 
-def find_file_deep(filename: str, max_results=1):
-    """Robust deep search across all available drives with fuzzy matching fallback."""
-    if not filename:
-        return []
-    
-    drives = [f"{d}:\\" for d in ascii_uppercase if os.path.exists(f"{d}:\\")]
-    found_files = []
-    target_lower = filename.lower()
-    
-    home = os.path.expanduser("~")
-    priority_dirs = [
-        os.path.join(home, "Desktop"),
-        os.path.join(home, "Downloads"),
-        os.path.join(home, "Documents"),
-        os.path.join(home, "Pictures"),
-        os.path.join(home, "Music"),
-        os.path.join(home, "Videos")
-    ]
+APP_DATA_DIR = os.path.join(os.path.expanduser("~"), ".echo_file_assistant")
+
+def get_priority_dirs():
+    """Home folders that are searched first (and indexed) for every lookup"""
+    home = os.path.expanduser("~")
+    return [
+        os.path.join(home, "Desktop"),
+        os.path.join(home, "Downloads"),
+        os.path.join(home, "Documents"),
+        os.path.join(home, "Pictures"),
+        os.path.join(home, "Music"),
+        os.path.join(home, "Videos")
+    ]
+
+# parallel scanner
+SCAN_WORKERS = min(16, (os.cpu_count() or 2) * 2)
+# listed directories a scan may have waiting for its consumer before its walkers pause
+SCAN_BACKLOG = 1024
+
+class ScanCancelled(Exception):
+    """Raised by long operations when their stop_event is set"""
+
+class _ScanState:
+    """
+    Shared state of one parallel walk. Every walker thread of the pool owns a
+    deque of pending directories: it pops its own newest work (depth first,
+    warm dentries) and steals the oldest entries of other deques when it runs
+    dry, which are the shallowest and therefore the biggest subtrees.
+    """
+
+    def __init__(self, roots, slots, limit, with_stat, cancel=None, prune=None, max_depth=None):
+        # pending work items are (path, depth, device or None)
+        self.deques = [collections.deque() for _ in range(slots)]
+        for i, root in enumerate(roots):
+            self.deques[i % slots].append(root)
+        self.outstanding = len(roots)
+        self.limit = limit
+        self.active = 0
+        self.with_stat = with_stat
+        self.prune = prune
+        self.max_depth = max_depth
+        self.lock = threading.Lock()
+        self.results = queue.Queue()
+        self.stop = threading.Event()
+        self.cancel = cancel
+        self.on_work = None
+
+    def stopped(self):
+        return self.stop.is_set() or (self.cancel is not None and self.cancel.is_set())
+
+    def steal(self, me):
+        count = len(self.deques)
+        start = random.randrange(count)
+        for i in range(count):
+            victim = (start + i) % count
+            if victim == me:
+                continue
+            try:
+                return self.deques[victim].popleft()
+            except IndexError:
+                continue
+        return None
+
+    def take(self, me, share):
+        """Next directory for walker me, None when this scan has its share of walkers or nothing to do"""
+        with self.lock:
+            # consumer peeche hai to naya kaam nahi - results queue bounded rehti hai
+            if self.active >= min(self.limit, share) or self.results.qsize() >= SCAN_BACKLOG:
+                return None
+            try:
+                item = self.deques[me].pop()
+            except IndexError:
+                item = self.steal(me)
+            if item is not None:
+                self.active += 1
+            return item
+
+    def emit(self, item):
+        if not self.stopped():
+            self.results.put(item)
+
+    def scan_dir(self, item, own):
+        path, depth, device = item
+        subdirs, files, descend = [], [], []
+        can_descend = self.max_depth is None or depth < self.max_depth
+        listed = True
+        try:
+            with os.scandir(path) as it:
+                for n, entry in enumerate(it):
+                    # huge directories check the stop signal while listing too
+                    if n % 1024 == 1023 and self.stopped():
+                        break
+                    try:
+                        if entry.is_dir():
+                            # excluded dirs are dropped before anyone descends into them
+                            if self.prune is not None and self.prune(entry):
+                                continue
+                            subdirs.append(entry)
+                            if not can_descend or entry.is_symlink():
+                                continue
+                            if device is not None and entry.stat(follow_symlinks=False).st_dev != device:
+                                continue  # another mount, scanned as its own root if at all
+                            descend.append((entry.path, depth + 1, device))
+                        else:
+                            if self.with_stat:
+                                entry.stat()  # cached on the DirEntry for the consumer
+                            files.append(entry)
+                    except OSError:
+                        continue
+        except OSError:
+            listed = False
+
+        # children count ho jayein pehle, tabhi koi unhe steal kar sake
+        if descend:
+            with self.lock:
+                self.outstanding += len(descend)
+                own.extend(descend)
+        # result emit hone ke baad hi yeh directory done ginti hai,
+        # warna koi aur walker None sentinel pehle bhej sakta hai
+        if listed:
+            self.emit((path, subdirs, files))
+        with self.lock:
+            self.active -= 1
+            self.outstanding -= 1
+            finished = self.outstanding == 0
+        if finished:
+            self.emit(None)
+        elif descend and self.on_work is not None:
+            self.on_work()
+
+class WalkerPool:
+    """
+    Fixed set of walker threads shared by every scan in the process, so the
+    disk never sees more than `size` of them. Walkers take one directory at
+    a time, round-robin over the attached scans, and a scan never holds more
+    than its fair share (size / attached scans) - a long or stalled walk
+    cannot starve a scan that starts after it.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.scans = collections.deque()
+        self.closed = False
+        for me in range(size):
+            threading.Thread(target=self._run, args=(me,), name=f"scan_{me}", daemon=True).start()
+
+    def attach(self, state):
+        state.on_work = self.notify
+        with self.lock:
+            self.scans.append(state)
+            self.wake.notify_all()
+
+    def detach(self, state):
+        with self.lock:
+            try:
+                self.scans.remove(state)
+            except ValueError:
+                pass
+
+    def notify(self):
+        with self.lock:
+            self.wake.notify_all()
+
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            self.wake.notify_all()
+
+    def _pick(self, me):
+        for state in [s for s in self.scans if s.stopped()]:
+            self.scans.remove(state)
+        share = max(1, self.size // len(self.scans)) if self.scans else 0
+        for _ in range(len(self.scans)):
+            state = self.scans[0]
+            self.scans.rotate(-1)
+            item = state.take(me, share)
+            if item is not None:
+                return state, item
+        return None
+
+    def _run(self, me):
+        while True:
+            with self.lock:
+                picked = None
+                while not self.closed:
+                    picked = self._pick(me)
+                    if picked is not None:
+                        break
+                    # poll bhi, taaki consumer ke drain karne pe backlog wale scans phir chalein
+                    self.wake.wait(0.05)
+                if picked is None:
+                    return
+            state, item = picked
+            state.scan_dir(item, state.deques[me])
+
+@st.cache_resource
+def get_walker_pool():
+    """One walker pool per server process"""
+    return WalkerPool(SCAN_WORKERS)
+
+def scan_tree(roots, workers=None, with_stat=False, stop_event=None, deadline=None,
+              prune=None, max_depth=None, one_filesystem=False):
+    """
+    Parallel replacement for os.walk over one or more roots.
+    Yields (dirpath, subdir_entries, file_entries) as soon as each directory is
+    listed; entries are os.DirEntry objects so stat data is reused. With
+    with_stat=True the workers also stat every file, so consumers never block
+    on it. Directory order is not deterministic.
+
+    The walk stops early when the generator is closed, when stop_event is set
+    or when time.monotonic() passes deadline - callers compare the deadline
+    afterwards to know whether they got everything.
+
+    prune(dir_entry) -> True removes a directory before it is descended (and
+    from the yielded subdirs), max_depth limits how deep below each root the
+    walk goes and one_filesystem keeps every root on its own device.
+
+    The walk runs on the shared walker pool, using at most `workers` of its
+    threads and fewer while other scans are attached to it.
+    """
+    if isinstance(roots, (str, bytes, os.PathLike)):
+        roots = [roots]
+    items = []
+    for root in roots:
+        root = os.fspath(root)
+        device = None
+        if one_filesystem:
+            try:
+                device = os.stat(root).st_dev
+            except OSError:
+                continue
+        items.append((root, 0, device))
+    if not items:
+        return
+    pool = get_walker_pool()
+    workers = max(1, min(workers or pool.size, pool.size))
+    state = _ScanState(items, pool.size, workers, with_stat, cancel=stop_event, prune=prune, max_depth=max_depth)
+    pool.attach(state)
+    try:
+        while not state.stopped():
+            try:
+                item = state.results.get(timeout=0.1)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                continue
+            if item is None:
+                return
+            yield item
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+    finally:
+        state.stop.set()
+        pool.detach(state)
+
+# scan coordination across sessions
+SCAN_JOB_SLOTS = 4
+# how often a caller waiting on a shared scan checks its own stop_event
+SCAN_POLL_SECONDS = 0.1
+
+def current_session_id():
+    """Streamlit session of the calling thread, None outside a script run"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return ctx.session_id if ctx else None
+
+class _SharedScan:
+    """One in-flight coordinator job plus the callers waiting on it"""
+
+    def __init__(self, session):
+        self.session = session
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.waiters = {}
+        self.tokens = itertools.count()
+        # jo job abhi tak bana chuka hai, e.g. the growing snapshot
+        self.latest = None
+
+    def attach(self, progress):
+        with self.lock:
+            token = next(self.tokens)
+            self.waiters[token] = progress
+            return token
+
+    def detach(self, token):
+        """Number of callers still waiting"""
+        with self.lock:
+            self.waiters.pop(token, None)
+            return len(self.waiters)
+
+    def progress(self, **info):
+        """Progress callback for the job, fanned out to every waiter"""
+        with self.lock:
+            callbacks = [cb for cb in self.waiters.values() if cb]
+        for cb in callbacks:
+            cb(**info)
+
+class ScanCoordinator:
+    """
+    Process-wide gate for heavy scans. Identical requests (same key) that
+    overlap share one in-flight job, at most `slots` jobs run at a time and
+    queued jobs are started round-robin per session, so one busy browser tab
+    cannot starve the others. The jobs' walkers all share get_walker_pool(),
+    which is what bounds the disk I/O.
+    """
+
+    def __init__(self, slots=SCAN_JOB_SLOTS):
+        self.slots = slots
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.shared = {}
+        self.queues = collections.OrderedDict()
+        self.running = 0
+        self.coalesced = 0
+        self.local = threading.local()
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=slots, thread_name_prefix="scan-job")
+
+    def submit(self, key, fn, session=None):
+        """Future for fn(), shared with any identical request already running"""
+        with self.lock:
+            return self._submit_locked(key, fn, session)
+
+    def _submit_locked(self, key, fn, session):
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return future
+        future = concurrent.futures.Future()
+        self.inflight[key] = future
+        self.queues.setdefault(session, collections.deque()).append((key, fn, future))
+        self._dispatch_locked()
+        return future
+
+    def run(self, key, fn, session=None, timeout=None):
+        """
+        fn() through the gate. timeout bounds the wait for a free slot - a job
+        still queued when it runs out is dropped (unless someone else waits
+        on it too) and TimeoutError raised; once started it runs to the end.
+        """
+        return self.join(key, lambda shared: fn(), session=session, timeout=timeout)
+
+    def join(self, key, fn, stop_event=None, progress=None, session=None, timeout=None):
+        """iter_join() for callers that just want the result"""
+        stream = self.iter_join(key, fn, stop_event, progress, session, timeout)
+        while True:
+            try:
+                next(stream)
+            except StopIteration as done:
+                return done.value
+
+    def iter_join(self, key, fn, stop_event=None, progress=None, session=None, timeout=None):
+        """
+        Like run(), but every caller keeps its own stop_event and progress on
+        top of the one shared job. fn(shared) gets shared.stop, which is only
+        set once every caller has left, and shared.progress, which fans out to
+        all of them. Yields the _SharedScan every SCAN_POLL_SECONDS while
+        waiting and returns fn's result; a caller whose stop_event is set
+        leaves with ScanCancelled.
+        """
+        # a job that needs another scan runs it inline instead of waiting on a slot
+        if getattr(self.local, "in_job", False):
+            shared = _SharedScan(session)
+            if stop_event is not None:
+                shared.stop = stop_event
+            shared.attach(progress)
+            return fn(shared)
+        if session is None:
+            session = current_session_id()
+        with self.lock:
+            shared = self.shared.get(key)
+            if shared is None:
+                shared = self.shared[key] = _SharedScan(session)
+            future = self._submit_locked(key, lambda: fn(shared), session)
+            token = shared.attach(progress)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        try:
+            while True:
+                concurrent.futures.wait([future], timeout=SCAN_POLL_SECONDS)
+                if future.done():
+                    return future.result()
+                if stop_event is not None and stop_event.is_set():
+                    raise ScanCancelled()
+                if deadline is not None and time.monotonic() >= deadline and not future.running():
+                    raise concurrent.futures.TimeoutError(f"No free scan slot within {timeout}s")
+                yield shared
+        finally:
+            self._leave(key, shared, token, future)
+
+    def _leave(self, key, shared, token, future):
+        with self.lock:
+            if shared.detach(token) or future.done():
+                return
+            # aakhri waiter gaya - queued job hata do, chalti job ko rok do
+            if not future.running():
+                self._drop_queued_locked(shared.session, key, future)
+            shared.stop.set()
+            # the stopped job may still be winding down, a new request starts afresh
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if self.shared.get(key) is shared:
+                del self.shared[key]
+
+    def _drop_queued_locked(self, session, key, future):
+        pending = self.queues.get(session)
+        if pending is None:
+            return
+        for entry in pending:
+            if entry[2] is future:
+                pending.remove(entry)
+                break
+        else:
+            return
+        if not pending:
+            del self.queues[session]
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+        future.cancel()
+
+    def _dispatch_locked(self):
+        while self.running < self.slots and self.queues:
+            session, pending = next(iter(self.queues.items()))
+            key, fn, future = pending.popleft()
+            # round robin - this session goes to the back of the line
+            if pending:
+                self.queues.move_to_end(session)
+            else:
+                del self.queues[session]
+            self.running += 1
+            self.pool.submit(self._run, key, fn, future)
+
+    def _run(self, key, fn, future):
+        self.local.in_job = True
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn())
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            self.local.in_job = False
+            with self.lock:
+                if self.inflight.get(key) is future:
+                    del self.inflight[key]
+                    self.shared.pop(key, None)
+                self.running -= 1
+                self._dispatch_locked()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "running": self.running,
+                "queued": sum(len(q) for q in self.queues.values()),
+                "sessions_waiting": len(self.queues),
+                "coalesced": self.coalesced,
+            }
+
+@st.cache_resource
+def get_scan_coordinator():
+    return ScanCoordinator()
+
+# search scope
+PSEUDO_FILESYSTEMS = {
+    "proc", "sysfs", "devtmpfs", "devpts", "tmpfs", "ramfs", "cgroup", "cgroup2",
+    "securityfs", "debugfs", "tracefs", "pstore", "bpf", "mqueue", "hugetlbfs",
+    "configfs", "fusectl", "autofs", "binfmt_misc", "efivarfs", "nsfs", "rpc_pipefs",
+    "selinuxfs", "squashfs", "nfsd", "fuse.gvfsd-fuse", "fuse.portal",
+}
+NETWORK_FILESYSTEMS = {
+    "nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "ceph", "glusterfs",
+    "9p", "fuse.sshfs", "sshfs", "fuse.rclone", "davfs", "fuse.s3fs",
+}
+
+DEFAULT_SEARCH_EXCLUDES = [
+    # windows system folders
+    "Windows", "Program Files", "Program Files (x86)", "ProgramData", "AppData",
+    "$Recycle.Bin", "System Volume Information",
+    # linux system trees
+    "/proc", "/sys", "/dev", "/run", "/boot", "/snap", "/var/lib/docker", "/var/cache",
+    "/usr", "/lib", "/lib64", "/bin", "/sbin", "/etc", "/opt", "/srv", "/var/lib",
+    # noise everywhere
+    ".git", "node_modules", "__pycache__", ".cache", ".Trash*", ".local/share/Trash",
+]
+
+def _unescape_mount_path(path):
+    # /proc/mounts escapes space, tab, newline and backslash as octal
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), path)
+
+def discover_mount_points(mounts_file="/proc/mounts", include_network=False):
+    """
+    Real local filesystems from /proc/mounts. Pseudo filesystems are skipped,
+    network mounts too unless asked for, and bind mounts of an already seen
+    device are dropped so nothing is scanned twice.
+    """
+    try:
+        with open(mounts_file) as f:
+            lines = f.readlines()
+    except OSError:
+        return ["/"] if os.path.isdir("/") else []
+
+    candidates = []
+    for line in lines:
+        parts = line.split()
+        if len(parts) < 3:
+            continue
+        source, mount_point, fs_type = parts[0], _unescape_mount_path(parts[1]), parts[2]
+        if fs_type in PSEUDO_FILESYSTEMS:
+            continue
+        if fs_type in NETWORK_FILESYSTEMS and not include_network:
+            continue
+        candidates.append(mount_point)
+
+    # shortest path first, so the original mount wins over its bind mounts
+    mount_points, seen_devices = [], set()
+    for mount_point in sorted(set(candidates), key=lambda p: (p.count(os.sep), p)):
+        try:
+            device = os.stat(mount_point).st_dev
+        except OSError:
+            continue
+        if device in seen_devices:
+            continue
+        seen_devices.add(device)
+        mount_points.append(mount_point)
+    return mount_points
+
+def compile_excludes(patterns, case_sensitive=None):
+    """
+    Turn glob patterns into one matcher for DirEntry objects. Patterns that
+    contain a path separator are matched against the full path (and anything
+    below it), the rest against the directory name only.
+    """
+    if case_sensitive is None:
+        case_sensitive = os.name != "nt"
+    flags = 0 if case_sensitive else re.IGNORECASE
+    name_parts, path_parts = [], []
+    for pattern in patterns:
+        if "/" in pattern or "\\" in pattern:
+            pattern = pattern.replace("/", os.sep)
+            if os.path.isabs(pattern):
+                path_parts.append(fnmatch.translate(pattern))
+            else:
+                path_parts.append(".*" + re.escape(os.sep) + fnmatch.translate(pattern))
+        else:
+            name_parts.append(fnmatch.translate(pattern))
+    name_re = re.compile("|".join(name_parts), flags) if name_parts else None
+    path_re = re.compile("|".join(path_parts), flags) if path_parts else None
+
+    def is_excluded(entry):
+        if name_re is not None and name_re.match(entry.name):
+            return True
+        return path_re is not None and path_re.match(entry.path) is not None
+    return is_excluded
+
+_PathEntry = collections.namedtuple("_PathEntry", "name path")
+
+class SearchScope:
+    """Where deep search looks: roots, excluded directories and a depth limit"""
+
+    def __init__(self, roots=None, excludes=None, max_depth=None, include_network=False):
+        self.excludes = list(DEFAULT_SEARCH_EXCLUDES if excludes is None else excludes)
+        self.max_depth = max_depth
+        self.is_excluded = compile_excludes(self.excludes)
+        if roots is None:
+            if os.name == "nt":
+                roots = [f"{d}:\\" for d in ascii_uppercase if os.path.exists(f"{d}:\\")]
+            else:
+                # a mount is a root of its own, pruning never sees it - e.g. /boot/efi, /snap/*
+                roots = [root for root in discover_mount_points(include_network=include_network)
+                         if not self.path_excluded(root)]
+        self.roots = list(roots)
+
+    def path_excluded(self, path):
+        """True when path or any folder above it matches an exclude pattern"""
+        while True:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            if self.is_excluded(_PathEntry(os.path.basename(path), path)):
+                return True
+            path = parent
+
+    @property
+    def key(self):
+        """Identifies what a walk over this scope covers, for coalescing searches"""
+        return (tuple(self.roots), tuple(self.excludes), self.max_depth)
+
+    def walk(self, roots=None, **kwargs):
+        """scan_tree over this scope, excluded dirs are never descended"""
+        return scan_tree(
+            self.roots if roots is None else roots,
+            prune=self.is_excluded,
+            max_depth=self.max_depth,
+            one_filesystem=roots is None,
+            **kwargs
+        )
+
+@st.cache_resource
+def get_search_scope():
+    """Mount discovery and pattern compilation happen once per process"""
+    extra = os.environ.get("ECHO_SEARCH_EXCLUDES", "")
+    excludes = DEFAULT_SEARCH_EXCLUDES + [p for p in extra.split(os.pathsep) if p]
+    max_depth = os.environ.get("ECHO_SEARCH_MAX_DEPTH")
+    return SearchScope(excludes=excludes, max_depth=int(max_depth) if max_depth else None)
+
+# file index
+class FileIndex:
+    """
+    Persistent filename index stored in SQLite, keyed by lowercased basename.
+    Every indexed directory keeps its mtime, so a refresh only re-lists the
+    directories that actually changed since the last scan.
+    """
+
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                parent TEXT,
+                mtime_ns INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS dirs_parent ON dirs(parent);
+            CREATE TABLE IF NOT EXISTS files (
+                name_lower TEXT,
+                name TEXT,
+                dir TEXT
+            );
+            CREATE INDEX IF NOT EXISTS files_name ON files(name_lower);
+            CREATE INDEX IF NOT EXISTS files_dir ON files(dir);
+        """)
+        self.conn.commit()
+        self.watcher = None
+        # built on first fuzzy lookup, then kept in step with every change below
+        self.trigrams = None
+
+    def lookup(self, filename):
+        """Return indexed paths whose basename matches (case insensitive)"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT dir, name FROM files WHERE name_lower = ?",
+                (filename.lower(),)
+            ).fetchall()
+        return [os.path.join(d, name) for d, name in rows]
+
+    def _files_changed(self, removed=(), added=()):
+        """Mirror removed / added (name_lower, dir, name) rows into the trigram index"""
+        trigrams = self.trigrams
+        if trigrams is None:
+            return
+        for name_lower, d, name in removed:
+            trigrams.remove(name_lower, os.path.join(d, name))
+        for name_lower, d, name in added:
+            trigrams.add(name_lower, os.path.join(d, name))
+
+    def _delete_subtree(self, path):
+        # range query instead of LIKE so '%' and '_' in folder names are safe
+        lo = path.rstrip(os.sep) + os.sep
+        hi = lo[:-1] + chr(ord(os.sep) + 1)
+        if self.trigrams is not None:
+            self._files_changed(removed=self.conn.execute(
+                "SELECT name_lower, dir, name FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (path, lo, hi)
+            ).fetchall())
+        self.conn.execute("DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)", (path, lo, hi))
+        self.conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, lo, hi))
+
+    def _rescan_dir(self, path, parent, mtime_ns):
+        """Re-list one directory, returns its current subdirectories"""
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.is_dir():
+                            # symlink to a folder - not a file, and scan_tree never descends it either
+                            continue
+                        else:
+                            files.append((entry.name.lower(), entry.name, path))
+                    except OSError:
+                        continue
+        except OSError:
+            self._delete_subtree(path)
+            return []
+
+        known = {row[0] for row in self.conn.execute("SELECT path FROM dirs WHERE parent = ?", (path,))}
+        for gone in known.difference(subdirs):
+            self._delete_subtree(gone)
+
+        if self.trigrams is not None:
+            old = self.conn.execute("SELECT name_lower, dir, name FROM files WHERE dir = ?", (path,)).fetchall()
+            self._files_changed(removed=old, added=[(lower, d, name) for lower, name, d in files])
+        self.conn.execute("DELETE FROM files WHERE dir = ?", (path,))
+        self.conn.executemany("INSERT INTO files (name_lower, name, dir) VALUES (?, ?, ?)", files)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?)",
+            (path, parent, mtime_ns)
+        )
+        return subdirs
+
+    def refresh(self, roots):
+        """
+        Incrementally bring the index up to date for the given roots.
+        Unchanged directories are only stat'ed, their children come from the db.
+        Returns the number of directories that had to be re-listed.
+        """
+        rescanned = 0
+        with self.lock:
+            stored = dict(self.conn.execute("SELECT path, mtime_ns FROM dirs"))
+            stack = [(root, os.path.dirname(root)) for root in roots]
+            while stack:
+                path, parent = stack.pop()
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    self._delete_subtree(path)
+                    continue
+
+                if stored.get(path) == mtime_ns:
+                    children = [row[0] for row in self.conn.execute(
+                        "SELECT path FROM dirs WHERE parent = ?", (path,)
+                    )]
+                else:
+                    children = self._rescan_dir(path, parent, mtime_ns)
+                    rescanned += 1
+                stack.extend((child, path) for child in children)
+            self.conn.commit()
+        return rescanned
+
+    def forget(self, path):
+        """Drop a single stale file path from the index"""
+        with self.lock:
+            parent, name = os.path.split(path)
+            self.conn.execute("DELETE FROM files WHERE dir = ? AND name = ?", (parent, name))
+            self.conn.commit()
+            self._files_changed(removed=[(name.lower(), parent, name)])
+
+    def apply_changes(self, changes):
+        """Apply coalesced watcher events, a list of (path, kind) tuples"""
+        new_dirs = []
+        with self.lock:
+            for path, kind in changes:
+                if kind == "file_added":
+                    # inotify reports a new symlink to a folder without IN_ISDIR
+                    if os.path.islink(path) and os.path.isdir(path):
+                        continue
+                    parent, name = os.path.split(path)
+                    self.conn.execute("DELETE FROM files WHERE dir = ? AND name = ?", (parent, name))
+                    self.conn.execute(
+                        "INSERT INTO files (name_lower, name, dir) VALUES (?, ?, ?)",
+                        (name.lower(), name, parent)
+                    )
+                    self._files_changed(removed=[(name.lower(), parent, name)], added=[(name.lower(), parent, name)])
+                elif kind == "file_removed":
+                    parent, name = os.path.split(path)
+                    self.conn.execute("DELETE FROM files WHERE dir = ? AND name = ?", (parent, name))
+                    self._files_changed(removed=[(name.lower(), parent, name)])
+                elif kind == "dir_removed":
+                    self._delete_subtree(path)
+                elif kind == "dir_added":
+                    new_dirs.append(path)
+            self.conn.commit()
+        if new_dirs:
+            self.refresh(new_dirs)
+
+    def all_names(self):
+        """(lowercased name, full path) for every indexed file"""
+        with self.lock:
+            rows = self.conn.execute("SELECT name_lower, dir, name FROM files").fetchall()
+        return [(name_lower, os.path.join(d, name)) for name_lower, d, name in rows]
+
+    def fuzzy_index(self):
+        """
+        Trigram index over the indexed names. Built once, after that every
+        index change updates it in place; it is only rebuilt when removed
+        names make up most of it.
+        """
+        with self.lock:
+            if self.trigrams is None or self.trigrams.needs_compaction():
+                rows = self.conn.execute("SELECT name_lower, dir, name FROM files").fetchall()
+                self.trigrams = TrigramIndex((lower, os.path.join(d, name)) for lower, d, name in rows)
+            return self.trigrams
+
+# fuzzy matching
+FUZZY_CUTOFF = 0.6
+FUZZY_CANDIDATES = 40
+FUZZY_MAX_POSTING = 20_000
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class TrigramIndex:
+    """
+    Inverted trigram index over file basenames. A query only touches the
+    postings of its own trigrams to pick candidates, and just the top few
+    dozen of those are reranked with difflib. Names are added and removed
+    in place; a removed name keeps its id (and postings) with no paths, so
+    postings never have to be searched for deletions.
+    """
+
+    def __init__(self, entries=()):
+        self.lock = threading.Lock()
+        self.names = []
+        self.paths = []
+        self.name_ids = {}
+        self.dead = 0
+        self.gram_counts = array("I")
+        self.postings = {}
+        for name_lower, path in entries:
+            self.add(name_lower, path)
+
+    def add(self, name_lower, path):
+        with self.lock:
+            name_id = self.name_ids.get(name_lower)
+            if name_id is None:
+                name_id = self.name_ids[name_lower] = len(self.names)
+                self.names.append(name_lower)
+                self.paths.append([])
+                grams = _trigrams(name_lower)
+                self.gram_counts.append(len(grams))
+                for gram in grams:
+                    posting = self.postings.get(gram)
+                    if posting is None:
+                        posting = self.postings[gram] = array("I")
+                    posting.append(name_id)
+            elif not self.paths[name_id]:
+                # hata hua naam wapas aaya, purani postings hi kaam aayengi
+                self.dead -= 1
+            paths = self.paths[name_id]
+            if path not in paths:
+                paths.append(path)
+
+    def remove(self, name_lower, path):
+        with self.lock:
+            name_id = self.name_ids.get(name_lower)
+            if name_id is None:
+                return
+            paths = self.paths[name_id]
+            if path in paths:
+                paths.remove(path)
+                if not paths:
+                    self.dead += 1
+
+    def needs_compaction(self):
+        return self.dead > 10_000 and self.dead * 2 > len(self.names)
+
+    def candidates(self, query, limit=FUZZY_CANDIDATES):
+        """Name ids ranked by trigram jaccard similarity to the query"""
+        query_grams = _trigrams(query)
+        with self.lock:
+            postings = sorted((p for p in map(self.postings.get, query_grams) if p is not None), key=len)
+            # ".pd" / "pdf" jaise grams aadhi files mein hote hain - unki lambi lists
+            # skip, aur agar sirf wahi bache hon to bhi ek hi, capped
+            rare = [p for p in postings if len(p) <= FUZZY_MAX_POSTING]
+            if not rare and postings:
+                rare = [postings[0][:FUZZY_MAX_POSTING]]
+            shared = collections.Counter()
+            for posting in rare:
+                shared.update(posting)
+            live = [name_id for name_id in shared if self.paths[name_id]]
+        if not live:
+            return []
+        query_count = len(query_grams)
+        counts = self.gram_counts
+        return heapq.nlargest(
+            limit, live,
+            key=lambda name_id: shared[name_id] / (query_count + counts[name_id] - shared[name_id])
+        )
+
+    def search(self, query, limit=1, cutoff=FUZZY_CUTOFF, candidates=FUZZY_CANDIDATES):
+        """Best matching paths for a misheard filename, best first"""
+        query = query.lower()
+        scored = []
+        for name_id in self.candidates(query, candidates):
+            ratio = difflib.SequenceMatcher(None, query, self.names[name_id]).ratio()
+            if ratio >= cutoff:
+                scored.append((ratio, name_id))
+        scored.sort(reverse=True)
+
+        results = []
+        for ratio, name_id in scored:
+            with self.lock:
+                paths = list(self.paths[name_id])
+            for path in paths:
+                results.append(path)
+                if len(results) >= limit:
+                    return results
+        return results
+
+@st.cache_resource
+def get_file_index():
+    """One shared index per server process"""
+    return FileIndex(os.path.join(APP_DATA_DIR, "file_index.db"))
+
+# live file watcher (linux only)
+IN_MODIFY = 0x00000002
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_MODIFY |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+
+class InotifyWatcher:
+    """
+    Background inotify watcher for a set of directory trees.
+    Events are coalesced per path and handed to listeners in batches, so a
+    burst of writes turns into one index update instead of hundreds.
+    """
+
+    def __init__(self, roots, max_watches=None, coalesce_interval=0.25):
+        self.roots = list(roots)
+        self.coalesce_interval = coalesce_interval
+        self.max_watches = max_watches or self._system_watch_limit()
+        self.listeners = []
+        self.ready_callbacks = []
+        self.wd_paths = {}
+        self.path_wds = {}
+        self.pending = {}
+        self.truncated = False   # watch limit hit, some subtrees are not covered
+        self.overflowed = False  # kernel queue overflowed or a root went away, events were lost
+        self.lost_roots = set()  # roots deleted / moved away, watched again once they are back
+        # bumped every time events are lost, see mark_resynced
+        self.generation = 0
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.fd = -1
+
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+
+    @staticmethod
+    def available():
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+            return hasattr(libc, "inotify_init1")
+        except OSError:
+            return False
+
+    @staticmethod
+    def _system_watch_limit():
+        # leave some headroom for other programs of the same user
+        try:
+            with open("/proc/sys/fs/inotify/max_user_watches") as f:
+                return max(1024, int(f.read().strip()) * 3 // 4)
+        except (OSError, ValueError):
+            return 8192
+
+    @property
+    def trusted(self):
+        """True when every event under the roots is being seen"""
+        if not self.ready.is_set() or self.stop_event.is_set() or self.truncated or self.overflowed:
+            return False
+        # root wapas aa gaya par watch abhi nahi laga
+        return not any(os.path.isdir(root) for root in tuple(self.lost_roots))
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def add_ready_callback(self, callback):
+        """Run once all initial watches are in place, before events are applied"""
+        self.ready_callbacks.append(callback)
+
+    def start(self):
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.thread = threading.Thread(target=self._run, name="inotify-watcher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def _add_watch(self, path):
+        if path in self.path_wds:
+            return True
+        if len(self.wd_paths) >= self.max_watches:
+            self.truncated = True
+            return False
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            if ctypes.get_errno() == 28:  # ENOSPC, kernel watch limit reached
+                self.truncated = True
+            return False
+        self.wd_paths[wd] = path
+        self.path_wds[path] = wd
+        return True
+
+    def _watch_tree(self, root):
+        for dirpath, dirs, files in os.walk(root):
+            if not self._add_watch(dirpath):
+                dirs[:] = []
+
+    def _unwatch_tree(self, root):
+        prefix = root.rstrip(os.sep) + os.sep
+        for path in [p for p in self.path_wds if p == root or p.startswith(prefix)]:
+            wd = self.path_wds.pop(path)
+            self.wd_paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def mark_resynced(self, generation):
+        """
+        Called after a full refresh has caught up with lost events. Pass the
+        generation read before the refresh started - if more events were
+        lost while it ran the watcher stays untrusted.
+        """
+        with self.lock:
+            if generation == self.generation:
+                self.overflowed = False
+
+    def _events_lost(self):
+        with self.lock:
+            self.generation += 1
+            self.overflowed = True
+
+    def _lose_root(self, root):
+        # IN_MOVE_SELF ke baad wd naye path ko follow karta hai - purane naam se hatao
+        self._unwatch_tree(root)
+        self.lost_roots.add(root)
+        self.pending[root] = "dir_removed"
+        self._events_lost()
+
+    def _rewatch_roots(self):
+        for root in tuple(self.lost_roots):
+            if os.path.isdir(root) and self._add_watch(root):
+                self.lost_roots.discard(root)
+                self._watch_tree(root)
+                # index refresh us root ka, watch lagne ke baad
+                self.pending[root] = "dir_added"
+
+    def _handle_event(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            self._events_lost()
+            return
+        base = self.wd_paths.get(wd)
+        if base is None:
+            return
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            if base in self.roots:
+                self._lose_root(base)
+            return
+        if mask & IN_IGNORED:
+            self.wd_paths.pop(wd, None)
+            if self.path_wds.get(base) == wd:
+                del self.path_wds[base]
+            return
+
+        path = os.path.join(base, name) if name else base
+        is_dir = bool(mask & IN_ISDIR)
+        if mask & (IN_CREATE | IN_MOVED_TO):
+            if is_dir:
+                self._watch_tree(path)
+            kind = "dir_added" if is_dir else "file_added"
+        elif mask & (IN_DELETE | IN_MOVED_FROM):
+            if is_dir:
+                self._unwatch_tree(path)
+            kind = "dir_removed" if is_dir else "file_removed"
+        elif mask & IN_MODIFY:
+            kind = "file_modified"
+        else:
+            return
+        # coalesce - only the latest event per path matters
+        self.pending[path] = kind
+
+    def _flush(self):
+        if not self.pending:
+            return
+        changes = list(self.pending.items())
+        self.pending.clear()
+        for callback in self.listeners:
+            try:
+                callback(changes)
+            except Exception:
+                continue
+
+    def _run(self):
+        for root in self.roots:
+            if os.path.isdir(root):
+                self._watch_tree(root)
+        for callback in self.ready_callbacks:
+            try:
+                callback()
+            except Exception:
+                continue
+        self.ready.set()
+
+        last_flush = time.monotonic()
+        while not self.stop_event.is_set():
+            readable, _, _ = select.select([self.fd], [], [], self.coalesce_interval)
+            if readable:
+                try:
+                    buf = os.read(self.fd, 64 * 1024)
+                except BlockingIOError:
+                    buf = b""
+                offset = 0
+                while offset + 16 <= len(buf):
+                    wd, mask, cookie, length = struct.unpack_from("iIII", buf, offset)
+                    raw_name = buf[offset + 16:offset + 16 + length].rstrip(b"\0")
+                    offset += 16 + length
+                    self._handle_event(wd, mask, os.fsdecode(raw_name))
+            if self.lost_roots:
+                self._rewatch_roots()
+            if time.monotonic() - last_flush >= self.coalesce_interval:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush()
+
+@st.cache_resource
+def get_file_watcher():
+    """Start one watcher per process that keeps the file index live"""
+    if not InotifyWatcher.available():
+        return None
+    index = get_file_index()
+    roots = [d for d in get_priority_dirs() if os.path.exists(d)]
+    watcher = InotifyWatcher(roots)
+    watcher.add_listener(index.apply_changes)
+    watcher.add_listener(lambda changes: invalidate_snapshots(*(path for path, kind in changes)))
+    # catch up with anything that changed while nobody was watching
+    watcher.add_ready_callback(lambda: index.refresh(roots))
+    try:
+        watcher.start()
+    except OSError:
+        return None
+    index.watcher = watcher
+    return watcher
+
+def lookup_indexed(filename, max_results=1, refresh=True):
+    """Answer a filename lookup from the index, refreshing it once on a miss"""
+    index = get_file_index()
+    priority_dirs = [d for d in get_priority_dirs() if os.path.exists(d)]
+
+    def valid_hits():
+        hits = []
+        for path in index.lookup(filename):
+            if os.path.exists(path):
+                hits.append(path)
+            else:
+                index.forget(path)
+        return hits[:max_results]
+
+    hits = valid_hits()
+    watcher = getattr(index, "watcher", None)
+    if watcher is not None and watcher.trusted:
+        # watcher keeps the index live, a miss is a real miss
+        return hits
+    if not hits and refresh:
+        generation = watcher.generation if watcher is not None else None
+        index.refresh(priority_dirs)
+        if watcher is not None:
+            watcher.mark_resynced(generation)
+        hits = valid_hits()
+    return hits
+
+def iter_search_file(filename: str, max_results=1, timeout=None, stop_event=None,
+                     fuzzy_cutoff=FUZZY_CUTOFF, fuzzy_results=1, progress=None):
+    """
+    Streaming deep search - yields each match as soon as it is found. The
+    generator's return value is True when the search ran to completion and
+    False when the timeout or stop_event cut it short. Without an exact hit
+    the closest indexed names (ratio >= fuzzy_cutoff) are yielded instead.
+    """
+    if not filename:
+        return True
+    
+    deadline = time.monotonic() + timeout if timeout else None
+    scope = get_search_scope()
+    target_lower = filename.lower()
+
+    def interrupted():
+        if stop_event is not None and stop_event.is_set():
+            return True
+        return deadline is not None and time.monotonic() >= deadline
+
+    # fast searching ke liye - index se, live walk sirf miss hone pr
+    found_files = lookup_indexed(filename, max_results)
+    if found_files:
+        yield from found_files
+        return True
+
+    # deep search file na find hone pr - saare drives/mounts ek hi worker pool me,
+    # excluded folders me utarte hi nahi, aur pehla match milte hi sab ruk jaata hai
+    files_scanned = 0
+    for root, dirs, files in scope.walk(stop_event=stop_event, deadline=deadline):
+        files_scanned += len(files)
+        if progress:
+            progress(files_scanned=files_scanned)
+        for entry in files:
+            if entry.name.lower() == target_lower:
+                found_files.append(entry.path)
+                yield entry.path
+                if len(found_files) >= max_results:
+                    return True
+                
+    if found_files or interrupted():
+        return not interrupted()
+
+    # fuzzy fallback - trigram index se candidates, phir sirf unhi pe difflib
+    fuzzy = get_file_index().fuzzy_index()
+    for path in fuzzy.search(filename, limit=fuzzy_results, cutoff=fuzzy_cutoff):
+        if os.path.exists(path):
+            yield path
+    return not interrupted()
+
+def search_file(filename: str, max_results=1, timeout=None, stop_event=None,
+                fuzzy_cutoff=FUZZY_CUTOFF, fuzzy_results=1, progress=None):
+    """
+    Cancellable deep search. Returns (matches, complete) - complete is False
+    when the timeout or stop_event cut the search short, in which case the
+    matches are whatever was found up to that point.
+    """
+    matches = []
+    stream = iter_search_file(filename, max_results, timeout, stop_event, fuzzy_cutoff, fuzzy_results, progress)
+    while True:
+        try:
+            matches.append(next(stream))
+        except StopIteration as done:
+            return matches, done.value
+
+# recent lookups
+LOOKUP_CACHE_SIZE = 256
+
+class LookupCache:
+    """
+    Bounded LRU of normalised filename -> resolved paths. A hit costs one
+    stat per path to confirm it is still there; entries are dropped when our
+    own operations move, rename or delete one of their paths. An entry marked
+    complete holds every path its search could find, so it also answers
+    requests for more results than it has.
+    """
+
+    def __init__(self, max_entries=LOOKUP_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @staticmethod
+    def normalise(filename):
+        return " ".join(filename.strip().lower().split())
+
+    def get(self, filename, max_results=1):
+        key = self.normalise(filename)
+        with self.lock:
+            paths, complete = self.entries.get(key, (None, False))
+            if paths is not None:
+                self.entries.move_to_end(key)
+        if paths is None or (len(paths) < max_results and not complete):
+            with self.lock:
+                self.misses += 1
+            return None
+        wanted = paths[:max_results]
+        for path in wanted:
+            try:
+                os.stat(path)
+            except OSError:
+                with self.lock:
+                    self.entries.pop(key, None)
+                    self.stale += 1
+                    self.misses += 1
+                return None
+        with self.lock:
+            self.hits += 1
+        return list(wanted)
+
+    def put(self, filename, paths, complete=False):
+        key = self.normalise(filename)
+        with self.lock:
+            self.entries[key] = (list(paths), complete)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict_paths(self, *paths):
+        """Forget every lookup that resolved to one of these paths (or below them)"""
+        prefixes = [os.path.abspath(p).rstrip(os.sep) for p in paths if p]
+        if not prefixes:
+            return
+        def affected(path):
+            return any(path == pre or path.startswith(pre + os.sep) for pre in prefixes)
+        with self.lock:
+            for key in [k for k, (v, _) in self.entries.items() if any(affected(p) for p in v)]:
+                del self.entries[key]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+@st.cache_resource
+def get_lookup_cache():
+    return LookupCache()
+
+def _exact_hits(filename, paths):
+    """True when every path is named filename - fuzzy fallbacks never are"""
+    target = filename.lower()
+    return all(os.path.basename(path).lower() == target for path in paths)
+
+def find_file_deep(filename: str, max_results=1, timeout=None, stop_event=None, progress=None):
+    """Robust deep search across all available drives with fuzzy matching fallback."""
+    if not filename:
+        return []
+    cache = get_lookup_cache()
+    cached = cache.get(filename, max_results)
+    if cached is not None:
+        return cached
+    # same name searched from several sessions at once -> one walk; every
+    # caller keeps its own timeout, cancel and progress on top of it
+    job_key = ("search", cache.normalise(filename), max_results, get_search_scope().key)
+    deadline = time.monotonic() + timeout if timeout else None
+    def search(shared):
+        found = shared.latest = []
+        stream = iter_search_file(filename, max_results, stop_event=shared.stop, progress=shared.progress)
+        while True:
+            try:
+                found.append(next(stream))
+            except StopIteration as done:
+                return list(found), done.value
+    stream = get_scan_coordinator().iter_join(job_key, search, stop_event=stop_event, progress=progress)
+    shared, matches, complete = None, None, False
+    try:
+        while True:
+            shared = next(stream)
+            # slot ke intezaar mein gaya time bhi timeout mein ginta hai
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    except StopIteration as done:
+        matches, complete = done.value
+    except ScanCancelled:
+        pass
+    finally:
+        stream.close()
+    if matches is None:
+        # timed out or cancelled - whatever the shared walk had found by then
+        matches = list(shared.latest or []) if shared is not None else []
+    # fuzzy matches cache nahi hote, warna agli baar woh exact hit ban jaate
+    if matches and complete and _exact_hits(filename, matches):
+        # search poora chala aur max se kam mile - yahi saare hain
+        cache.put(filename, matches, complete=len(matches) < max_results)
+    return matches
+
+def iter_find_file_deep(filename: str, max_results=1, timeout=None, stop_event=None, progress=None):
+    """Streaming find_file_deep - yields each path the moment it turns up"""
+    if not filename:
+        return
+    cache = get_lookup_cache()
+    cached = cache.get(filename, max_results)
+    if cached is not None:
+        yield from cached
+        return
+    matches = []
+    stream = iter_search_file(filename, max_results, timeout=timeout, stop_event=stop_event, progress=progress)
+    while True:
+        try:
+            path = next(stream)
+        except StopIteration as done:
+            complete = done.value
+            break
+        matches.append(path)
+        yield path
+    if matches and complete and _exact_hits(filename, matches):
+        cache.put(filename, matches, complete=len(matches) < max_results)
+
+# same-named copies the Delete tab looks for before the user picks one
+DELETE_SEARCH_RESULTS = 5
+
+def ensure_writable_folder(path):
+    try:
+        if not os.path.exists(path):
+            os.makedirs(path, exist_ok=True)
+        return os.access(path, os.W_OK), "Folder is writable"
+    except Exception as e:
+        return False, str(e)
+
+def op_upload(filename, dest_folder, stop_event=None, progress=None):
+    if not filename:
+        return False, "No filename provided"
+    
+    file_paths = find_file_deep(filename, stop_event=stop_event)
+    
+    if not file_paths:
+        return False, f"File '{filename}' not found on system"
+    
+    dest_path = get_full_path(dest_folder)
+    if not dest_path:
+        return False, f"Destination folder '{dest_folder}' not found"
+    
+    writable, message = ensure_writable_folder(dest_path)
+    if not writable:
+        return False, f"Cannot write to destination: {message}"
+    
+    try:
+        source_path = file_paths[0]
+        destination = os.path.join(dest_path, os.path.basename(source_path))
+        # dusre drive pe bhi zero-copy + checksum, source verify ke baad hi delete
+        move_file(source_path, destination, progress=progress, stop_event=stop_event)
+        paths_changed(source_path, destination)
+        return True, f"✅ Successfully moved '{filename}' to {dest_folder}"
+    except TransferCancelled:
+        return False, "Upload paused - start it again to resume where it stopped"
+    except Exception as e:
+        return False, f"Upload failed: {str(e)}"
+
+# batch upload
+TRANSFER_WORKERS = 4
+
+def parse_file_filter(text):
+    """
+    'pdf, jpg', 'photos', 'pngs', '*.log' or 'report_*' -> (glob patterns, extensions).
+    Known file types and extensions are matched plural or not, anything else
+    without wildcards is taken as an extension as is.
+    """
+    patterns, extensions = [], set()
+    for word in re.split(r"[,\s]+|\band\b", (text or "").lower()):
+        word = word.strip()
+        if not word or word in ("all", "files", "file", "the", "my", "every"):
+            continue
+        if "*" in word or "?" in word or "[" in word:
+            patterns.append(word)
+            continue
+        word = word.lstrip(".")
+        # "pngs" / "mp3s" plural hain, par ".js" / ".cs" jaise unknown words waise hi
+        extensions.update(extensions_for(word) or ["." + word])
+    return patterns, sorted(extensions)
+
+def compile_name_patterns(patterns):
+    if not patterns:
+        return lambda name: False
+    regex = re.compile("|".join(fnmatch.translate(p.lower()) for p in patterns))
+    return lambda name: regex.match(name) is not None
+
+def plan_batch_upload(source_folder, dest_folder, file_filter, include_subfolders=False, stop_event=None):
+    """
+    Pick the files to move from the source folder's snapshot. Returns
+    {"items": [{"source", "destination", "size"}], "skipped": [(path, reason)],
+    "bytes"}; files whose name already exists at the destination are skipped.
+    """
+    source_path = get_full_path(source_folder)
+    dest_path = get_full_path(dest_folder)
+    if not source_path or not os.path.isdir(source_path):
+        raise ValueError(f"Source folder '{source_folder}' not found")
+    if not dest_path:
+        raise ValueError(f"Destination folder '{dest_folder}' not found")
+    patterns, extensions = parse_file_filter(file_filter)
+    if not patterns and not extensions:
+        raise ValueError("Say which files to move, e.g. 'pdf' or '*.jpg'")
+    match = compile_name_patterns(patterns)
+
+    snapshot = get_folder_snapshot(source_path, stop_event=stop_event)
+    root = snapshot.folder_path
+    dest_root = os.path.abspath(dest_path)
+    plan = {"source": root, "destination": dest_root, "items": [], "skipped": [], "bytes": 0}
+    taken = set()
+    for i, name in enumerate(snapshot.names):
+        folder = snapshot.dirs[snapshot.dir_idx[i]]
+        if not include_subfolders and folder != root:
+            continue
+        if snapshot.links[i] or folder == dest_root or folder.startswith(dest_root + os.sep):
+            continue
+        lower = name.lower()
+        if not ((extensions and os.path.splitext(lower)[1] in extensions) or (patterns and match(lower))):
+            continue
+        source = os.path.join(folder, name)
+        destination = os.path.join(dest_root, name)
+        if lower in taken or os.path.exists(destination):
+            plan["skipped"].append((source, "a file with this name is already at the destination"))
+            continue
+        taken.add(lower)
+        plan["items"].append({"source": source, "destination": destination, "size": snapshot.sizes[i]})
+        plan["bytes"] += snapshot.sizes[i]
+    return plan
+
+def execute_batch_upload(plan, workers=None, progress=None, stop_event=None):
+    """
+    Move every planned file on a bounded pool of transfers. progress gets
+    done/total files and bytes_done/bytes_total. Returns a report with
+    moved, failed, skipped and bytes_moved.
+    """
+    items = plan["items"]
+    report = {"moved": [], "failed": [], "skipped": list(plan["skipped"]), "bytes_moved": 0,
+              "source": plan["source"], "destination": plan["destination"]}
+    if items:
+        writable, message = ensure_writable_folder(plan["destination"])
+        if not writable:
+            report["failed"] = [(item["source"], message) for item in items]
+            return report
+    lock = threading.Lock()
+    in_flight = {}
+
+    def report_progress():
+        if progress:
+            progress(done=len(report["moved"]) + len(report["failed"]), total=len(items),
+                     bytes_done=report["bytes_moved"] + sum(in_flight.values()), bytes_total=plan["bytes"])
+
+    def move_one(item):
+        source = item["source"]
+        def on_bytes(done, total):
+            with lock:
+                in_flight[source] = done
+                report_progress()
+        try:
+            move_file(source, item["destination"], progress=on_bytes, stop_event=stop_event)
+            outcome = None
+        except TransferCancelled:
+            outcome = "cancelled"
+        except Exception as e:
+            outcome = str(e)
+        with lock:
+            in_flight.pop(source, None)
+            if outcome is None:
+                report["moved"].append(source)
+                report["bytes_moved"] += item["size"]
+            elif outcome == "cancelled":
+                report["skipped"].append((source, "cancelled"))
+            else:
+                report["failed"].append((source, outcome))
+            report_progress()
+
+    def guarded(item):
+        if stop_event is not None and stop_event.is_set():
+            with lock:
+                report["skipped"].append((item["source"], "cancelled"))
+            return
+        move_one(item)
+
+    # bade files pehle - aakhri me ek hi lamba transfer akela na chale
+    ordered = sorted(items, key=lambda item: item["size"], reverse=True)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or TRANSFER_WORKERS) as executor:
+        list(executor.map(guarded, ordered))
+    if report["moved"]:
+        paths_changed(plan["destination"], *report["moved"])
+    return report
+
+def summarize_batch_upload(report, source_folder, dest_folder):
+    """One line for the screen and for speak()"""
+    moved = len(report["moved"])
+    if not moved and not report["failed"]:
+        return f"No matching files to move from {source_folder}"
+    message = f"Moved {moved} file{'s' if moved != 1 else ''} ({report['bytes_moved'] / (1024 * 1024):.1f} MB) from {source_folder} to {dest_folder}"
+    if report["failed"]:
+        message += f", {len(report['failed'])} failed"
+    skipped = len(report["skipped"])
+    if skipped:
+        message += f", {skipped} skipped"
+    return message
+
+def op_batch_upload(source_folder, dest_folder, file_filter, include_subfolders=False,
+                    progress=None, stop_event=None):
+    """Plan + execute in one go, returns (success, message, report)"""
+    try:
+        plan = plan_batch_upload(source_folder, dest_folder, file_filter, include_subfolders, stop_event=stop_event)
+    except ScanCancelled:
+        raise
+    except Exception as e:
+        return False, str(e), None
+    report = execute_batch_upload(plan, progress=progress, stop_event=stop_event)
+    return not report["failed"], summarize_batch_upload(report, source_folder, dest_folder), report
+
+def op_rename(old_name, new_name, stop_event=None, progress=None):
+    if not old_name or not new_name:
+        return False, "Both old and new names are required"
+    
+    file_paths = find_file_deep(old_name, stop_event=stop_event, progress=progress)
+    if stop_event is not None and stop_event.is_set():
+        raise ScanCancelled()
+    
+    if not file_paths:
+        return False, f"File '{old_name}' not found"
+    
+    try:
+        old_path = file_paths[0]
+        new_path = os.path.join(os.path.dirname(old_path), new_name)
+        
+        if os.path.exists(new_path):
+            return False, f"A file with name '{new_name}' already exists in the same location"
+        
+        os.rename(old_path, new_path)
+        paths_changed(old_path, new_path)
+        return True, f"✅ Renamed '{old_name}' to '{new_name}'"
+    except Exception as e:
+        return False, f"Rename failed: {str(e)}"
+
+def file_row(name, path, size, mtime_ns):
+    """Display row for one file - formatting only happens here"""
+    return {
+        "Name": name,
+        "Path": path,
+        "Size (KB)": round(size / 1024, 2),
+        "Modified": datetime.fromtimestamp(mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S"),
+        "Type": os.path.splitext(name)[1] or "No extension"
+    }
+
+class FileListing:
+    """
+    Column-oriented listing of a folder for huge file counts. Sizes and mtimes
+    live in typed arrays and folders / extensions are stored once in string
+    tables, so a million files cost tens of MB instead of a million dicts.
+    Totals are collected in the same pass and only the requested page is
+    ever turned into display rows. The last few sort orders are kept in a
+    small LRU so paging doesn't re-sort.
+    """
+
+    SORT_KEYS = ("name", "size", "modified", "type")
+    MAX_ORDERS = 8
+
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.dirs, self.dir_ids = [], {}
+        self.exts, self.ext_ids = [], {}
+        self.names = []
+        self.dir_idx = array("I")
+        self.ext_idx = array("I")
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        self.total_size = 0
+        self.ext_counts = collections.Counter()
+        self._orders = collections.OrderedDict()
+        self._orders_lock = threading.Lock()
+
+    def _intern(self, table, ids, value):
+        idx = ids.get(value)
+        if idx is None:
+            idx = ids[value] = len(table)
+            table.append(value)
+        return idx
+
+    def add(self, dir_path, name, size, mtime_ns):
+        ext = os.path.splitext(name)[1] or "No extension"
+        self.names.append(name)
+        self.dir_idx.append(self._intern(self.dirs, self.dir_ids, dir_path))
+        self.ext_idx.append(self._intern(self.exts, self.ext_ids, ext))
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+        self.total_size += size
+        self.ext_counts[ext] += 1
+        self._orders.clear()
+
+    @classmethod
+    def build(cls, folder_path):
+        listing = cls(folder_path)
+        for root, dirs, files in scan_tree(folder_path, with_stat=True):
+            for entry in files:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                listing.add(root, entry.name, stat.st_size, stat.st_mtime_ns)
+        return listing
+
+    def __len__(self):
+        return len(self.names)
+
+    def path(self, i):
+        return os.path.join(self.dirs[self.dir_idx[i]], self.names[i])
+
+    def row(self, i):
+        return file_row(self.names[i], self.path(i), self.sizes[i], self.mtimes[i])
+
+    def rows(self):
+        return [self.row(i) for i in range(len(self))]
+
+    def _order(self, sort_by, descending, name_filter, ext_filter):
+        key = (sort_by, descending, name_filter, ext_filter)
+        with self._orders_lock:
+            order = self._orders.get(key)
+            if order is not None:
+                self._orders.move_to_end(key)
+                return order
+        indices = range(len(self))
+        if ext_filter:
+            wanted = self.ext_ids.get(ext_filter)
+            indices = [i for i in indices if self.ext_idx[i] == wanted]
+        if name_filter:
+            needle = name_filter.lower()
+            indices = [i for i in indices if needle in self.names[i].lower()]
+        sort_keys = {
+            "name": lambda i: self.names[i].lower(),
+            "size": self.sizes.__getitem__,
+            "modified": self.mtimes.__getitem__,
+            "type": lambda i: self.exts[self.ext_idx[i]],
+        }
+        order = array("I", sorted(indices, key=sort_keys[sort_by], reverse=descending))
+        # har typed filter ka apna order - sirf aakhri kuch rakhte hain
+        with self._orders_lock:
+            self._orders[key] = order
+            while len(self._orders) > self.MAX_ORDERS:
+                self._orders.popitem(last=False)
+        return order
+
+    def page(self, offset=0, limit=100, sort_by="name", descending=False, name_filter="", ext_filter=""):
+        """Display rows for one page plus the number of matching files"""
+        if sort_by not in self.SORT_KEYS:
+            raise ValueError(f"Cannot sort by '{sort_by}'")
+        order = self._order(sort_by, descending, name_filter or "", ext_filter or "")
+        return [self.row(i) for i in order[offset:offset + limit]], len(order)
+
+# folder snapshots
+SNAPSHOT_TTL = 30         # seconds a snapshot is served without any checks
+SNAPSHOT_MAX_AGE = 600    # after this it is rescanned even if no folder changed
+SNAPSHOT_FOLDERS = 16
+
+class FolderSnapshot(FileListing):
+    """
+    Everything Show, Storage, Sort and Dedupe need from a folder, captured in
+    a single scan: the listing columns plus inode data and directory mtimes.
+    """
+
+    def __init__(self, folder_path):
+        super().__init__(os.path.abspath(folder_path))
+        self.devs = array("Q")
+        self.inos = array("Q")
+        self.nlinks = array("I")
+        self.blocks = array("q")
+        self.links = bytearray()
+        self.dir_mtimes = {}
+        self.created_at = time.time()
+        self.storage_reports = {}
+
+    @classmethod
+    def iter_build(cls, folder_path, stop_event=None):
+        """
+        Yields the same, growing snapshot after every directory scanned.
+        Setting stop_event ends the walk with ScanCancelled.
+        """
+        snapshot = cls(folder_path)
+        yield snapshot
+        for root, dirs, files in scan_tree(snapshot.folder_path, with_stat=True, stop_event=stop_event):
+            try:
+                snapshot.dir_mtimes[root] = os.stat(root).st_mtime_ns
+            except OSError:
+                continue
+            for entry in files:
+                try:
+                    stat = entry.stat()
+                    is_link = entry.is_symlink()
+                except OSError:
+                    continue
+                snapshot.add(root, entry.name, stat.st_size, stat.st_mtime_ns)
+                snapshot.devs.append(stat.st_dev)
+                snapshot.inos.append(stat.st_ino)
+                snapshot.nlinks.append(stat.st_nlink)
+                blocks = getattr(stat, "st_blocks", None)
+                snapshot.blocks.append(blocks * 512 if blocks is not None else stat.st_size)
+                snapshot.links.append(1 if is_link else 0)
+            yield snapshot
+        if stop_event is not None and stop_event.is_set():
+            raise ScanCancelled()
+        snapshot.created_at = time.time()
+
+    def dirs_unchanged(self, paths=None):
+        for path in self.dir_mtimes if paths is None else paths:
+            try:
+                if os.stat(path).st_mtime_ns != self.dir_mtimes.get(path):
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def is_fresh(self):
+        """
+        Within the TTL only the top folder's mtime is checked (one stat), so
+        a file added or removed right there shows up at once; changes deeper
+        down wait for the TTL unless the watcher invalidates them. After
+        that every directory mtime is validated, up to the max age.
+        """
+        age = time.time() - self.created_at
+        if age < SNAPSHOT_TTL:
+            return self.dirs_unchanged([self.folder_path])
+        return age < SNAPSHOT_MAX_AGE and self.dirs_unchanged()
+
+    def storage_report(self, top_n=10):
+        report = self.storage_reports.get(top_n)
+        if report is None:
+            report = self.storage_reports[top_n] = _storage_report(self, top_n)
+        return report
+
+class SnapshotStore:
+    """Process-wide snapshots per folder, dropped after our own file operations"""
+
+    def __init__(self, max_folders=SNAPSHOT_FOLDERS):
+        self.max_folders = max_folders
+        self.lock = threading.Lock()
+        self.snapshots = collections.OrderedDict()
+
+    def get(self, folder_path, refresh=False, progress=None, stop_event=None):
+        key = os.path.abspath(folder_path)
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot is not None:
+                self.snapshots.move_to_end(key)
+        if snapshot is not None and not refresh and snapshot.is_fresh():
+            return snapshot
+        # concurrent sessions asking for the same folder share one scan,
+        # each keeps its own cancel and progress
+        return get_scan_coordinator().join(
+            ("snapshot", key), lambda shared: self._build(key, shared), stop_event=stop_event, progress=progress)
+
+    def stream(self, folder_path, refresh=False, preview_rows=100, stop_event=None):
+        """
+        Yields (files_found, preview) as the scan goes, preview holding the
+        display rows of the first preview_rows files - nothing else is ever
+        formatted. A fresh snapshot comes out in one go; otherwise the folder
+        is built through the scan coordinator, so a build some other session
+        already runs is joined rather than repeated. Setting stop_event (or
+        closing the generator) leaves the build with ScanCancelled.
+        """
+        key = os.path.abspath(folder_path)
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+        if snapshot is not None and not refresh and snapshot.is_fresh():
+            yield len(snapshot), [snapshot.row(i) for i in range(min(preview_rows, len(snapshot)))]
+            return
+        preview = []
+
+        def grow(snapshot, found):
+            if len(preview) < min(preview_rows, found):
+                preview.extend(snapshot.row(i) for i in range(len(preview), min(preview_rows, found)))
+            return found, preview
+
+        stream = get_scan_coordinator().iter_join(
+            ("snapshot", key), lambda shared: self._build(key, shared), stop_event=stop_event)
+        while True:
+            try:
+                shared = next(stream)
+            except StopIteration as done:
+                yield grow(done.value, len(done.value))
+                return
+            if shared.latest is not None:
+                yield grow(*shared.latest)
+
+    def _build(self, key, shared):
+        """Coordinator job - publishes (snapshot, files so far) after every directory"""
+        for snapshot in FolderSnapshot.iter_build(key, stop_event=shared.stop):
+            found = len(snapshot)
+            # rows below `found` are complete, readers never see a half-added file
+            shared.latest = (snapshot, found)
+            shared.progress(files_scanned=found)
+        self._put(key, snapshot)
+        return snapshot
+
+    def _put(self, key, snapshot):
+        with self.lock:
+            self.snapshots[key] = snapshot
+            self.snapshots.move_to_end(key)
+            while len(self.snapshots) > self.max_folders:
+                self.snapshots.popitem(last=False)
+
+    def invalidate(self, path=None):
+        """Drop every snapshot that contains path (or lies inside it)"""
+        with self.lock:
+            if path is None:
+                self.snapshots.clear()
+                return
+            path = os.path.abspath(path)
+            for root in list(self.snapshots):
+                inside = path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+                contains = root.startswith(path.rstrip(os.sep) + os.sep)
+                if inside or contains:
+                    del self.snapshots[root]
+
+@st.cache_resource
+def get_snapshot_store():
+    return SnapshotStore()
+
+def get_folder_snapshot(folder_path, refresh=False, progress=None, stop_event=None):
+    return get_snapshot_store().get(folder_path, refresh=refresh, progress=progress, stop_event=stop_event)
+
+def invalidate_snapshots(*paths):
+    store = get_snapshot_store()
+    for path in paths:
+        if path:
+            store.invalidate(path)
+
+def paths_changed(*paths):
+    """Call after we move, rename or delete something so no cache serves stale data"""
+    invalidate_snapshots(*paths)
+    get_lookup_cache().evict_paths(*paths)
+
+def iter_all_files(folder_path, refresh=False, preview_rows=100, stop_event=None):
+    """Streaming list_all_files - yields (files_found, first rows) while the folder is scanned"""
+    yield from get_snapshot_store().stream(folder_path, refresh=refresh, preview_rows=preview_rows,
+                                           stop_event=stop_event)
+
+def list_all_files(folder_path):
+    files_data = []
+    try:
+        files_data = get_folder_snapshot(folder_path).rows()
+    except Exception as e:
+        st.error(f"Error reading folder: {e}")
+    
+    return files_data
+
+# duplicate detection
+PARTIAL_HASH_BYTES = 8 * 1024
+HASH_CHUNK_BYTES = 1024 * 1024
+DEDUPE_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+
+def partial_hash(path, size):
+    """blake2b of the first and last few KB - cheap way to split same-size files"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(PARTIAL_HASH_BYTES))
+        if size > 2 * PARTIAL_HASH_BYTES:
+            f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+        elif size > PARTIAL_HASH_BYTES:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def full_hash(path):
+    """Streaming blake2b of the whole file, never holds more than one chunk"""
+    digest = hashlib.blake2b()
+    buf = bytearray(HASH_CHUNK_BYTES)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+# persistent hash cache
+HASH_CACHE_MAX_ENTRIES = 500_000
+
+class HashCache:
+    """
+    Content hashes in SQLite keyed by (device, inode, size, mtime_ns), so a
+    file that did not change is never read again. Least recently used rows
+    are evicted past max_entries. WAL mode plus a busy timeout lets several
+    app processes share the same cache file.
+    """
+
+    def __init__(self, db_path, max_entries=HASH_CACHE_MAX_ENTRIES):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS hashes (
+                dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER,
+                kind TEXT, digest TEXT, last_used REAL,
+                PRIMARY KEY (dev, ino, size, mtime_ns, kind)
+            );
+            CREATE INDEX IF NOT EXISTS hashes_last_used ON hashes(last_used);
+        """)
+        self.conn.commit()
+        # row count tracked here, COUNT(*) only when eviction might be due
+        self.rows = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+        self.pending = []
+        self.touched = []
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def key_for(stat):
+        """Cache key for an os.stat result, None when the fs has no inode numbers"""
+        if not stat.st_ino:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def get(self, key, kind):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest FROM hashes WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND kind = ?",
+                key + (kind,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if kind == "full":
+                self.bytes_saved += key[2]
+            self.touched.append(key + (kind,))
+            return row[0]
+
+    def put(self, key, kind, digest):
+        with self.lock:
+            self.pending.append(key + (kind, digest))
+            if len(self.pending) >= 1000:
+                self._flush_locked()
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        now = time.time()
+        if self.pending:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, kind, digest, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [row + (now,) for row in self.pending]
+            )
+            # REPLACE ho sakta hai, to yeh upper bound hai
+            self.rows += len(self.pending)
+            self.pending = []
+        if self.touched:
+            self.conn.executemany(
+                "UPDATE hashes SET last_used = ? WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND kind = ?",
+                [(now,) + row for row in self.touched]
+            )
+            self.touched = []
+        if self.rows > self.max_entries:
+            count = self.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self.rows = min(count, self.max_entries)
+        self.conn.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "bytes_saved": self.bytes_saved,
+        }
+
+@st.cache_resource
+def get_hash_cache():
+    return HashCache(os.path.join(APP_DATA_DIR, "hash_cache.db"))
+
+def hash_file_cached(path, kind="full", stat=None, cache=None, key=None):
+    """
+    Hash through the persistent cache. kind is "full" or "partial"; pass the
+    stat result (or a ready (dev, ino, size, mtime_ns) key) if you already
+    have one to save a syscall. The digest is only cached when the file
+    still has the same stat after hashing.
+    """
+    cache = cache or get_hash_cache()
+    if key is None:
+        if stat is None:
+            stat = os.stat(path)
+        key = HashCache.key_for(stat)
+    size = key[2] if key is not None else stat.st_size
+    if key is not None:
+        digest = cache.get(key, kind)
+        if digest is not None:
+            return digest
+    digest = full_hash(path) if kind == "full" else partial_hash(path, size)
+    # hashing ke beech file badli to digest kisi bhi key ka sahi nahi hai
+    if key is not None and HashCache.key_for(os.stat(path)) == key:
+        cache.put(key, kind, digest)
+    return digest
+
+def _hash_groups(groups, hash_fn, workers, progress=None, stop_event=None, stage="", read_size=None):
+    """
+    Split every group of paths further by hash_fn(path, size), drop singles.
+    progress gets stage, done/total and bytes_hashed (read_size(size) bytes
+    per file), stop_event abandons the remaining work with ScanCancelled.
+    """
+    jobs = [(key, path) for key, paths in groups.items() for path in paths]
+    refined = collections.defaultdict(list)
+    bytes_hashed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(hash_fn, path, key[0]): (key, path) for key, path in jobs}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            if stop_event is not None and stop_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                raise ScanCancelled()
+            key, path = futures[future]
+            try:
+                refined[key + (future.result(),)].append(path)
+            except OSError:
+                continue
+            if progress:
+                bytes_hashed += read_size(key[0]) if read_size else key[0]
+                progress(stage=stage, done=done, total=len(jobs), bytes_hashed=bytes_hashed)
+    return {key: paths for key, paths in refined.items() if len(paths) > 1}
+
+def _regular_stat(path):
+    """lstat of a regular file, None for symlinks and anything missing"""
+    try:
+        stat = os.lstat(path)
+    except OSError:
+        return None
+    return stat if S_ISREG(stat.st_mode) else None
+
+def find_duplicate_groups(folder_path, workers=None, cache=None, progress=None, stop_event=None, stats=None,
+                          include_empty=False):
+    """
+    Staged duplicate search, most files never get read at all:
+    1. group by size and drop unique sizes
+    2. hash the head and tail of the survivors
+    3. full streaming hash of what is still ambiguous
+    Returns a list of groups, each a sorted list of paths - the first one is
+    the copy that is kept. Symlinks are skipped, so the kept path is always
+    a real file. Hashes of unchanged files come from the hash cache.
+    A dict passed as stats receives the stat every path was hashed under,
+    plan_dedupe uses it to spot files that changed afterwards. Empty files
+    are only compared with include_empty.
+    """
+    workers = workers or DEDUPE_WORKERS
+    cache = cache or get_hash_cache()
+    snapshot = get_folder_snapshot(folder_path, progress=progress, stop_event=stop_event)
+    # snapshot sirf file list ke liye - woh 10 minute tak purana ho sakta hai aur
+    # in-place edit se folder ka mtime nahi badalta, isliye size / key taaza stat se
+    paths = [snapshot.path(i) for i in range(len(snapshot))]
+    fresh = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for path, stat in zip(paths, executor.map(_regular_stat, paths, chunksize=256)):
+            if stat is not None:
+                fresh[path] = stat
+    if stop_event is not None and stop_event.is_set():
+        raise ScanCancelled()
+    by_size = collections.defaultdict(list)
+    for path, stat in fresh.items():
+        by_size[stat.st_size].append(path)
+
+    keys = {}
+    candidates = {}
+    for size, group in by_size.items():
+        if len(group) < 2 or (size == 0 and not include_empty):
+            continue
+        # hard links are one file on disk, not duplicates; symlinks never got
+        # this far, so the path kept is always a real file
+        unique = {}
+        for path in sorted(group):
+            stat = fresh[path]
+            keys[path] = HashCache.key_for(stat)
+            unique.setdefault((stat.st_dev, stat.st_ino) if stat.st_ino else path, path)
+        if len(unique) > 1:
+            candidates[(size,)] = list(unique.values())
+
+    def cached(kind):
+        def run(path, size):
+            return hash_file_cached(path, kind, stat=fresh[path], cache=cache, key=keys[path])
+        return run
+
+    candidates = _hash_groups(
+        candidates, cached("partial"), workers, progress, stop_event,
+        stage="Comparing file heads", read_size=lambda size: min(size, 2 * PARTIAL_HASH_BYTES)
+    )
+
+    # the partial hash already covered small files completely
+    small = {key: paths for key, paths in candidates.items() if key[0] <= 2 * PARTIAL_HASH_BYTES}
+    large = {key: paths for key, paths in candidates.items() if key[0] > 2 * PARTIAL_HASH_BYTES}
+    confirmed = list(small.values())
+    confirmed += _hash_groups(large, cached("full"), workers, progress, stop_event, stage="Hashing files").values()
+    cache.flush()
+    groups = sorted(sorted(paths) for paths in confirmed)
+    if stats is not None:
+        stats.update((path, fresh[path]) for group in groups for path in group)
+    return groups
+
+# out-of-core dedupe
+EXTERNAL_RUN_RECORDS = 200_000
+_RECORD_HEADER = struct.Struct("<QQQI")
+
+def _write_run(path, records):
+    """Spill sorted (size, key, dev, ino, path) records to a binary run file"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        for size, key, dev, ino, file_path in records:
+            raw_key = key.encode("ascii")
+            raw_path = os.fsencode(file_path)
+            f.write(_RECORD_HEADER.pack(size, dev, ino, len(raw_path)))
+            f.write(bytes([len(raw_key)]) + raw_key + raw_path)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _read_run(path):
+    with open(path, "rb", buffering=1024 * 1024) as f:
+        while True:
+            header = f.read(_RECORD_HEADER.size)
+            if len(header) < _RECORD_HEADER.size:
+                return
+            size, dev, ino, path_len = _RECORD_HEADER.unpack(header)
+            key_len = f.read(1)[0]
+            key = f.read(key_len).decode("ascii")
+            yield size, key, dev, ino, os.fsdecode(f.read(path_len))
+
+class ExternalDedupe:
+    """
+    Duplicate search with fixed memory for whole-disk scale. Records are
+    spilled to sorted run files and duplicates found by an external merge:
+
+    scan   - (size, path) records in sorted runs, committed per top-level folder
+    hash   - merged by size, same-size groups hashed (via the hash cache) into
+             sorted (size, digest, path) runs, committed per size. A size
+             group is read as a stream, run_records paths at a time; one too
+             big for that goes through on-disk (partial hash, path) runs
+             first, so no phase holds more than run_records paths
+    merge  - runs merged by (size, digest), every group with more than one
+             path is a duplicate group
+
+    Empty files are left out unless include_empty. Progress is checkpointed
+    in work_dir, a run that is interrupted picks up from the last committed
+    folder or size on the next run().
+    """
+
+    def __init__(self, roots, work_dir, run_records=EXTERNAL_RUN_RECORDS, workers=None, include_empty=False):
+        if isinstance(roots, str):
+            roots = [roots]
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.work_dir = work_dir
+        self.run_records = run_records
+        self.workers = workers or DEDUPE_WORKERS
+        self.include_empty = include_empty
+        self.checkpoint_path = os.path.join(work_dir, "checkpoint.json")
+        os.makedirs(work_dir, exist_ok=True)
+        self.state = self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        state = {"roots": self.roots, "phase": "scan", "done_units": [], "scan_runs": [],
+                 "hash_runs": [], "hashed_through": -1, "next_run": 0}
+        try:
+            with open(self.checkpoint_path) as f:
+                saved = json.load(f)
+            if saved.get("roots") == self.roots:
+                state = saved
+        except (OSError, ValueError):
+            pass
+        # anything not committed belongs to an interrupted run
+        committed = set(state["scan_runs"]) | set(state["hash_runs"]) | {"checkpoint.json"}
+        for name in os.listdir(self.work_dir):
+            if name not in committed:
+                os.remove(os.path.join(self.work_dir, name))
+        return state
+
+    def _save_checkpoint(self):
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    def _new_run(self, prefix, records):
+        records.sort()
+        name = f"{prefix}-{self.state['next_run']:06d}.run"
+        self.state["next_run"] += 1
+        _write_run(os.path.join(self.work_dir, name), records)
+        return name
+
+    def _units(self):
+        """Top-level folders of every root, the unit of scan checkpointing"""
+        for root in self.roots:
+            yield root, False  # files directly in the root
+            try:
+                with os.scandir(root) as it:
+                    subdirs = sorted(e.path for e in it if e.is_dir(follow_symlinks=False))
+            except OSError:
+                continue
+            for subdir in subdirs:
+                yield subdir, True
+
+    def _scan(self, stop_event=None):
+        done = set(self.state["done_units"])
+        buffer, uncommitted, finished_units = [], [], []
+        for unit, recursive in self._units():
+            if unit in done:
+                continue
+            if recursive:
+                walk = scan_tree(unit, with_stat=True, stop_event=stop_event)
+            else:
+                try:
+                    with os.scandir(unit) as it:
+                        walk = [(unit, [], [e for e in it if not e.is_dir()])]
+                except OSError:
+                    walk = []
+            for root, dirs, files in walk:
+                for entry in files:
+                    try:
+                        if entry.is_symlink():
+                            continue
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    buffer.append((stat.st_size, "", stat.st_dev, stat.st_ino, entry.path))
+                    if len(buffer) >= self.run_records:
+                        uncommitted.append(self._new_run("scan", buffer))
+                        buffer = []
+            if stop_event is not None and stop_event.is_set():
+                return False
+            finished_units.append(unit)
+            # commit once the buffer is full or a big folder already spilled
+            if uncommitted or len(buffer) >= self.run_records // 2:
+                if buffer:
+                    uncommitted.append(self._new_run("scan", buffer))
+                    buffer = []
+                self.state["scan_runs"] += uncommitted
+                self.state["done_units"] += finished_units
+                uncommitted, finished_units = [], []
+                self._save_checkpoint()
+        if buffer:
+            uncommitted.append(self._new_run("scan", buffer))
+        self.state["scan_runs"] += uncommitted
+        self.state["done_units"] += finished_units
+        self.state["phase"] = "hash"
+        self._save_checkpoint()
+        return True
+
+    def _merged(self, names):
+        return heapq.merge(*(_read_run(os.path.join(self.work_dir, n)) for n in names))
+
+    @staticmethod
+    def _unique_paths(records):
+        # one name per inode (hard links) - records are sorted by (size, dev,
+        # ino, path), so links are neighbours and the smallest path comes first;
+        # symlinks were left out by the scan
+        previous = None
+        for _, _, dev, ino, path in records:
+            if ino and (dev, ino) == previous:
+                continue
+            previous = (dev, ino)
+            yield path
+
+    def _digests(self, paths, kind):
+        """(digest, path) for one chunk of paths, unreadable files dropped"""
+        cache = get_hash_cache()
+
+        def digest(path):
+            try:
+                return hash_file_cached(path, kind, cache=cache)
+            except OSError:
+                return None
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return [(d, path) for d, path in zip(executor.map(digest, paths), paths) if d]
+
+    def _chunks(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            chunk = list(itertools.islice(iterator, self.run_records))
+            if not chunk:
+                return
+            yield chunk
+
+    def _hash_size(self, size, records, emit):
+        """Hash one same-size group, emit(record) for every file left in the running"""
+        chunks = self._chunks(self._unique_paths(records))
+        first = next(chunks, [])
+        second = next(chunks, None)
+        if second is None:
+            # chhota group - memory mein hi
+            if len(first) < 2:
+                return
+            heads = sorted(self._digests(first, "partial"))
+            for head, group in itertools.groupby(heads, key=lambda r: r[0]):
+                self._confirm(size, head, (path for _, path in group), emit)
+            return
+        # bahut bada group - partial hashes bhi disk pe sorted runs mein
+        names = []
+        try:
+            for chunk in itertools.chain([first, second], chunks):
+                heads = [(size, head, 0, 0, path) for head, path in self._digests(chunk, "partial")]
+                names.append(self._new_run("part", heads))
+            for head, group in itertools.groupby(self._merged(names), key=lambda r: r[1]):
+                self._confirm(size, head, (r[4] for r in group), emit)
+        finally:
+            for name in names:
+                os.remove(os.path.join(self.work_dir, name))
+
+    def _confirm(self, size, head, paths, emit):
+        paths = iter(paths)
+        pair = list(itertools.islice(paths, 2))
+        if len(pair) < 2:
+            return
+        paths = itertools.chain(pair, paths)
+        if size <= 2 * PARTIAL_HASH_BYTES:
+            # partial hash already covered the whole file
+            for path in paths:
+                emit((size, head, 0, 0, path))
+            return
+        for chunk in self._chunks(paths):
+            for digest, path in self._digests(chunk, "full"):
+                emit((size, digest, 0, 0, path))
+
+    def _hash(self, stop_event=None):
+        buffer, pending = [], []
+        hashed_through = self.state["hashed_through"]
+
+        def emit(record):
+            nonlocal buffer
+            buffer.append(record)
+            if len(buffer) >= self.run_records:
+                # size poora hone tak uncommitted, resume pe phir se banega
+                pending.append(self._new_run("hash", buffer))
+                buffer = []
+
+        merged = self._merged(self.state["scan_runs"])
+        for size, records in itertools.groupby(merged, key=lambda r: r[0]):
+            if size <= self.state["hashed_through"]:
+                continue
+            if stop_event is not None and stop_event.is_set():
+                return False
+            if size > 0 or self.include_empty:
+                self._hash_size(size, records, emit)
+            hashed_through = size
+            if pending or len(buffer) >= self.run_records // 2:
+                if buffer:
+                    pending.append(self._new_run("hash", buffer))
+                    buffer = []
+                self.state["hash_runs"] += pending
+                self.state["hashed_through"] = hashed_through
+                pending = []
+                self._save_checkpoint()
+        if buffer:
+            pending.append(self._new_run("hash", buffer))
+        self.state["hash_runs"] += pending
+        self.state["hashed_through"] = hashed_through
+        self.state["phase"] = "merge"
+        self._save_checkpoint()
+        get_hash_cache().flush()
+        return True
+
+    def run(self, stop_event=None):
+        """
+        Yield duplicate groups (sorted path lists, first one kept) in size
+        order. Stops quietly when stop_event is set, call again to resume.
+        """
+        if self.state["phase"] == "scan" and not self._scan(stop_event):
+            return
+        if self.state["phase"] == "hash" and not self._hash(stop_event):
+            return
+        merged = self._merged(self.state["hash_runs"])
+        for key, records in itertools.groupby(merged, key=lambda r: (r[0], r[1])):
+            paths = [r[4] for r in records]
+            if len(paths) > 1:
+                yield paths
+
+    def cleanup(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+def find_duplicate_groups_external(folder_path, work_dir=None, stop_event=None, include_empty=False):
+    """Bounded-memory variant of find_duplicate_groups, resumable per folder"""
+    if work_dir is None:
+        tag = hashlib.blake2b(os.path.abspath(folder_path).encode(), digest_size=8).hexdigest()
+        work_dir = os.path.join(APP_DATA_DIR, "dedupe", tag)
+    job = ExternalDedupe(folder_path, work_dir, include_empty=include_empty)
+    yield from job.run(stop_event)
+    if stop_event is None or not stop_event.is_set():
+        job.cleanup()
+
+# dedupe plan and execution
+DEDUPE_MODES = ("trash", "hardlink", "reflink")
+TRASH_BATCH_SIZE = 200
+DEDUPE_PREVIEW_ACTIONS = 1000
+DEDUPE_EXECUTE_CHUNK = 5000
+FICLONE = 0x40049409
+
+def _file_id(path, stat):
+    return {"path": path, "dev": stat.st_dev, "ino": stat.st_ino,
+            "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def plan_dedupe(groups, stats=None, spill_path=None):
+    """
+    Turn duplicate groups into a plan without touching anything. The kept
+    file and every duplicate record the (dev, ino, size, mtime) they were
+    hashed under (from stats, else seen now), so execution can skip anything
+    that changed in between. groups is consumed as a stream; with spill_path
+    the actions go to a JSON-lines file and only the first
+    DEDUPE_PREVIEW_ACTIONS stay in memory for display.
+    """
+    preview, group_count, file_count, total_bytes = [], 0, 0, 0
+    spill = open(spill_path, "w") if spill_path else None
+    try:
+        for group in groups:
+            ids = []
+            for path in group:
+                stat = stats.get(path) if stats else None
+                if stat is None:
+                    stat = _regular_stat(path)
+                if stat is not None:
+                    ids.append(_file_id(path, stat))
+            if len(ids) < 2:
+                continue
+            action = {"keep": ids[0]["path"], "keep_id": ids[0], "remove": ids[1:]}
+            group_count += 1
+            file_count += len(action["remove"])
+            total_bytes += sum(item["size"] for item in action["remove"])
+            if spill is not None:
+                spill.write(json.dumps(action) + "\n")
+            if spill is None or len(preview) < DEDUPE_PREVIEW_ACTIONS:
+                preview.append(action)
+    finally:
+        if spill is not None:
+            spill.close()
+    return {
+        "actions": preview,
+        "groups": group_count,
+        "files": file_count,
+        "bytes": total_bytes,
+        "spill_path": spill_path,
+    }
+
+def iter_plan_actions(plan):
+    """Every action of a plan, read back from disk for a spilled plan"""
+    if not plan.get("spill_path"):
+        yield from plan["actions"]
+        return
+    with open(plan["spill_path"]) as f:
+        for line in f:
+            yield json.loads(line)
+
+def _unchanged(item):
+    """File still is the one the plan saw - same inode, size and mtime"""
+    stat = _regular_stat(item["path"])
+    if stat is None:
+        return False
+    return (stat.st_size == item["size"] and stat.st_mtime_ns == item["mtime_ns"]
+            and stat.st_dev == item["dev"] and stat.st_ino == item["ino"])
+
+def _link_temp_name(path):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{uuid.uuid4().hex[:12]}.echo-dedupe")
+
+def _replace_with_link(keep, path, reflink):
+    """
+    Swap path for a (ref)link to keep, atomically via a temp name that this
+    call creates exclusively - a user file is never overwritten or removed
+    """
+    tmp = None
+    try:
+        if reflink:
+            import fcntl
+            folder, name = os.path.split(path)
+            fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".echo-dedupe", dir=folder)
+            with open(keep, "rb") as src, os.fdopen(fd, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(path, tmp)
+        else:
+            while tmp is None:
+                candidate = _link_temp_name(path)
+                try:
+                    os.link(keep, candidate)
+                except FileExistsError:
+                    continue  # naam kisi aur ka hai, naya lo
+                tmp = candidate
+        os.replace(tmp, path)
+    except BaseException:
+        if tmp is not None and os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+
+def _trash_batch(paths):
+    """One send2trash call per batch, per file only to pin down a failure"""
+    try:
+        send2trash(paths)
+        return paths, []
+    except Exception:
+        done, failed = [], []
+        for path in paths:
+            try:
+                send2trash(path)
+                done.append(path)
+            except Exception as e:
+                failed.append((path, str(e)))
+        return done, failed
+
+def execute_dedupe_plan(plan, mode="trash", dry_run=False, progress=None, workers=None, stop_event=None):
+    """
+    Run a dedupe plan. mode is "trash" (batched Recycle Bin), "hardlink" or
+    "reflink" (copy-on-write clone, btrfs/xfs/apfs style filesystems only).
+    progress(done_files, total_files, done_bytes) is called as work finishes.
+    Returns a report dict; with dry_run nothing is changed and the report
+    lists what would happen. A duplicate is only touched while both it and
+    the kept file are still what the plan saw, otherwise it is skipped.
+    Setting stop_event skips whatever has not started yet. Actions are
+    worked through in chunks so a spilled plan is never loaded whole.
+    """
+    if mode not in DEDUPE_MODES:
+        raise ValueError(f"Unknown dedupe mode '{mode}'")
+    report = {"mode": mode, "dry_run": dry_run, "done": [], "failed": [], "skipped": [],
+              "bytes_reclaimed": 0, "planned_files": plan["files"], "planned_bytes": plan["bytes"]}
+    lock = threading.Lock()
+    sizes = {}
+
+    def finished(done, failed=(), skipped=()):
+        with lock:
+            report["done"] += done
+            report["failed"] += list(failed)
+            report["skipped"] += list(skipped)
+            report["bytes_reclaimed"] += sum(sizes.pop(p) for p in done)
+            for path, _ in failed:
+                sizes.pop(path, None)
+            if progress:
+                progress(len(report["done"]) + len(report["failed"]), plan["files"], report["bytes_reclaimed"])
 
-    # fast searching ke liye
-    for p_dir in priority_dirs:
-        if os.path.exists(p_dir):
-            for root, dirs, files in os.walk(p_dir):
-                for file in files:
-                    if file.lower() == target_lower:
-                        found_files.append(os.path.join(root, file))
-                        if len(found_files) >= max_results:
-                            return found_files
+    def chunks():
+        chunk = []
+        for action in iter_plan_actions(plan):
+            chunk += [(action["keep_id"], item) for item in action["remove"]]
+            if len(chunk) >= DEDUPE_EXECUTE_CHUNK:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
-    if found_files:
-        return found_files
+    def ready(keep_id, item):
+        # keep badla to link / trash ke baad sahi data kahin nahi bachega
+        return _unchanged(item) and _unchanged(keep_id)
+
+    def trash_one(batch):
+        if stop_event is not None and stop_event.is_set():
+            return [], [], []
+        paths, skipped = [], []
+        for keep_id, item in batch:
+            (paths if ready(keep_id, item) else skipped).append(item["path"])
+        done, failed = _trash_batch(paths) if paths else ([], [])
+        return done, failed, skipped
 
-    # deep search file na find hone pr
-    def search_drive_recursive(drive_path):
-        drive_matches = []
+    def link_one(keep_id, item):
+        if stop_event is not None and stop_event.is_set():
+            return
+        if not ready(keep_id, item):
+            finished([], skipped=[item["path"]])
+            return
         try:
-            for root, dirs, files in os.walk(drive_path):
-                if 'Windows' in root or 'Program Files' in root or 'AppData' in root:
-                    continue
-                for file in files:
-                    if file.lower() == target_lower:
-                        drive_matches.append(os.path.join(root, file))
-                        if len(drive_matches) >= max_results:
-                            return drive_matches
-        except Exception:
-            pass
-        return drive_matches
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future_to_drive = {executor.submit(search_drive_recursive, drive): drive for drive in drives}
-        for future in concurrent.futures.as_completed(future_to_drive):
-            results = future.result()
-            found_files.extend(results)
-            if len(found_files) >= max_results:
+            _replace_with_link(keep_id["path"], item["path"], reflink=(mode == "reflink"))
+            finished([item["path"]])
+        except Exception as e:
+            finished([], [(item["path"], str(e))])
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers or DEDUPE_WORKERS) as executor:
+        for chunk in chunks():
+            if stop_event is not None and stop_event.is_set():
                 break
-                
-    if found_files:
-        return found_files
-
-    best_match = None
-    highest_ratio = 0.0
-    cutoff = 0.6
-
-    for p_dir in priority_dirs:
-        if os.path.exists(p_dir):
-            for root, dirs, files in os.walk(p_dir):
-                for file in files:
-                    # lowercase cover krne ke liye
-                    ratio = difflib.SequenceMatcher(None, target_lower, file.lower()).ratio()
-                    if ratio > highest_ratio:
-                        highest_ratio = ratio
-                        best_match = os.path.join(root, file)
-    
-    if best_match and highest_ratio >= cutoff:
-        return [best_match]
-                
-    return found_files
+            with lock:
+                sizes.update((item["path"], item["size"]) for _, item in chunk)
+            if dry_run:
+                done, skipped = [], []
+                for keep_id, item in chunk:
+                    (done if ready(keep_id, item) else skipped).append(item["path"])
+                finished(done, skipped=skipped)
+            elif mode == "trash":
+                batches = [chunk[i:i + TRASH_BATCH_SIZE] for i in range(0, len(chunk), TRASH_BATCH_SIZE)]
+                for future in concurrent.futures.as_completed([executor.submit(trash_one, b) for b in batches]):
+                    finished(*future.result())
+            else:
+                list(executor.map(lambda job: link_one(*job), chunk))
+            sizes.clear()
+    if not dry_run:
+        paths_changed(*report["done"])
+    return report
 
-def ensure_writable_folder(path):
+def op_dedupe(plan, mode="trash", progress=None, stop_event=None):
+    """
+    Carry out a plan from plan_dedupe that the user has confirmed - nothing
+    else ever trashes or links duplicates. The plan's spill file is removed
+    afterwards. Returns the execute_dedupe_plan report.
+    """
     try:
-        if not os.path.exists(path):
-            os.makedirs(path, exist_ok=True)
-        return os.access(path, os.W_OK), "Folder is writable"
-    except Exception as e:
-        return False, str(e)
+        return execute_dedupe_plan(plan, mode=mode, progress=progress, stop_event=stop_event)
+    finally:
+        if plan["spill_path"] and os.path.exists(plan["spill_path"]):
+            os.remove(plan["spill_path"])
 
-def op_upload(filename, dest_folder):
-    if not filename:
-        return False, "No filename provided"
-    
-    with st.spinner(f"🔍 Deep searching for '{filename}'..."):
-        file_paths = find_file_deep(filename)
-    
-    if not file_paths:
-        return False, f"File '{filename}' not found on system"
-    
-    dest_path = get_full_path(dest_folder)
-    if not dest_path:
-        return False, f"Destination folder '{dest_folder}' not found"
-    
-    writable, message = ensure_writable_folder(dest_path)
-    if not writable:
-        return False, f"Cannot write to destination: {message}"
-    
-    try:
-        source_path = file_paths[0]
-        destination = os.path.join(dest_path, os.path.basename(source_path))
-        shutil.move(source_path, destination)
-        return True, f"✅ Successfully moved '{filename}' to {dest_folder}"
-    except Exception as e:
-        return False, f"Upload failed: {str(e)}"
+# storage analysis
+def _storage_report(snapshot, top_n):
+    """Per-directory totals from a snapshot, each inode counted once"""
+    folder_path = snapshot.folder_path
+    direct = collections.defaultdict(lambda: [0, 0, 0])
+    seen_inodes = set()
+    largest_files = []
+    for i in range(len(snapshot)):
+        # a symlink takes no real space, its target is counted where it lives
+        if snapshot.links[i]:
+            continue
+        # hard links take space once
+        if snapshot.nlinks[i] > 1:
+            inode = (snapshot.devs[i], snapshot.inos[i])
+            if inode in seen_inodes:
+                continue
+            seen_inodes.add(inode)
+        size = snapshot.sizes[i]
+        node = direct[snapshot.dirs[snapshot.dir_idx[i]]]
+        node[0] += size
+        node[1] += snapshot.blocks[i]
+        node[2] += 1
+        if len(largest_files) < top_n:
+            heapq.heappush(largest_files, (size, i))
+        elif size > largest_files[0][0]:
+            heapq.heapreplace(largest_files, (size, i))
 
-def op_rename(old_name, new_name):
-    if not old_name or not new_name:
-        return False, "Both old and new names are required"
-    
-    with st.spinner(f"🔍 Deep searching for '{old_name}'..."):
-        file_paths = find_file_deep(old_name)
-    
-    if not file_paths:
-        return False, f"File '{old_name}' not found"
-    
-    try:
-        old_path = file_paths[0]
-        new_path = os.path.join(os.path.dirname(old_path), new_name)
-        
-        if os.path.exists(new_path):
-            return False, f"A file with name '{new_name}' already exists in the same location"
-        
-        os.rename(old_path, new_path)
-        return True, f"✅ Renamed '{old_name}' to '{new_name}'"
-    except Exception as e:
-        return False, f"Rename failed: {str(e)}"
+    # roll every directory up into its ancestors
+    totals = {path: [0, 0, 0] for path in snapshot.dir_mtimes}
+    for path, (apparent, allocated, count) in direct.items():
+        current = path
+        while True:
+            node = totals.get(current)
+            if node is not None:
+                node[0] += apparent
+                node[1] += allocated
+                node[2] += count
+            if current == folder_path:
+                break
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
 
-def list_all_files(folder_path):
-    files_data = []
-    try:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    stat = os.stat(file_path)
-                    files_data.append({
-                        "Name": file,
-                        "Path": file_path,
-                        "Size (KB)": round(stat.st_size / 1024, 2),
-                        "Modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
-                        "Type": os.path.splitext(file)[1] or "No extension"
-                    })
-                except Exception:
-                    continue
-    except Exception as e:
-        st.error(f"Error reading folder: {e}")
-    
-    return files_data
+    root_total = totals.get(folder_path, [0, 0, 0])
+    # exact bytes se sort, rounded MB pe chhote folders barabar ho jaate hain
+    subfolders = sorted(
+        ((path, t) for path, t in totals.items() if os.path.dirname(path) == folder_path and path != folder_path),
+        key=lambda item: item[1][0], reverse=True
+    )
+    children = [
+        {"Folder": path, "Size (MB)": round(t[0] / (1024 * 1024), 2),
+         "On disk (MB)": round(t[1] / (1024 * 1024), 2), "Files": t[2]}
+        for path, t in subfolders
+    ]
+    largest_dirs = heapq.nlargest(
+        top_n, ((t[0], path) for path, t in totals.items() if path != folder_path)
+    )
+    return {
+        "path": folder_path,
+        "apparent_bytes": root_total[0],
+        "allocated_bytes": root_total[1],
+        "files": root_total[2],
+        "children": children,
+        "largest_files": [(size, snapshot.path(i)) for size, i in sorted(largest_files, reverse=True)],
+        "largest_dirs": largest_dirs,
+        "tree": {path: tuple(t) for path, t in totals.items()},
+        "scanned_at": snapshot.created_at,
+    }
 
-def op_dedupe(folder_path):
-    seen_hashes = {}
-    duplicates_removed = []
-    
-    try:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'rb') as f:
-                        file_hash = hashlib.md5(f.read()).hexdigest()
-                    
-                    if file_hash in seen_hashes:
-                        send2trash(file_path)
-                        duplicates_removed.append(file_path)
-                    else:
-                        seen_hashes[file_hash] = file_path
-                except Exception:
-                    continue
-    except Exception as e:
-        st.error(f"Error during deduplication: {e}")
-    
-    return duplicates_removed
+def analyze_storage(folder_path, top_n=10, progress=None, stop_event=None):
+    """
+    Storage report for a folder: apparent and allocated bytes (each inode
+    counted once), immediate subfolders, top-N largest files and folders.
+    Served from the folder snapshot, so repeat calls don't touch the disk.
+    """
+    return get_folder_snapshot(folder_path, progress=progress, stop_event=stop_event).storage_report(top_n)
 
 def get_storage_usage(folder_path):
-    total_size = 0
     try:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                try:
-                    total_size += os.path.getsize(os.path.join(root, file))
-                except Exception:
-                    continue
+        report = analyze_storage(folder_path)
     except Exception:
         return 0
     
-    return round(total_size / (1024 * 1024), 2)
+    return round(report["apparent_bytes"] / (1024 * 1024), 2)
 
-def sort_files_by_date(folder_path, newest_first=True):
-    files = list_all_files(folder_path)
-    files.sort(
-        key=lambda x: datetime.strptime(x["Modified"], "%Y-%m-%d %H:%M:%S"),
-        reverse=newest_first
-    )
-    return files
+def sort_files_by_date(folder_path, newest_first=True, limit=None, progress=None, stop_event=None):
+    """
+    Sort on raw st_mtime_ns and format only the rows that are returned.
+    With a limit only the newest/oldest N are kept in a bounded heap, the
+    full list is never built.
+    """
+    snapshot = get_folder_snapshot(folder_path, progress=progress, stop_event=stop_event)
+    mtimes = snapshot.mtimes
+    if limit:
+        pick = heapq.nlargest if newest_first else heapq.nsmallest
+        order = pick(limit, range(len(snapshot)), key=mtimes.__getitem__)
+    else:
+        order = sorted(range(len(snapshot)), key=mtimes.__getitem__, reverse=newest_first)
+    return [snapshot.row(i) for i in order]
+
+# background jobs
+JOB_WORKERS = 4
+JOB_RETENTION = 3600
+
+class Job:
+    """One background operation, its progress and its result"""
+
+    def __init__(self, kind, label, fn, session=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.kind = kind
+        self.label = label
+        self.fn = fn
+        self.session = session
+        self.status = "queued"
+        self.progress = {}
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.partial = []
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.announced = False
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def update(self, **progress):
+        """Progress callback handed to the operation"""
+        self.progress.update(progress)
+
+    def publish(self, item):
+        """Hand out an early result while the job keeps running"""
+        self.partial.append(item)
+
+    def cancel(self):
+        self.cancel_event.set()
+        # a running job stays "running" until fn returns, so its partial result is kept
+        if self.status == "queued":
+            self.status = "cancelled"
+        elif self.active:
+            self.progress["stage"] = "Cancelling"
+
+    def eta(self):
+        done, total = self.progress.get("done"), self.progress.get("total")
+        if not total:
+            done, total = self.progress.get("bytes_done"), self.progress.get("bytes_total")
+        if not self.started_at or not done or not total:
+            return None
+        elapsed = time.time() - self.started_at
+        return elapsed * (total - done) / done
+
+    def describe(self):
+        p = self.progress
+        parts = []
+        if p.get("stage"):
+            parts.append(p["stage"])
+        if p.get("files_scanned"):
+            parts.append(f"{p['files_scanned']:,} files scanned")
+        if p.get("total"):
+            parts.append(f"{p.get('done', 0)}/{p['total']}")
+        if p.get("bytes_hashed"):
+            parts.append(f"{p['bytes_hashed'] / (1024 * 1024):.1f} MB hashed")
+        if p.get("bytes_total"):
+            parts.append(f"{p.get('bytes_done', 0) / (1024 * 1024):.1f}/{p['bytes_total'] / (1024 * 1024):.1f} MB")
+        if p.get("bytes_reclaimed"):
+            parts.append(f"{p['bytes_reclaimed'] / (1024 * 1024):.1f} MB reclaimed")
+        eta = self.eta()
+        if eta is not None:
+            parts.append(f"~{eta:.0f}s left")
+        return " • ".join(parts) or self.status.capitalize()
+
+    def run(self):
+        if self.cancel_event.is_set():
+            return
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            self.result = self.fn(self)
+            self.status = "cancelled" if self.cancel_event.is_set() else "done"
+        except ScanCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.finished_at = time.time()
+
+class JobManager:
+    """Worker pool for long operations so the Streamlit script never blocks on them"""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+
+    def submit(self, kind, label, fn, session=None):
+        """fn(job) runs in the background, returns the Job right away"""
+        job = Job(kind, label, fn, session)
+        with self.lock:
+            self._prune_locked()
+            self.jobs[job.id] = job
+        self.pool.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def for_session(self, session):
+        with self.lock:
+            return [job for job in self.jobs.values() if job.session == session]
+
+    def _prune_locked(self):
+        cutoff = time.time() - JOB_RETENTION
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+@st.cache_resource
+def get_job_manager():
+    return JobManager()
+
+def start_job(slot, kind, label, fn):
+    """Submit a job and remember it in this session under `slot`"""
+    job = get_job_manager().submit(kind, label, fn, session=current_session_id())
+    st.session_state[f"job_{slot}"] = job.id
+    return job
+
+def session_job(slot):
+    job_id = st.session_state.get(f"job_{slot}")
+    return get_job_manager().get(job_id) if job_id else None
+
+def render_job_status(job):
+    """Inline status of a job, True once it finished with a (possibly partial, if cancelled) result"""
+    if job.active:
+        st.info(f"⏳ {job.label} running in the background • {job.describe()}")
+        if st.button("⏹️ Cancel", key=f"cancel_{job.id}"):
+            job.cancel()
+            st.rerun()
+        return False
+    if job.status == "failed":
+        st.error(f"{job.label} failed: {job.error}")
+        announce_once(job, f"{job.label} failed", priority=URGENT, interrupt=True)
+    elif job.status == "cancelled":
+        st.warning(f"{job.label} was cancelled" + (" - showing what was done so far" if job.result is not None else ""))
+    return job.status == "done" or (job.status == "cancelled" and job.result is not None)
+
+def announce_once(job, text, priority=NORMAL, interrupt=False):
+    """Speak a job's result only on the first rerun that shows it"""
+    if not job.announced:
+        job.announced = True
+        speak(text, priority=priority, interrupt=interrupt)
+
+@st.fragment(run_every=1.0)
+def render_jobs_panel():
+    """Sidebar progress for this session's jobs, reruns the app when one finishes or streams a result"""
+    jobs = sorted(get_job_manager().for_session(current_session_id()), key=lambda j: j.created_at)
+    if not jobs:
+        return
+    st.markdown('<div class="sidebar-header">⏳ Background Jobs</div>', unsafe_allow_html=True)
+    seen = st.session_state.setdefault("jobs_seen", {})
+    changed = False
+    for job in jobs[-5:]:
+        if job.active:
+            p = job.progress
+            if p.get("total"):
+                fraction = p["done"] / p["total"]
+            elif p.get("bytes_total"):
+                fraction = p.get("bytes_done", 0) / p["bytes_total"]
+            else:
+                fraction = 0.0
+            st.progress(min(fraction, 1.0), text=f"{job.label}: {job.describe()}")
+            if st.button("⏹️ Cancel", key=f"panel_cancel_{job.id}", use_container_width=True):
+                job.cancel()
+        else:
+            icon = {"done": "✅", "failed": "❌", "cancelled": "⏹️"}.get(job.status, "•")
+            st.caption(f"{icon} {job.label}")
+        state = (job.status, len(job.partial))
+        if seen.get(job.id) not in (None, state) or (seen.get(job.id) is None and (not job.active or job.partial)):
+            changed = True
+        seen[job.id] = state
+    if changed:
+        st.rerun()
 
 # UI ka function
 
@@ -477,33 +3297,74 @@ def render_upload_interface():
             custom_dest = input_with_mic("Custom folder path:", key="upload_custom")
             destination = custom_dest
     
-    if st.session_state.get("last_voice_update") == "upload_filename" and filename:
+    # bola hua filename bhi wahi background job chalata hai jo button
+    voice_triggered = st.session_state.get("last_voice_update") == "upload_filename" and bool(filename)
+    if voice_triggered:
         st.session_state["last_voice_update"] = None
-        with st.spinner(f"🚀 Auto-starting upload for {filename}..."):
-            success, message = op_upload(filename, destination)
-            if success:
-                st.success(message)
-                speak("File uploaded successfully!")
-            else:
-                st.error(message)
-                speak("Upload failed!")
     
-    if st.button("🚀 Upload File", type="primary", use_container_width=True, key="upload_btn"):
+    if st.button("🚀 Upload File", type="primary", use_container_width=True, key="upload_btn") or voice_triggered:
         if not filename:
             st.error("Please enter a filename")
             return
         
-        with st.spinner(f"Uploading {filename}..."):
-            success, message = op_upload(filename, destination)
-        
+        start_job("upload", "upload", f"Upload {filename}",
+                  lambda job: op_upload(filename, destination, stop_event=job.cancel_event,
+                                        progress=lambda done, total: job.update(bytes_done=done, bytes_total=total)))
+    
+    job = session_job("upload")
+    if job and render_job_status(job):
+        success, message = job.result
         if success:
             st.success(message)
-            speak("File uploaded successfully!")
+            announce_once(job, "File uploaded successfully!")
         else:
             st.error(message)
-            speak("Upload failed!")
+            announce_once(job, "Upload failed!", priority=URGENT, interrupt=True)
+    
+    render_batch_upload()
     st.markdown('</div>', unsafe_allow_html=True)
 
+def render_batch_upload():
+    folders = ["Downloads", "Documents", "Desktop", "Pictures", "Videos", "Music"]
+    auto = st.session_state.get("auto_trigger_batch")
+    with st.expander("📦 Upload many files at once", expanded=bool(auto or session_job("batch_upload"))):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            source = st.selectbox("From folder:", folders, key="batch_source")
+        with col2:
+            file_filter = st.text_input("Which files:", key="batch_filter", placeholder="pdf, photos, *.log...")
+        with col3:
+            destination = st.selectbox("To folder:", folders, index=1, key="batch_dest")
+        include_subfolders = st.checkbox("Include subfolders", key="batch_subfolders")
+        
+        start = st.button("📦 Move matching files", use_container_width=True, key="batch_btn")
+        if auto:
+            st.session_state["auto_trigger_batch"] = False # Reset
+            start = True
+        if start:
+            if not file_filter:
+                st.error("Say or type which files to move")
+            elif source == destination:
+                st.error("Source and destination are the same folder")
+            else:
+                start_job("batch_upload", "upload", f"Move {file_filter} from {source} to {destination}",
+                          lambda job: op_batch_upload(source, destination, file_filter, include_subfolders,
+                                                      progress=job.update, stop_event=job.cancel_event))
+        
+        job = session_job("batch_upload")
+        if job and render_job_status(job):
+            success, message, report = job.result
+            if success:
+                st.success(message)
+                announce_once(job, message)
+            else:
+                st.error(message)
+                announce_once(job, message, priority=URGENT, interrupt=True)
+            if report and report["failed"]:
+                st.dataframe([{"File": p, "Error": e} for p, e in report["failed"]], use_container_width=True)
+            if report and report["skipped"]:
+                st.caption(f"{len(report['skipped'])} files skipped (name already taken or cancelled)")
+
 def render_delete_interface():
     st.markdown('<div class="operation-card">', unsafe_allow_html=True)
     st.subheader("🗑️ Delete File")
@@ -514,39 +3375,50 @@ def render_delete_interface():
         placeholder="Enter filename with extension"
     )
     
-    if st.session_state.get("last_voice_update") == "delete_filename" and filename:
+    voice_triggered = st.session_state.get("last_voice_update") == "delete_filename" and bool(filename)
+    if voice_triggered:
         st.session_state["last_voice_update"] = None
-        with st.spinner("🔍 Deep searching for file..."):
-            file_paths = find_file_deep(filename)
-            if file_paths:
-                st.session_state.delete_candidate = file_paths[0]
-                st.success(f"Found: {file_paths[0]}")
-                speak(f"Found {filename}. Please confirm deletion.")
-            else:
-                st.error("File not found")
-                speak("File not found.")
-                st.session_state.delete_candidate = None
 
-    if st.button("🔍 Find File", use_container_width=True, key="find_delete"):
+    if st.button("🔍 Find File", use_container_width=True, key="find_delete") or voice_triggered:
         if not filename:
             st.error("Please enter a filename")
             return
         
-        with st.spinner("Searching for file..."):
-            file_paths = find_file_deep(filename)
-        
-        if file_paths:
-            st.session_state.delete_candidate = file_paths[0]
-            st.success(f"Found: {file_paths[0]}")
-            
-            file_size = os.path.getsize(file_paths[0]) / (1024 * 1024)
-            st.info(f"File size: {file_size:.2f} MB • Location: {os.path.dirname(file_paths[0])}")
-        else:
+        st.session_state.delete_candidate = None
+        def find(job):
+            for path in iter_find_file_deep(filename, DELETE_SEARCH_RESULTS,
+                                            stop_event=job.cancel_event, progress=job.update):
+                job.publish(path)
+            return list(job.partial)
+        start_job("delete_find", "search", f"Find {filename}", find)
+    
+    job = session_job("delete_find")
+    if job:
+        finished = render_job_status(job)
+        # pehla hit turant candidate ban jaata hai, baaki copies aate hi list me
+        matches = job.result if finished else list(job.partial)
+        if matches:
+            if st.session_state.get("delete_job_picked") != job.id:
+                st.session_state.delete_job_picked = job.id
+                st.session_state.delete_candidate = matches[0]
+                speak(f"Found {os.path.basename(matches[0])}. Please confirm deletion.", priority=URGENT)
+            if len(matches) > 1:
+                def pick():
+                    st.session_state.delete_candidate = st.session_state.delete_pick
+                st.selectbox(f"Found {len(matches)} files with this name:", matches, key="delete_pick", on_change=pick)
+        elif finished and not job.announced:
+            job.announced = True
             st.error("File not found")
+            speak("File not found.", priority=URGENT, interrupt=True)
             st.session_state.delete_candidate = None
     
     if st.session_state.get('delete_candidate'):
         st.warning(f"⚠️ File to delete: {st.session_state.delete_candidate}")
+        try:
+            file_size = os.path.getsize(st.session_state.delete_candidate) / (1024 * 1024)
+            st.info(f"File size: {file_size:.2f} MB • Location: {os.path.dirname(st.session_state.delete_candidate)}")
+        except OSError:
+            pass
         
         col1, col2 = st.columns(2)
         with col1:
@@ -554,14 +3426,17 @@ def render_delete_interface():
                 try:
                     file_size = os.path.getsize(st.session_state.delete_candidate) / (1024 * 1024)
                     send2trash(st.session_state.delete_candidate)
+                    paths_changed(st.session_state.delete_candidate)
                     st.success(f"✅ Moved to Recycle Bin: {st.session_state.delete_candidate} (Size: {file_size:.2f} MB)")
                     speak("File moved to recycle bin successfully!")
                     st.session_state.delete_candidate = None
+                    st.session_state.pop("job_delete_find", None)
                 except Exception as e:
                     st.error(f"Deletion failed: {e}")
         with col2:
             if st.button("❌ Cancel", use_container_width=True, key="cancel_delete"):
                 st.session_state.delete_candidate = None
+                st.session_state.pop("job_delete_find", None)
                 st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -579,30 +3454,29 @@ def render_rename_interface():
             help_text="Enter the current filename with extension"
         )
         
-        if st.session_state.get("last_voice_update") == "rename_old" and old_name:
+        voice_find = st.session_state.get("last_voice_update") == "rename_old" and bool(old_name)
+        if voice_find:
             st.session_state["last_voice_update"] = None
-            with st.spinner("🔍 Deep searching for file..."):
-                file_paths = find_file_deep(old_name)
-                if file_paths:
-                    st.session_state.rename_old_path = file_paths[0]
-                    st.success(f"Found: {file_paths[0]}")
-                    speak("Found file. What is the new name?")
-                else:
-                    st.error("File not found")
-                    speak("File not found.")
         
-        if st.button("🔍 Find Current File", use_container_width=True, key="find_old"):
+        if st.button("🔍 Find Current File", use_container_width=True, key="find_old") or voice_find:
             if not old_name:
                 st.error("Please enter current filename")
             else:
-                with st.spinner("Searching for file..."):
-                    file_paths = find_file_deep(old_name)
-                if file_paths:
-                    st.success(f"Found: {file_paths[0]}")
+                st.session_state.rename_old_path = None
+                start_job("rename_find", "search", f"Find {old_name}",
+                          lambda job: find_file_deep(old_name, stop_event=job.cancel_event, progress=job.update))
+        
+        job = session_job("rename_find")
+        if job and render_job_status(job):
+            file_paths = job.result
+            if file_paths:
+                st.success(f"Found: {file_paths[0]}")
+                if not job.announced:
                     st.session_state.rename_old_path = file_paths[0]
-                else:
-                    st.error("File not found")
-                    st.session_state.rename_old_path = None
+                announce_once(job, "Found file. What is the new name?", priority=URGENT)
+            elif job.status == "done":
+                st.error("File not found")
+                announce_once(job, "File not found.", priority=URGENT, interrupt=True)
     
     with col2:
         new_name = input_with_mic(
@@ -612,23 +3486,16 @@ def render_rename_interface():
             help_text="Enter the new filename with extension"
         )
         
-        # rename
-        if st.session_state.get("last_voice_update") == "rename_new" and new_name and st.session_state.get('rename_old_path'):
-             st.session_state["last_voice_update"] = None
-             with st.spinner("🔄 Auto-renaming file..."):
-                success, message = op_rename(old_name, new_name)
-                if success:
-                    st.success(message)
-                    speak("File renamed successfully!")
-                    st.session_state.rename_old_path = None
-                else:
-                    st.error(message)
-                    speak("Rename failed!")
+        # naya naam bolte hi rename, agar file mil chuki hai
+        voice_rename = (st.session_state.get("last_voice_update") == "rename_new" and bool(new_name)
+                        and bool(st.session_state.get('rename_old_path')))
+        if voice_rename:
+            st.session_state["last_voice_update"] = None
 
     if st.session_state.get('rename_old_path'):
         st.info(f"Current file location: {st.session_state.rename_old_path}")
     
-    if st.button("🔄 Rename File", type="primary", use_container_width=True, key="rename_btn"):
+    if st.button("🔄 Rename File", type="primary", use_container_width=True, key="rename_btn") or voice_rename:
         if not old_name:
             st.error("Please enter current filename")
             return
@@ -636,18 +3503,54 @@ def render_rename_interface():
             st.error("Please enter new filename")
             return
         
-        with st.spinner("Renaming file..."):
-            success, message = op_rename(old_name, new_name)
-        
+        start_job("rename", "rename", f"Rename {old_name}",
+                  lambda job: op_rename(old_name, new_name, stop_event=job.cancel_event, progress=job.update))
+    
+    job = session_job("rename")
+    if job and render_job_status(job):
+        success, message = job.result
         if success:
             st.success(message)
-            speak("File renamed successfully!")
-            st.session_state.rename_old_path = None
+            if not job.announced:
+                st.session_state.rename_old_path = None
+            announce_once(job, "File renamed successfully!")
         else:
             st.error(message)
-            speak("Rename failed!")
+            announce_once(job, "Rename failed!", priority=URGENT, interrupt=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
+def render_file_listing(listing):
+    """Totals plus one server-side page of a FileListing"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total Files", len(listing))
+    with col2:
+        st.metric("Total Size", f"{listing.total_size / (1024 * 1024):.1f} MB")
+    with col3:
+        st.metric("File Types", len(listing.ext_counts))
+    
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        name_filter = st.text_input("Filter by name:", key="show_filter")
+    with col2:
+        ext_filter = st.selectbox("Type:", ["All"] + sorted(listing.ext_counts), key="show_type")
+    with col3:
+        sort_by = st.selectbox("Sort by:", ["name", "size", "modified", "type"], key="show_sort")
+    with col4:
+        descending = st.checkbox("Descending", key="show_desc")
+    
+    page_size = 100
+    _, matched = listing.page(0, 0, sort_by, descending, name_filter, "" if ext_filter == "All" else ext_filter)
+    pages = max(1, (matched + page_size - 1) // page_size)
+    page_no = st.number_input(f"Page (of {pages}):", min_value=1, max_value=pages, value=1, key="show_page")
+    rows, matched = listing.page(
+        (page_no - 1) * page_size, page_size, sort_by, descending,
+        name_filter, "" if ext_filter == "All" else ext_filter
+    )
+    st.dataframe(rows, use_container_width=True)
+    first = (page_no - 1) * page_size + 1 if rows else 0
+    st.caption(f"Showing {first}-{first + len(rows) - 1 if rows else 0} of {matched} files")
+
 def render_show_interface():
     st.markdown('<div class="operation-card">', unsafe_allow_html=True)
     st.subheader("📋 Show Files in Folder")
@@ -658,6 +3561,22 @@ def render_show_interface():
         key="show_folder"
     )
     
+    def scan(folder_path):
+        # rows screen pe aate rehte hain jab tak scan chal raha hai
+        preview = st.empty()
+        drawn_at = 0.0
+        for found, first_rows in iter_all_files(folder_path):
+            if time.monotonic() - drawn_at > 0.3:
+                drawn_at = time.monotonic()
+                with preview.container():
+                    st.caption(f"⏳ Scanning folder... {found:,} files so far")
+                    st.dataframe(first_rows, use_container_width=True)
+        preview.empty()
+        listing = get_folder_snapshot(folder_path)
+        # keep the listing so paging / sorting reruns don't rescan the disk
+        st.session_state.show_listing = listing
+        return listing
+    
     if folder == "Custom":
         custom_folder = input_with_mic("Custom folder path:", key="show_custom")
         folder = custom_folder
@@ -666,25 +3585,19 @@ def render_show_interface():
             st.session_state["last_voice_update"] = None
             folder_path = get_full_path(custom_folder)
             if folder_path and os.path.exists(folder_path):
-                with st.spinner("Scanning folder..."):
-                    files = list_all_files(folder_path)
-                    if files:
-                        st.success(f"Found {len(files)} files")
-                        st.dataframe(files, use_container_width=True)
-                        speak(f"Found {len(files)} files.")
-                        return
+                listing = scan(folder_path)
+                if len(listing):
+                    st.success(f"Found {len(listing)} files")
+                    speak(f"Found {len(listing)} files.")
     
     if st.session_state.get("auto_trigger_show") and folder:
         st.session_state["auto_trigger_show"] = False # Reset
         folder_path = get_full_path(folder)
         if folder_path and os.path.exists(folder_path):
-             with st.spinner("Scanning folder..."):
-                files = list_all_files(folder_path)
-                if files:
-                    st.success(f"Found {len(files)} files")
-                    st.dataframe(files, use_container_width=True)
-                    speak(f"Found {len(files)} files in {folder}.")
-                    return
+            listing = scan(folder_path)
+            if len(listing):
+                st.success(f"Found {len(listing)} files")
+                speak(f"Found {len(listing)} files in {folder}.")
 
     if st.button("📁 List Files", type="primary", use_container_width=True, key="show_btn"):
         folder_path = get_full_path(folder)
@@ -693,24 +3606,16 @@ def render_show_interface():
             st.error("Invalid folder path")
             return
         
-        with st.spinner("Scanning folder..."):
-            files = list_all_files(folder_path)
-        
-        if files:
-            st.success(f"Found {len(files)} files")
-            st.dataframe(files, use_container_width=True)
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Files", len(files))
-            with col2:
-                total_size = sum(f["Size (KB)"] for f in files) / 1024
-                st.metric("Total Size", f"{total_size:.1f} MB")
-            with col3:
-                extensions = len(set(f["Type"] for f in files))
-                st.metric("File Types", extensions)
+        listing = scan(folder_path)
+        if len(listing):
+            st.success(f"Found {len(listing)} files")
         else:
             st.info("No files found in the specified folder")
+    
+    listing = st.session_state.get("show_listing")
+    folder_path = get_full_path(folder)
+    if listing is not None and len(listing) and folder_path and listing.folder_path == os.path.abspath(folder_path):
+        render_file_listing(listing)
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_storage_interface():
@@ -724,48 +3629,63 @@ def render_storage_interface():
     )
     
     if folder == "Custom":
-        custom_folder = input_with_mic("Custom folder path:", key="storage_custom")
-        folder = custom_folder
-        
-        if st.session_state.get("last_voice_update") == "storage_custom" and custom_folder:
-            st.session_state["last_voice_update"] = None
-            folder_path = get_full_path(custom_folder)
-            if folder_path and os.path.exists(folder_path):
-                with st.spinner("Calculating storage..."):
-                    storage_mb = get_storage_usage(folder_path)
-                st.success(f"📊 Storage Usage: {storage_mb} MB")
-                speak(f"Storage used is {storage_mb} megabytes")
-                return
+        folder = input_with_mic("Custom folder path:", key="storage_custom")
     
+    voice_triggered = False
+    if st.session_state.get("last_voice_update") == "storage_custom" and folder:
+        st.session_state["last_voice_update"] = None
+        voice_triggered = True
     if st.session_state.get("auto_trigger_storage") and folder:
         st.session_state["auto_trigger_storage"] = False # Reset
-        folder_path = get_full_path(folder)
-        if folder_path and os.path.exists(folder_path):
-            with st.spinner("Calculating storage..."):
-                storage_mb = get_storage_usage(folder_path)
-            st.success(f"📊 Storage Usage: {storage_mb} MB")
-            speak(f"Storage used in {folder} is {storage_mb} megabytes")
-            return
+        voice_triggered = True
 
-    if st.button("📊 Check Storage", type="primary", use_container_width=True, key="storage_btn"):
+    if st.button("📊 Check Storage", type="primary", use_container_width=True, key="storage_btn") or voice_triggered:
         folder_path = get_full_path(folder)
         
         if not folder_path or not os.path.exists(folder_path):
             st.error("Invalid folder path")
             return
         
-        with st.spinner("Calculating storage..."):
-            storage_mb = get_storage_usage(folder_path)
+        start_job("storage", "storage", f"Storage of {folder}",
+                  lambda job: (folder, analyze_storage(folder_path, progress=job.update,
+                                                       stop_event=job.cancel_event)))
+    
+    job = session_job("storage")
+    if job and render_job_status(job):
+        folder, report = job.result
+        storage_mb = round(report["apparent_bytes"] / (1024 * 1024), 2)
         
         st.success(f"📊 Storage Usage: {storage_mb} MB")
         
-        col1, col2 = st.columns(2)
+        col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.metric("Folder", folder)
         with col2:
             st.metric("Storage Used", f"{storage_mb} MB")
+        with col3:
+            st.metric("On Disk", f"{report['allocated_bytes'] / (1024 * 1024):.2f} MB")
+        with col4:
+            st.metric("Files", report["files"])
+        
+        if report["children"]:
+            st.write("📂 Subfolders")
+            st.dataframe(report["children"], use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.write("📄 Largest files")
+            st.dataframe(
+                [{"File": path, "Size (MB)": round(size / (1024 * 1024), 2)} for size, path in report["largest_files"]],
+                use_container_width=True
+            )
+        with col2:
+            st.write("📁 Largest folders")
+            st.dataframe(
+                [{"Folder": path, "Size (MB)": round(size / (1024 * 1024), 2)} for size, path in report["largest_dirs"]],
+                use_container_width=True
+            )
         
-        speak(f"Storage used in {folder} is {storage_mb} megabytes")
+        announce_once(job, f"Storage used in {folder} is {storage_mb} megabytes")
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_sort_interface():
@@ -782,46 +3702,41 @@ def render_sort_interface():
         )
         
         if folder == "Custom":
-            custom_folder = input_with_mic("Custom folder path:", key="sort_custom")
-            folder = custom_folder
-            
-            if st.session_state.get("last_voice_update") == "sort_custom" and custom_folder:
-                st.session_state["last_voice_update"] = None
-                folder_path = get_full_path(custom_folder)
-                if folder_path and os.path.exists(folder_path):
-                    with st.spinner("Sorting files..."):
-                        files = sort_files_by_date(folder_path, newest_first=True)
-                    if files:
-                        st.success(f"Sorted {len(files)} files")
-                        st.dataframe(files, use_container_width=True)
-                        speak(f"Sorted {len(files)} files.")
-                        return
+            folder = input_with_mic("Custom folder path:", key="sort_custom")
     
     with col2:
         sort_order = st.radio("Sort order:", ["Newest First", "Oldest First"], key="sort_order")
+        if "sort_limit" not in st.session_state:
+            st.session_state.sort_limit = 0
+        sort_limit = st.number_input(
+            "Only show this many files (0 = all):",
+            min_value=0, step=10, key="sort_limit",
+            help="e.g. 20 for your latest 20 downloads - much faster on huge folders"
+        )
     
+    voice_triggered = False
+    if st.session_state.get("last_voice_update") == "sort_custom" and folder:
+        st.session_state["last_voice_update"] = None
+        voice_triggered = True
     if st.session_state.get("auto_trigger_sort") and folder:
         st.session_state["auto_trigger_sort"] = False # Reset
-        folder_path = get_full_path(folder)
-        if folder_path and os.path.exists(folder_path):
-            with st.spinner("Sorting files..."):
-                files = sort_files_by_date(folder_path, newest_first=(sort_order == "Newest First"))
-            if files:
-                st.success(f"Sorted {len(files)} files")
-                st.dataframe(files, use_container_width=True)
-                speak(f"Sorted {len(files)} files in {folder}.")
-                return
+        voice_triggered = True
 
-    if st.button("🔃 Sort Files", type="primary", use_container_width=True, key="sort_btn"):
+    if st.button("🔃 Sort Files", type="primary", use_container_width=True, key="sort_btn") or voice_triggered:
         folder_path = get_full_path(folder)
         
         if not folder_path or not os.path.exists(folder_path):
             st.error("Invalid folder path")
             return
         
-        with st.spinner("Sorting files..."):
-            files = sort_files_by_date(folder_path, newest_first=(sort_order == "Newest First"))
-        
+        newest_first = sort_order == "Newest First"
+        start_job("sort", "sort", f"Sort {folder}",
+                  lambda job: sort_files_by_date(folder_path, newest_first=newest_first, limit=sort_limit,
+                                                 progress=job.update, stop_event=job.cancel_event))
+    
+    job = session_job("sort")
+    if job and render_job_status(job):
+        files = job.result
         if files:
             st.success(f"Sorted {len(files)} files")
             st.dataframe(files, use_container_width=True)
@@ -833,10 +3748,10 @@ def render_sort_interface():
                 with col2:
                     st.info(f"📄 Last: {files[-1]['Name']}")
             
-            speak(f"Sorted {len(files)} files by date")
+            announce_once(job, f"Sorted {len(files)} files by date")
         else:
             st.info("No files found in the specified folder")
-            speak("No files found to sort")
+            announce_once(job, "No files found to sort")
     st.markdown('</div>', unsafe_allow_html=True)
 
 def render_dedupe_interface():
@@ -850,114 +3765,218 @@ def render_dedupe_interface():
     )
     
     if folder == "Custom":
-        custom_folder = input_with_mic("Custom folder path:", key="dedupe_custom")
-        folder = custom_folder
-        
-        if st.session_state.get("last_voice_update") == "dedupe_custom" and custom_folder:
-            st.session_state["last_voice_update"] = None
-            folder_path = get_full_path(custom_folder)
-            if folder_path and os.path.exists(folder_path):
-                with st.spinner("Scanning for duplicates..."):
-                    duplicates = op_dedupe(folder_path)
-                if duplicates:
-                    st.success(f"✅ Removed {len(duplicates)} duplicate files")
-                    speak(f"Removed {len(duplicates)} duplicate files")
-                else:
-                    st.info("🎉 No duplicate files found!")
-                    speak("No duplicate files found")
-                return
+        folder = input_with_mic("Custom folder path:", key="dedupe_custom")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        dedupe_mode = st.radio(
+            "What to do with duplicates:",
+            ["Move to Recycle Bin", "Replace with hard links", "Replace with reflinks"],
+            key="dedupe_mode",
+            help="Links keep every filename but store the data once"
+        )
+    with col2:
+        st.checkbox(
+            "💽 Low-memory mode",
+            key="dedupe_external",
+            help="For huge folders or whole disks - spills to disk and resumes if interrupted"
+        )
+        dry_run = st.checkbox("🔎 Dry run (only show what would happen)", key="dedupe_dry_run")
+    mode = {"Move to Recycle Bin": "trash", "Replace with hard links": "hardlink",
+            "Replace with reflinks": "reflink"}[dedupe_mode]
     
+    # voice se aaya command bhi sirf dhoondhta hai - trash / link Confirm ke baad hi
+    voice_triggered = False
+    if st.session_state.get("last_voice_update") == "dedupe_custom" and folder:
+        st.session_state["last_voice_update"] = None
+        voice_triggered = True
     if st.session_state.get("auto_trigger_dedupe") and folder:
         st.session_state["auto_trigger_dedupe"] = False # Reset
-        folder_path = get_full_path(folder)
-        if folder_path and os.path.exists(folder_path):
-            with st.spinner("Scanning for duplicates..."):
-                duplicates = op_dedupe(folder_path)
-            if duplicates:
-                st.success(f"✅ Removed {len(duplicates)} duplicate files")
-                speak(f"Removed {len(duplicates)} duplicate files in {folder}")
-            else:
-                st.info("🎉 No duplicate files found!")
-                speak("No duplicate files found")
-            return
-
-    if st.button("🚿 Clean Duplicates", type="primary", use_container_width=True, key="dedupe_btn"):
+        voice_triggered = True
+    
+    if st.button("🔍 Find Duplicates", type="primary", use_container_width=True, key="dedupe_btn") or voice_triggered:
         folder_path = get_full_path(folder)
         
         if not folder_path or not os.path.exists(folder_path):
             st.error("Invalid folder path")
+            if voice_triggered:
+                speak("Folder not found.", priority=URGENT, interrupt=True)
             return
         
-        with st.spinner("Scanning for duplicates..."):
-            duplicates = op_dedupe(folder_path)
-        
-        if duplicates:
-            st.success(f"✅ Removed {len(duplicates)} duplicate files")
-            st.dataframe(duplicates, use_container_width=True)
-            speak(f"Removed {len(duplicates)} duplicate files")
-        else:
+        external = st.session_state.get("dedupe_external")
+        def find(job):
+            stats, spill_path = {}, None
+            if external:
+                groups = find_duplicate_groups_external(folder_path, stop_event=job.cancel_event)
+                # low-memory mode mein plan bhi disk pe rehta hai
+                spill_path = os.path.join(APP_DATA_DIR, "dedupe", f"plan-{job.id}.jsonl")
+                os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+            else:
+                groups = find_duplicate_groups(folder_path, progress=job.update, stop_event=job.cancel_event,
+                                               stats=stats)
+            job.update(stage="Planning")
+            plan = plan_dedupe(groups, stats, spill_path=spill_path)
+            if job.cancel_event.is_set():
+                # adhoora plan confirm ke liye nahi dikhate
+                if spill_path:
+                    os.remove(spill_path)
+                raise ScanCancelled()
+            report = None
+            if dry_run:
+                report = execute_dedupe_plan(plan, mode=mode, dry_run=True, stop_event=job.cancel_event)
+                if spill_path:
+                    os.remove(spill_path)
+            return plan, report, mode
+        st.session_state.pop("job_dedupe_run", None)
+        start_job("dedupe", "dedupe", f"Find duplicates in {folder}", find)
+    
+    job = session_job("dedupe")
+    if job and render_job_status(job):
+        plan, preview_report, planned_mode = job.result
+        if not plan["files"]:
             st.info("🎉 No duplicate files found!")
-            speak("No duplicate files found")
+            announce_once(job, "No duplicate files found")
+        else:
+            st.write(
+                f"Found {plan['groups']} groups of identical files, "
+                f"{plan['files']} duplicates using {plan['bytes'] / (1024 * 1024):.1f} MB (first one is kept):"
+            )
+            st.dataframe(
+                [{"Keep": a["keep"], "Duplicates": len(a["remove"]),
+                  "Remove": ", ".join(item["path"] for item in a["remove"])}
+                 for a in plan["actions"][:DEDUPE_PREVIEW_ACTIONS]],
+                use_container_width=True
+            )
+            if plan["groups"] > DEDUPE_PREVIEW_ACTIONS:
+                st.caption(f"Showing the first {DEDUPE_PREVIEW_ACTIONS} of {plan['groups']} groups")
+            
+            if preview_report is not None:
+                reclaimable_mb = preview_report["bytes_reclaimed"] / (1024 * 1024)
+                st.info(f"🔎 Dry run: {len(preview_report['done'])} files would be cleaned, "
+                        f"freeing {reclaimable_mb:.1f} MB")
+                announce_once(job, f"Dry run found {len(preview_report['done'])} duplicate files")
+            else:
+                announce_once(job, f"Found {plan['files']} duplicate files. Please confirm to clean them")
+                run_job = session_job("dedupe_run")
+                if run_job is None:
+                    action = {"trash": "Move to Recycle Bin", "hardlink": "Replace with hard links",
+                              "reflink": "Replace with reflinks"}[planned_mode]
+                    # kuch bhi trash / link hone se pehle user ki haan chahiye
+                    st.warning(f"Nothing has been changed yet. {action}: {plan['files']} files, "
+                               f"{plan['bytes'] / (1024 * 1024):.1f} MB?")
+                    if st.button(f"✅ Confirm: {action}", type="primary", use_container_width=True,
+                                 key="dedupe_confirm_btn"):
+                        def clean(run):
+                            def on_progress(done, total, reclaimed):
+                                run.update(stage="Cleaning duplicates", done=done, total=total,
+                                           bytes_reclaimed=reclaimed)
+                            return op_dedupe(plan, mode=planned_mode, progress=on_progress,
+                                             stop_event=run.cancel_event)
+                        start_job("dedupe_run", "dedupe", f"Clean duplicates in {folder}", clean)
+                        st.rerun()
+                elif render_job_status(run_job):
+                    report = run_job.result
+                    reclaimed_mb = report["bytes_reclaimed"] / (1024 * 1024)
+                    st.success(f"✅ Cleaned {len(report['done'])} duplicate files, reclaimed {reclaimed_mb:.1f} MB")
+                    announce_once(run_job, f"Removed {len(report['done'])} duplicate files")
+                    if run_job.status == "cancelled" and report["done"]:
+                        with st.expander(f"Files already {'trashed' if planned_mode == 'trash' else 'linked'}"):
+                            st.dataframe([{"File": p} for p in report["done"]], use_container_width=True)
+                    if report["failed"]:
+                        st.warning(f"{len(report['failed'])} files could not be processed")
+                        st.dataframe([{"File": p, "Error": e} for p, e in report["failed"]],
+                                     use_container_width=True)
+                    if report["skipped"]:
+                        st.caption(f"{len(report['skipped'])} files changed since the scan and were left alone")
+        
+        cache_stats = get_hash_cache().stats()
+        st.caption(
+            f"Hash cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+            f"{cache_stats['bytes_saved'] / (1024 * 1024):.1f} MB not re-read"
+        )
     st.markdown('</div>', unsafe_allow_html=True)
 
 # global voice command 
+VOICE_OPERATIONS = {
+    "upload": "Upload File", "batch_upload": "Upload File", "delete": "Delete File",
+    "rename": "Rename File", "show": "Show Files", "storage": "Check Storage",
+    "sort": "Sort Files", "dedupe": "Clean Duplicates",
+}
+
 def extract_folder_from_command(command):
     """Extracts folder name from command like 'in music' or 'in downloads'"""
-    command_lower = command.lower()
-    folders = ["downloads", "documents", "desktop", "pictures", "videos", "music"]
-    
-    for folder in folders:
-        if f"in {folder}" in command_lower or f"from {folder}" in command_lower:
-            return folder.capitalize()
-    return None
+    return parse_command(command).source
+
+def set_voice_field(key, value):
+    """Fill an input_with_mic field as if it had been spoken into"""
+    st.session_state[key] = value
+    st.session_state[f"{key}_input"] = value
+    st.session_state["last_voice_update"] = key
 
 def process_global_voice_command(command):
-    command_lower = command.lower()
-    folder_context = extract_folder_from_command(command)
+    cmd = parse_command(command)
+    if cmd.intent is None:
+        return f"Switched to {st.session_state.manual_operation}"
+    st.session_state.manual_operation = VOICE_OPERATIONS[cmd.intent]
     
-    if "upload" in command_lower:
-        st.session_state.manual_operation = "Upload File"
-        match = re.search(r'upload\s+([a-zA-Z0-9_\-\s]+\.\w{2,4})', command_lower)
-        if match:
-            st.session_state.upload_filename = match.group(1)
-            st.session_state.upload_filename_input = match.group(1)
-            st.session_state["last_voice_update"] = "upload_filename"
-        if folder_context:
-            st.session_state.upload_dest = folder_context
+    if cmd.intent == "batch_upload":
+        st.session_state.batch_filter = cmd.filter_text
+        if cmd.source:
+            st.session_state.batch_source = cmd.source
+        if cmd.destination:
+            st.session_state.batch_dest = cmd.destination
+        st.session_state["auto_trigger_batch"] = bool(cmd.source and cmd.destination)
+        
+    elif cmd.intent == "upload":
+        if cmd.destination:
+            st.session_state.upload_dest = cmd.destination
+        if len(cmd.files) > 1 and cmd.destination:
+            # kai files ek saath - ek hi job, ek hi result
+            files, destination = list(cmd.files), cmd.destination
+            def upload_files(job):
+                results = [op_upload(name, destination, stop_event=job.cancel_event) for name in files]
+                failed = [message for ok, message in results if not ok]
+                message = f"Moved {len(files) - len(failed)} of {len(files)} files to {destination}"
+                return not failed, message + ("" if not failed else f" ({'; '.join(failed)})")
+            start_job("upload", "upload", f"Upload {len(files)} files", upload_files)
+        elif cmd.files:
+            set_voice_field("upload_filename", cmd.files[0])
+        elif cmd.batch:
+            return "Which files? Try 'Upload all PDFs from Downloads to Documents'"
             
-    elif "delete" in command_lower or "remove" in command_lower:
-        st.session_state.manual_operation = "Delete File"
-        match = re.search(r'(delete|remove)\s+([a-zA-Z0-9_\-\s]+\.\w{2,4})', command_lower)
-        if match:
-            st.session_state.delete_filename = match.group(2)
-            st.session_state.delete_filename_input = match.group(2)
-            st.session_state["last_voice_update"] = "delete_filename"
+    elif cmd.intent == "delete":
+        if cmd.files:
+            set_voice_field("delete_filename", cmd.files[0])
             
-    elif "rename" in command_lower:
-        st.session_state.manual_operation = "Rename File"
+    elif cmd.intent == "rename":
+        if cmd.new_name:
+            st.session_state.rename_new = cmd.new_name
+            st.session_state.rename_new_input = cmd.new_name
+        if cmd.files:
+            set_voice_field("rename_old", cmd.files[0])
         
-    elif "show" in command_lower or "list" in command_lower:
-        st.session_state.manual_operation = "Show Files"
-        if folder_context:
-            st.session_state.show_folder = folder_context
+    elif cmd.intent == "show":
+        if cmd.source:
+            st.session_state.show_folder = cmd.source
             st.session_state["auto_trigger_show"] = True
         
-    elif "storage" in command_lower:
-        st.session_state.manual_operation = "Check Storage"
-        if folder_context:
-            st.session_state.storage_folder = folder_context
+    elif cmd.intent == "storage":
+        if cmd.source:
+            st.session_state.storage_folder = cmd.source
             st.session_state["auto_trigger_storage"] = True
         
-    elif "sort" in command_lower or "short" in command_lower:
-        st.session_state.manual_operation = "Sort Files"
-        if folder_context:
-            st.session_state.sort_folder = folder_context
+    elif cmd.intent == "sort":
+        if cmd.count:
+            st.session_state.sort_limit = cmd.count
+        if cmd.order:
+            st.session_state.sort_order = "Oldest First" if cmd.order == "oldest" else "Newest First"
+        if cmd.source:
+            st.session_state.sort_folder = cmd.source
             st.session_state["auto_trigger_sort"] = True
         
-    elif "duplicate" in command_lower or "dedupe" in command_lower:
-        st.session_state.manual_operation = "Clean Duplicates"
-        if folder_context:
-            st.session_state.dedupe_folder = folder_context
+    elif cmd.intent == "dedupe":
+        if cmd.source:
+            st.session_state.dedupe_folder = cmd.source
             st.session_state["auto_trigger_dedupe"] = True
         
     return f"Switched to {st.session_state.manual_operation}"
@@ -979,11 +3998,49 @@ def main():
                 time.sleep(1)
                 st.rerun()
         
-        st.info("Try saying: 'Show storage in Music' or 'Upload report.pdf to Documents'")
+        if get_capture_service().available:
+            if st.checkbox("🎧 Always listening", key="always_listen",
+                           help="Keeps the mic open - say 'Echo' and then your command, no click needed"):
+                service = get_capture_service()
+                if service.start(current_session_id()):
+                    st.caption("Say: 'Echo, show files in Music'")
+                    poll_voice_commands()
+                elif service.running:
+                    st.caption("The microphone is in use by another session")
+                else:
+                    st.caption("Could not open the microphone")
+            elif get_capture_service().running:
+                get_capture_service().stop(current_session_id())
+        if st.session_state.get("wake_command"):
+            st.markdown(f'<div class="voice-log">🗣️ "{st.session_state.wake_command}"</div>', unsafe_allow_html=True)
+            st.success(st.session_state.wake_result)
+            st.session_state.wake_command = None
+        
+        st.info("Try saying: 'Show storage in Music', 'Upload report.pdf to Documents' or 'Upload all PDFs from Downloads to Documents'")
         
         st.markdown("---")
         st.markdown('<div class="sidebar-header">⚙️ Controls</div>', unsafe_allow_html=True)
         
+        if InotifyWatcher.available():
+            if st.checkbox("👁️ Live file watching", key="live_file_watch",
+                           help="Keep the file index updated in the background"):
+                watcher = get_file_watcher()
+                if watcher is None:
+                    st.caption("Live watching could not be started")
+                elif watcher.truncated:
+                    st.caption(f"Watching {len(watcher.wd_paths)} folders (limit reached)")
+                else:
+                    st.caption(f"Watching {len(watcher.wd_paths)} folders")
+        
+        render_jobs_panel()
+        
+        lookup_stats = get_lookup_cache().stats()
+        if lookup_stats["hits"] or lookup_stats["misses"]:
+            st.caption(
+                f"Lookup cache: {lookup_stats['hit_rate']:.0%} hit rate "
+                f"({lookup_stats['hits']} hits, {lookup_stats['misses']} misses, {lookup_stats['entries']} names)"
+            )
+        
         if st.button("🔄 Reset Session", key="reset_btn", use_container_width=True):
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
@@ -0,0 +1,333 @@
+import os, re, sys, json, time
+
+# voice command -> structured Command, without the if/elif substring chain
+
+FOLDERS = ["downloads", "documents", "desktop", "pictures", "videos", "music"]
+
+FILE_TYPE_ALIASES = {
+    "pdf": [".pdf"], "pdfs": [".pdf"],
+    "photo": [".jpg", ".jpeg", ".png", ".gif", ".heic", ".webp", ".bmp"],
+    "image": [".jpg", ".jpeg", ".png", ".gif", ".heic", ".webp", ".bmp", ".svg"],
+    "picture": [".jpg", ".jpeg", ".png", ".gif", ".heic", ".webp", ".bmp"],
+    "video": [".mp4", ".mkv", ".mov", ".avi", ".webm"],
+    "movie": [".mp4", ".mkv", ".mov", ".avi", ".webm"],
+    "song": [".mp3", ".wav", ".flac", ".m4a", ".ogg", ".aac"],
+    "music": [".mp3", ".wav", ".flac", ".m4a", ".ogg", ".aac"],
+    "audio": [".mp3", ".wav", ".flac", ".m4a", ".ogg", ".aac"],
+    "document": [".pdf", ".doc", ".docx", ".txt", ".odt", ".rtf", ".xls", ".xlsx", ".ppt", ".pptx"],
+    "doc": [".doc", ".docx"],
+    "spreadsheet": [".xls", ".xlsx", ".csv", ".ods"],
+    "presentation": [".ppt", ".pptx", ".odp"],
+    "zip": [".zip", ".rar", ".7z", ".tar", ".gz"],
+    "archive": [".zip", ".rar", ".7z", ".tar", ".gz"],
+    "text": [".txt", ".md"],
+}
+# extensions that can be said on their own - "all PNGs", "mp3s", "jpg files"
+BARE_EXTENSIONS = sorted({ext[1:] for exts in FILE_TYPE_ALIASES.values() for ext in exts}
+                         | {"csv", "json", "xml", "html", "log", "exe", "iso", "apk", "epub"})
+
+def extensions_for(word):
+    """Extensions a spoken file type stands for - alias or bare extension, plural or not; None if unknown"""
+    word = word.lower().lstrip(".")
+    for candidate in (word, word[:-1] if word.endswith("s") else None):
+        if candidate in FILE_TYPE_ALIASES:
+            return list(FILE_TYPE_ALIASES[candidate])
+        if candidate in BARE_EXTENSIONS:
+            return ["." + candidate]
+    return None
+
+# intent -> (priority, phrases); jab do verbs milen to bada priority jeetega,
+# e.g. "remove duplicates" dedupe hai delete nahi, "show storage" storage hai
+INTENT_PHRASES = {
+    "dedupe": (6, ["duplicate", "duplicates", "dedupe", "deduplicate", "clean up", "cleanup", "clean duplicates"]),
+    "storage": (5, ["storage", "disk usage", "space", "how much space", "size of"]),
+    "rename": (4, ["rename", "change the name", "change name"]),
+    "upload": (4, ["upload", "move", "transfer", "send"]),
+    "delete": (3, ["delete", "remove", "trash", "erase", "get rid of"]),
+    "sort": (2, ["sort", "short", "arrange", "latest", "newest", "recent", "oldest", "most recent"]),
+    "show": (1, ["show", "list", "display", "show me", "what is in", "whats in"]),
+}
+
+PREPOSITIONS = {
+    "from": "source", "in": "source", "inside": "source", "of": "source",
+    "to": "destination", "into": "destination", "in to": "destination",
+    "as": "new_name", "named": "new_name", "called": "new_name",
+}
+ORDERS = {"latest": "newest", "newest": "newest", "recent": "newest", "most recent": "newest",
+          "oldest": "oldest", "earliest": "oldest"}
+QUANTIFIERS = ["all", "every", "all the", "all my", "all of the", "all of my"]
+NUMBER_WORDS = {w: i for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen twenty".split())}
+NUMBER_WORDS.update({"thirty": 30, "forty": 40, "fifty": 50, "hundred": 100})
+FILLER = {"the", "a", "an", "my", "file", "files", "please", "folder", "me", "for", "and", "this", "that"}
+
+# precompiled patterns
+_SPOKEN_DOT = re.compile(r"(\w)\s*(?:\bdot\b|\.)\s+([a-z0-9]{1,8})\b")
+_TOKEN = re.compile(r"[\w\-\*\?\[\]]+(?:\.[\w\-\*\?]+)*")
+_FILENAME = re.compile(r"^[^.\s][\w\-]*(?:\.[\w\-]+)*\.(?=[a-z0-9]*[a-z])[a-z0-9]{1,8}$")
+_GLOB = re.compile(r"[\*\?\[]")
+# words that end a filename when walking back from name.ext
+_NAME_STOPS = FILLER | {w for w in PREPOSITIONS if " " not in w} | {w for w in QUANTIFIERS if " " not in w}
+# explicit file verbs beat storage / show once a file was named
+_FILE_VERBS = ("delete", "upload", "rename")
+
+class KeywordTrie:
+    """Word-level trie, longest phrase wins at each position"""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, phrase, kind, value):
+        node = self.root
+        for word in phrase.split():
+            node = node.setdefault(word, {})
+        node.setdefault(None, []).append((kind, value))
+
+    def match(self, tokens, start):
+        """(length, [(kind, value)]) of the longest phrase starting at start"""
+        node, best = self.root, (0, None)
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if None in node:
+                best = (i - start + 1, node[None])
+        return best
+
+def _build_trie():
+    trie = KeywordTrie()
+    for intent, (priority, phrases) in INTENT_PHRASES.items():
+        for phrase in phrases:
+            trie.add(phrase, "verb", (priority, intent))
+    for folder in FOLDERS:
+        trie.add(folder, "folder", folder.capitalize())
+        trie.add(folder.rstrip("s"), "folder", folder.capitalize())
+    for word in list(FILE_TYPE_ALIASES) + [ext for ext in BARE_EXTENSIONS if ext not in FILE_TYPE_ALIASES]:
+        trie.add(word, "type", word)
+        if not word.endswith("s"):
+            trie.add(word + "s", "type", word)
+    for word, slot in PREPOSITIONS.items():
+        trie.add(word, "prep", slot)
+    for word, order in ORDERS.items():
+        trie.add(word, "order", order)
+    for word in QUANTIFIERS:
+        trie.add(word, "all", True)
+    for word, value in NUMBER_WORDS.items():
+        trie.add(word, "number", value)
+    return trie
+
+TRIE = _build_trie()
+
+class Command:
+    """Everything the engine understood from one transcript"""
+
+    __slots__ = ("text", "intent", "files", "source", "destination", "new_name",
+                 "count", "order", "extensions", "patterns", "filter_text", "batch")
+
+    def __init__(self, text):
+        self.text = text
+        self.intent = None
+        self.files = []
+        self.source = None
+        self.destination = None
+        self.new_name = None
+        self.count = None
+        self.order = None
+        self.extensions = []
+        self.patterns = []
+        self.filter_text = None
+        self.batch = False
+
+    def as_dict(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "text"}
+
+    def __repr__(self):
+        filled = {k: v for k, v in self.as_dict().items() if v not in (None, [], False)}
+        return f"Command({filled})"
+
+def normalise(text):
+    """'report dot pdf' / 'report. PDF' -> 'report.pdf', lower case, tokens"""
+    text = _SPOKEN_DOT.sub(r"\1.\2", text.lower().strip().replace("'", ""))
+    return [t.rstrip(".") if not _FILENAME.match(t) else t for t in _TOKEN.findall(text)]
+
+def _is(tokens, i, kind):
+    hits = TRIE.match(tokens, i)[1]
+    return bool(hits) and any(k == kind for k, _ in hits)
+
+def _filename_spans(tokens):
+    """
+    {start: end} for every name.ext token, start pulled back over the words
+    right before it - keywords and numbers included, so "space trip.jpg" or
+    "2024 report.pdf" stay whole. Fillers, prepositions and the sentence's
+    first verb end the name.
+    """
+    names = [i for i, token in enumerate(tokens)
+             if _FILENAME.match(token) and not _GLOB.search(token) and not _is(tokens, i, "folder")]
+    if not names:
+        return {}
+    first_verb_end = 0
+    for i in range(len(tokens)):
+        if _is(tokens, i, "verb"):
+            first_verb_end = i + TRIE.match(tokens, i)[0]
+            break
+    spans = {}
+    for end in names:
+        start = end
+        limit = first_verb_end if first_verb_end <= end else 0
+        while start > limit:
+            word = tokens[start - 1]
+            if word in _NAME_STOPS or _GLOB.search(word) or _FILENAME.match(word):
+                break
+            # "from downloads report.pdf" - folder right after a preposition is a slot
+            if start >= 2 and tokens[start - 2] in PREPOSITIONS and _is(tokens, start - 1, "folder"):
+                break
+            start -= 1
+        spans[start] = end
+    return spans
+
+def parse(text):
+    """
+    Transcript -> Command. Verbs, folders, file types, prepositions and
+    numbers come from one trie walk; filenames are tokens that look like
+    name.ext together with the words spoken right before them, even when
+    those are keywords or numbers.
+    """
+    command = Command(text)
+    tokens = normalise(text)
+    spans = _filename_spans(tokens)
+    best = (0, None)
+    verbs = []
+    pending_slot = None
+    name_words = []
+    types = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if _GLOB.search(token):
+            command.patterns.append(token)
+            name_words = []
+            i += 1
+            continue
+        if i in spans:
+            end = spans[i]
+            name = " ".join(tokens[i:end + 1])
+            name_words = []
+            if pending_slot == "new_name" or (pending_slot == "destination" and command.files
+                                             and best[1] == "rename"):
+                command.new_name = name
+            else:
+                command.files.append(name)
+            pending_slot = None
+            i = end + 1
+            continue
+        length, hits = TRIE.match(tokens, i)
+        if not hits:
+            if token.isdigit():
+                command.count = int(token)
+            elif token not in FILLER:
+                name_words.append(token)
+            else:
+                name_words = []
+            i += 1
+            continue
+        name_words = []
+        kinds = dict(hits)
+        if "prep" in kinds:
+            pending_slot = kinds["prep"]
+        elif "folder" in kinds and (pending_slot in ("source", "destination") or "type" not in kinds
+                                    or not command.batch):
+            slot = pending_slot if pending_slot in ("source", "destination") else None
+            if slot is None:
+                slot = "destination" if best[1] == "upload" and command.source else "source"
+            setattr(command, slot, kinds["folder"])
+            pending_slot = None
+        elif "type" in kinds:
+            types.append((" ".join(tokens[i:i + length]), kinds["type"]))
+        if "verb" in kinds:
+            verbs.append(kinds["verb"])
+            if kinds["verb"][0] > best[0]:
+                best = kinds["verb"]
+        if "order" in kinds:
+            command.order = kinds["order"]
+        if "all" in kinds:
+            command.batch = True
+        if "number" in kinds:
+            command.count = kinds["number"]
+        i += length
+    if command.files and best[1] in ("storage", "show"):
+        # "delete my space report.pdf folder" - file mila hai to delete hi sahi hai
+        explicit = [verb for verb in verbs if verb[1] in _FILE_VERBS]
+        if explicit:
+            best = max(explicit)
+    command.intent = best[1]
+    if name_words and (pending_slot == "new_name" or (pending_slot == "destination" and best[1] == "rename")):
+        # bina extension ka naya naam - "rename a.txt to budget"
+        command.new_name = " ".join(name_words)
+
+    if types or command.patterns:
+        extensions = set()
+        for _, alias in types:
+            extensions.update(extensions_for(alias))
+        command.extensions = sorted(extensions)
+        command.filter_text = " ".join([words for words, _ in types] + command.patterns)
+    if command.intent == "upload" and command.batch and (command.extensions or command.patterns):
+        command.intent = "batch_upload"
+    elif command.intent == "upload" and command.destination is None and command.source and command.files:
+        # "upload report.pdf in documents" - purana behaviour, folder hi destination hai
+        command.destination, command.source = command.source, None
+    if command.intent == "rename" and command.new_name is None and len(command.files) > 1:
+        command.new_name = command.files.pop()
+    return command
+
+# benchmark
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus.jsonl")
+
+def load_corpus(path=CORPUS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def evaluate(corpus, repeat=200):
+    """
+    Intent accuracy, exact slot accuracy (every expected slot matches) and
+    parse throughput over the corpus. Returns (stats, failures).
+    """
+    intent_ok = slots_ok = 0
+    failures = []
+    for case in corpus:
+        got = parse(case["text"]).as_dict()
+        expected = case["expect"]
+        if got["intent"] == expected.get("intent"):
+            intent_ok += 1
+        wrong = {k: (v, got.get(k)) for k, v in expected.items() if got.get(k) != v}
+        if not wrong:
+            slots_ok += 1
+        else:
+            failures.append((case["text"], wrong))
+    texts = [case["text"] for case in corpus]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            parse(text)
+    elapsed = time.perf_counter() - started
+    total = len(texts) * repeat
+    stats = {
+        "cases": len(corpus),
+        "intent_accuracy": intent_ok / len(corpus) if corpus else 0.0,
+        "slot_accuracy": slots_ok / len(corpus) if corpus else 0.0,
+        "parses_per_second": total / elapsed if elapsed else 0.0,
+        "microseconds_per_parse": elapsed / total * 1e6 if total else 0.0,
+    }
+    return stats, failures
+
+if __name__ == "__main__":
+    # python intents.py [corpus.jsonl]  |  python intents.py -p "upload all pdfs from downloads to documents"
+    if len(sys.argv) > 2 and sys.argv[1] == "-p":
+        print(parse(" ".join(sys.argv[2:])))
+        sys.exit(0)
+    stats, failures = evaluate(load_corpus(sys.argv[1] if len(sys.argv) > 1 else CORPUS_PATH))
+    for text, wrong in failures:
+        print(f"MISS {text!r}: " + ", ".join(f"{k} expected {e!r} got {g!r}" for k, (e, g) in wrong.items()))
+    print(f"{stats['cases']} cases, intent accuracy {stats['intent_accuracy']:.1%}, "
+          f"slot accuracy {stats['slot_accuracy']:.1%}, "
+          f"{stats['parses_per_second']:,.0f} parses/s ({stats['microseconds_per_parse']:.1f} us each)")
@@ -1,27 +1,38 @@
 import speech_recognition as sr
-import pyttsx3
 import os
-import shutil
 import time
+from speech import MicrophoneSource, CalibrationProfile, get_backend, listen
+from tts import SpeechWorker
+from transfer import move_path, format_progress, TransferError
 
-# Initialize text-to-speech engine
-engine = pyttsx3.init()
+# Initialize text-to-speech worker - baar baar bole jaane wale prompts disk se chalte hain
+tts_worker = SpeechWorker(phrases=[
+    "Please say a command: upload or exit.",
+    "Please say the full file path to upload.",
+    "Please say the destination folder path.",
+    "Sorry, I could not understand that.",
+    "File uploaded successfully.",
+    "Command not recognized. Please say upload or exit.",
+])
+# offline Vosk model agar installed hai, warna Google
+recognizer_backend = get_backend()
+voice_profile = CalibrationProfile()
 
 def speak(text):
-    """Speak the given text aloud"""
-    engine.say(text)
-    engine.runAndWait()
+    """Speak the given text aloud, waits so the mic doesn't hear it"""
+    done = tts_worker.say(text, max_age=None)
+    if done:
+        done.wait()
 
 def listen_command():
     """Listen to user's voice and convert it to text"""
-    r = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("🎤 Listening...")
-        r.pause_threshold = 1
-        audio = r.listen(source)
     try:
-        print("🧠 Recognizing...")
-        command = r.recognize_google(audio, language='en-in')
+        with MicrophoneSource() as source:
+            if not voice_profile.calibrated:
+                voice_profile.calibrate(source)
+            print("🎤 Listening...")
+            command = listen(source, recognizer_backend, timeout=None, phrase_time_limit=None,
+                             profile=voice_profile)
         print(f"🗣️ You said: {command}")
         return command.lower()
     except sr.UnknownValueError:
@@ -32,7 +43,7 @@ def listen_command():
         return ""
 
 def upload_file(source_path, dest_path):
-    """Move file from source to destination"""
+    """Move file from source to destination, resumes if a previous move was interrupted"""
     if not os.path.exists(source_path):
         speak("File not found. Please check the path.")
         print(f"❌ File not found: {source_path}")
@@ -40,9 +51,17 @@ def upload_file(source_path, dest_path):
     try:
         if not os.path.exists(dest_path):
             os.makedirs(dest_path)
-        shutil.move(source_path, dest_path)
+        started_at = time.monotonic()
+        def show_progress(done, total):
+            print(f"\r📦 {format_progress(done, total, started_at)}", end="", flush=True)
+        move_path(source_path, dest_path, progress=show_progress)
+        print()
         speak("File uploaded successfully.")
         print(f"✅ Moved {source_path} → {dest_path}")
+    except TransferError as e:
+        print()
+        speak("The copy could not be verified, the original file was kept.")
+        print(f"❌ Verification failed: {e}")
     except Exception as e:
         speak("Error while uploading the file.")
         print(f"❌ Error: {e}")
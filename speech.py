@@ -0,0 +1,631 @@
+import os, re, sys, abc, time, json, math, wave, queue, threading, collections
+from array import array
+import speech_recognition as sr
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+VOSK_MODEL_DIR = os.path.join(os.path.expanduser("~"), ".echo_file_assistant", "vosk-model")
+
+# audio sources - sab 16-bit mono PCM frames dete hain
+class MicrophoneSource:
+    """Live microphone through speech_recognition / PyAudio"""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, device_index=None):
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.mic = sr.Microphone(device_index=device_index, sample_rate=sample_rate,
+                                 chunk_size=self.frame_samples)
+        self.stream = None
+
+    def __enter__(self):
+        self.mic.__enter__()
+        self.stream = self.mic.stream
+        return self
+
+    def __exit__(self, *exc):
+        self.stream = None
+        return self.mic.__exit__(*exc)
+
+    def frames(self):
+        while self.stream is not None:
+            yield self.stream.read(self.frame_samples)
+
+class WavFileSource:
+    """
+    A WAV file standing in for the microphone, for benchmarks and headless
+    tests. With realtime=True frames are paced like a live device so
+    latency numbers mean the same thing as with a real mic.
+    """
+
+    def __init__(self, path, frame_ms=FRAME_MS, realtime=False):
+        self.path = path
+        self.realtime = realtime
+        with wave.open(path, "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: only 16-bit PCM WAV files are supported")
+            self.sample_rate = wav.getframerate()
+            channels = wav.getnchannels()
+            samples = array("h", wav.readframes(wav.getnframes()))
+        if sys.byteorder == "big":
+            samples.byteswap()
+        if channels > 1:
+            # stereo -> mono, pehla channel kaafi hai
+            samples = samples[::channels]
+        self.pcm = samples.tobytes()
+        self.frame_samples = self.sample_rate * frame_ms // 1000
+        self.duration = len(samples) / self.sample_rate
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def frames(self):
+        # mic jaisa - har frames() call wahin se aage padhta hai jahan pichla ruka
+        step = self.frame_samples * 2
+        started, start_offset = time.monotonic(), self.position
+        while self.position < len(self.pcm):
+            if self.realtime:
+                due = started + (self.position - start_offset) / 2 / self.sample_rate
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            frame = self.pcm[self.position:self.position + step]
+            self.position += step
+            yield frame
+
+class FileAudioDevice(WavFileSource):
+    """
+    Fake always-open input device for headless runs: plays a WAV file in
+    real time and then keeps producing silence (or loops) until stopped.
+    Point ECHO_FAKE_MIC at a WAV file to use it instead of the microphone.
+    """
+
+    def __init__(self, path, frame_ms=FRAME_MS, loop=False):
+        super().__init__(path, frame_ms=frame_ms, realtime=True)
+        self.loop = loop
+        self.closed = False
+
+    def __exit__(self, *exc):
+        self.closed = True
+        return False
+
+    def frames(self):
+        silence = bytes(self.frame_samples * 2)
+        frame_seconds = self.frame_samples / self.sample_rate
+        while not self.closed:
+            yield from super().frames()
+            if self.loop:
+                self.position = 0
+                continue
+            next_at = time.monotonic()
+            while not self.closed:
+                next_at += frame_seconds
+                time.sleep(max(0.0, next_at - time.monotonic()))
+                yield silence
+
+def open_input_device():
+    """Microphone, or the ECHO_FAKE_MIC file device when that is set"""
+    fake = os.environ.get("ECHO_FAKE_MIC")
+    if fake:
+        return FileAudioDevice(fake)
+    return MicrophoneSource()
+
+def frame_rms(frame):
+    samples = array("h", frame)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+# recognizer backends
+class RecognizerBackend(abc.ABC):
+    """
+    start(sample_rate) returns a decoder; decoder.accept(frame) is fed while
+    the user talks and decoder.finish() returns the transcript ("" if
+    nothing was understood).
+    """
+    name = "base"
+    offline = False
+
+    @abc.abstractmethod
+    def start(self, sample_rate):
+        """New decoder for one utterance"""
+
+    def recognize(self, pcm, sample_rate):
+        decoder = self.start(sample_rate)
+        decoder.accept(pcm)
+        return decoder.finish()
+
+class _BufferedDecoder:
+    def __init__(self, backend, sample_rate):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.chunks = []
+
+    def accept(self, frame):
+        self.chunks.append(frame)
+
+    def finish(self):
+        return self.backend.transcribe(b"".join(self.chunks), self.sample_rate)
+
+class GoogleBackend(RecognizerBackend):
+    """The old behaviour - whole utterance sent to Google once speech ends"""
+    name = "google"
+
+    def __init__(self, language="en-IN"):
+        self.language = language
+        self.recognizer = sr.Recognizer()
+
+    def start(self, sample_rate):
+        return _BufferedDecoder(self, sample_rate)
+
+    def transcribe(self, pcm, sample_rate):
+        try:
+            return self.recognizer.recognize_google(sr.AudioData(pcm, sample_rate, 2), language=self.language)
+        except sr.UnknownValueError:
+            return ""
+
+class _VoskDecoder:
+    def __init__(self, model, sample_rate):
+        import vosk
+        self.recognizer = vosk.KaldiRecognizer(model, sample_rate)
+        self.parts = []
+
+    def accept(self, frame):
+        # decoding yahin hota hai, bolte bolte - end pe sirf aakhri hissa bachta hai
+        if self.recognizer.AcceptWaveform(frame):
+            self.parts.append(json.loads(self.recognizer.Result()).get("text", ""))
+
+    def partial(self):
+        return json.loads(self.recognizer.PartialResult()).get("partial", "")
+
+    def finish(self):
+        self.parts.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return " ".join(p for p in self.parts if p).strip()
+
+class VoskBackend(RecognizerBackend):
+    """Offline streaming recognition with a local Vosk model (pip install vosk)"""
+    name = "vosk"
+    offline = True
+
+    def __init__(self, model_path=None):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self.model_path = model_path or os.environ.get("ECHO_VOSK_MODEL") or VOSK_MODEL_DIR
+        self.model = vosk.Model(self.model_path)
+
+    def start(self, sample_rate):
+        return _VoskDecoder(self.model, sample_rate)
+
+def vosk_available(model_path=None):
+    try:
+        import vosk  # noqa: F401
+    except ImportError:
+        return False
+    return os.path.isdir(model_path or os.environ.get("ECHO_VOSK_MODEL") or VOSK_MODEL_DIR)
+
+def get_backend(name=None):
+    """
+    ECHO_SPEECH_BACKEND=vosk|google|auto (default auto): the offline engine
+    whenever vosk and a model are installed, Google otherwise. The offline
+    engine needs `pip install vosk` plus a model unpacked to
+    ECHO_VOSK_MODEL (default ~/.echo_file_assistant/vosk-model); without it
+    the always-listening wake word mode is not offered.
+    """
+    name = (name or os.environ.get("ECHO_SPEECH_BACKEND") or "auto").lower()
+    if name == "vosk" or (name == "auto" and vosk_available()):
+        try:
+            return VoskBackend()
+        except Exception:
+            if name == "vosk":
+                raise
+    return GoogleBackend()
+
+# calibration + endpointing
+ENERGY_THRESHOLD = 300
+MIN_ENERGY_THRESHOLD = 100
+NOISE_RATIO = 1.5
+NOISE_ADAPT_RATE = 0.05
+PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".echo_file_assistant", "voice_profile.json")
+PROFILE_SAVE_INTERVAL = 30
+START_FRAMES = 2
+END_SILENCE_SECONDS = 0.2
+PRE_ROLL_FRAMES = 10
+
+class CalibrationProfile:
+    """
+    Background noise level kept across runs, so listening can start without
+    a fresh adjust_for_ambient_noise every time. Every non-speech frame nudges
+    the noise floor (moving average); the energy threshold follows it.
+    path=None keeps it in memory only.
+    """
+
+    def __init__(self, path=PROFILE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.noise_floor = None
+        self.energy_threshold = ENERGY_THRESHOLD
+        self.updated_at = 0.0
+        self.saved_at = 0.0
+        self.dirty = False
+        self.load()
+
+    @property
+    def calibrated(self):
+        return self.noise_floor is not None
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self.noise_floor = float(data["noise_floor"])
+            self.energy_threshold = float(data["energy_threshold"])
+            self.updated_at = float(data.get("updated_at", 0))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def save(self, force=False):
+        """Writes at most every PROFILE_SAVE_INTERVAL seconds unless forced"""
+        if not self.path or not self.dirty:
+            return
+        if not force and time.time() - self.saved_at < PROFILE_SAVE_INTERVAL:
+            return
+        with self.lock:
+            data = {"noise_floor": self.noise_floor, "energy_threshold": self.energy_threshold,
+                    "updated_at": self.updated_at}
+            self.dirty = False
+            self.saved_at = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def observe(self, rms, rate=NOISE_ADAPT_RATE):
+        """Feed the level of a frame that is known not to be speech"""
+        with self.lock:
+            if self.noise_floor is None:
+                self.noise_floor = rms
+            else:
+                self.noise_floor += (rms - self.noise_floor) * rate
+            self.energy_threshold = max(MIN_ENERGY_THRESHOLD, self.noise_floor * NOISE_RATIO)
+            self.updated_at = time.time()
+            self.dirty = True
+
+    def calibrate(self, source, duration=0.5):
+        """One-off measurement, only needed when there is no saved profile yet"""
+        levels = []
+        frames_needed = max(1, int(duration * source.sample_rate / source.frame_samples))
+        for frame in source.frames():
+            levels.append(frame_rms(frame))
+            if len(levels) >= frames_needed:
+                break
+        if levels:
+            self.observe(sum(levels) / len(levels), rate=1.0)
+            self.save(force=True)
+        return self.energy_threshold
+
+class EnergyVad:
+    """Speech = louder than the profile's threshold"""
+
+    def __init__(self, profile):
+        self.profile = profile
+
+    def is_speech(self, frame):
+        rms = frame_rms(frame)
+        if rms > self.profile.energy_threshold:
+            return True
+        self.profile.observe(rms)
+        return False
+
+class WebRtcVad:
+    """webrtcvad (pip install webrtcvad) for 10/20/30 ms frames, still keeps the profile fresh"""
+
+    def __init__(self, profile, sample_rate, aggressiveness=2):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.profile = profile
+        self.sample_rate = sample_rate
+
+    def is_speech(self, frame):
+        try:
+            speech = self.vad.is_speech(frame, self.sample_rate)
+        except Exception:
+            # adhoora aakhri frame - energy se decide
+            return frame_rms(frame) > self.profile.energy_threshold
+        if not speech:
+            self.profile.observe(frame_rms(frame))
+        return speech
+
+def make_vad(profile, sample_rate, frame_ms=FRAME_MS):
+    if sample_rate in (8000, 16000, 32000, 48000) and frame_ms in (10, 20, 30):
+        try:
+            return WebRtcVad(profile, sample_rate)
+        except ImportError:
+            pass
+    return EnergyVad(profile)
+
+def listen(source, backend, timeout=5, phrase_time_limit=8, profile=None, vad=None,
+           pause_seconds=END_SILENCE_SECONDS, on_partial=None):
+    """
+    Wait up to timeout seconds for speech, stream it into the backend while
+    it lasts and return the transcript pause_seconds after the speaker
+    stops. Raises sr.WaitTimeoutError / sr.UnknownValueError like
+    Recognizer.listen + recognize_* did, so callers keep their except clauses.
+    """
+    profile = profile or CalibrationProfile(path=None)
+    vad = vad or make_vad(profile, source.sample_rate)
+    frame_seconds = source.frame_samples / source.sample_rate
+    decoder = None
+    pre_roll = []
+    run = 0
+    waited = spoken = silence = 0.0
+    for frame in source.frames():
+        speech = vad.is_speech(frame)
+        if decoder is None:
+            waited += frame_seconds
+            pre_roll = (pre_roll + [frame])[-PRE_ROLL_FRAMES:]
+            # ek akela click speech nahi hai - START_FRAMES lagaataar chahiye
+            run = run + 1 if speech else 0
+            if run >= START_FRAMES:
+                decoder = backend.start(source.sample_rate)
+                for buffered in pre_roll:
+                    decoder.accept(buffered)
+            elif timeout and waited >= timeout:
+                profile.save()
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+            continue
+        decoder.accept(frame)
+        if on_partial and hasattr(decoder, "partial"):
+            on_partial(decoder.partial())
+        spoken += frame_seconds
+        silence = 0.0 if speech else silence + frame_seconds
+        if silence >= pause_seconds or (phrase_time_limit and spoken >= phrase_time_limit):
+            break
+    profile.save()
+    if decoder is None:
+        raise sr.WaitTimeoutError("audio ended before any speech")
+    text = decoder.finish()
+    if not text:
+        raise sr.UnknownValueError()
+    return text
+
+# always-on capture
+WAKE_WORDS = ("hey echo", "ok echo", "okay echo", "echo")
+WAKE_ARM_SECONDS = 5
+RING_SECONDS = 10
+# owner ne itni der commands nahi uthaye to tab band ho chuka hai, koi aur le sakta hai
+OWNER_IDLE_SECONDS = 5
+MAX_UTTERANCE_SECONDS = 10
+
+class RingBuffer:
+    """Last N seconds of frames; older audio falls off the front"""
+
+    def __init__(self, max_frames):
+        self.frames = collections.deque(maxlen=max_frames)
+        self.lock = threading.Lock()
+
+    def append(self, frame):
+        with self.lock:
+            self.frames.append(frame)
+
+    def last(self, count):
+        with self.lock:
+            return list(self.frames)[-count:] if count else []
+
+    def pcm(self):
+        with self.lock:
+            return b"".join(self.frames)
+
+def strip_wake_word(text, wake_words=WAKE_WORDS):
+    """'hey echo show files' -> (True, 'show files'); no wake word -> (False, text)"""
+    words = re.sub(r"[^\w\s.\-]", " ", text.lower()).split()
+    for wake in wake_words:
+        wake_parts = wake.split()
+        if words[:len(wake_parts)] == wake_parts:
+            return True, " ".join(words[len(wake_parts):])
+    return False, text
+
+class CaptureService:
+    """
+    Keeps the input device open in a background thread. Every frame goes
+    into a ring buffer; the VAD cuts utterances, which are decoded with the
+    pre-roll from the ring buffer so the first syllable is never lost.
+    Utterances that start with the wake word (or follow a bare wake word
+    within WAKE_ARM_SECONDS) land on the commands queue, which only the
+    owner that started the service (one browser session) may drain.
+    next_utterance() grabs the next one without a wake word, for
+    push-to-talk buttons. Needs an offline backend - nothing is sent
+    anywhere until woken.
+    """
+
+    def __init__(self, backend, profile=None, source_factory=open_input_device,
+                 wake_words=WAKE_WORDS, pre_roll_seconds=0.5, ring_seconds=RING_SECONDS):
+        self.backend = backend
+        self.profile = profile or CalibrationProfile(path=None)
+        self.source_factory = source_factory
+        self.wake_words = wake_words
+        self.pre_roll_seconds = pre_roll_seconds
+        self.ring_seconds = ring_seconds
+        self.ring = None
+        self.commands = queue.Queue()
+        self.owner = None
+        self.owner_seen = 0.0
+        self.direct = queue.Queue()
+        self.direct_waiting = 0
+        self.lock = threading.Lock()
+        self.armed_until = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+        self.utterances = 0
+
+    @property
+    def available(self):
+        return getattr(self.backend, "offline", False)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, owner=None):
+        """Start capturing for owner, False when the mic is off or another owner has it"""
+        now = time.monotonic()
+        if self.running and self.owner != owner and now - self.owner_seen < OWNER_IDLE_SECONDS:
+            return False
+        if not self.running and not self.available:
+            return False
+        self.owner, self.owner_seen = owner, now
+        while True:
+            # pichle owner ke bache commands naye wale ko na milein
+            try:
+                self.commands.get_nowait()
+            except queue.Empty:
+                break
+        if self.running:
+            return True
+        self.stop_event.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name="voice-capture", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self, owner=None):
+        if self.running and self.owner != owner:
+            return
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        self.thread = None
+        self.owner = None
+        self.profile.save(force=True)
+
+    def take_commands(self, owner=None):
+        """Wake-word commands heard so far, only for the owner that started capture"""
+        heard = []
+        if owner != self.owner:
+            return heard
+        self.owner_seen = time.monotonic()
+        while True:
+            try:
+                heard.append(self.commands.get_nowait())
+            except queue.Empty:
+                return heard
+
+    def next_utterance(self, timeout=5):
+        """Transcript of the next thing said, wake word or not"""
+        with self.lock:
+            self.direct_waiting += 1
+        try:
+            return self.direct.get(timeout=timeout)
+        except queue.Empty:
+            with self.lock:
+                # _handle ne timeout aur is lock ke beech text daal diya ho sakta hai
+                try:
+                    return self.direct.get_nowait()
+                except queue.Empty:
+                    self.direct_waiting = max(0, self.direct_waiting - 1)
+            raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+    def _handle(self, text):
+        with self.lock:
+            if self.direct_waiting:
+                self.direct_waiting -= 1
+                self.direct.put(text)
+                return
+        woken, rest = strip_wake_word(text, self.wake_words)
+        now = time.monotonic()
+        if woken and not rest:
+            # sirf "echo" bola - agla utterance command hai
+            self.armed_until = now + WAKE_ARM_SECONDS
+        elif woken:
+            self.commands.put(rest)
+        elif now < self.armed_until:
+            self.armed_until = 0.0
+            self.commands.put(text)
+
+    def _run(self):
+        try:
+            with self.source_factory() as source:
+                frame_seconds = source.frame_samples / source.sample_rate
+                self.ring = RingBuffer(int(self.ring_seconds / frame_seconds))
+                pre_roll = max(1, int(self.pre_roll_seconds / frame_seconds))
+                vad = make_vad(self.profile, source.sample_rate)
+                decoder, run, silence, spoken = None, 0, 0.0, 0.0
+                for frame in source.frames():
+                    if self.stop_event.is_set():
+                        break
+                    self.ring.append(frame)
+                    speech = vad.is_speech(frame)
+                    if decoder is None:
+                        run = run + 1 if speech else 0
+                        if run >= START_FRAMES:
+                            decoder = self.backend.start(source.sample_rate)
+                            for buffered in self.ring.last(pre_roll):
+                                decoder.accept(buffered)
+                            silence = spoken = 0.0
+                        continue
+                    decoder.accept(frame)
+                    spoken += frame_seconds
+                    silence = 0.0 if speech else silence + frame_seconds
+                    if silence >= END_SILENCE_SECONDS or spoken >= MAX_UTTERANCE_SECONDS:
+                        text = decoder.finish()
+                        decoder, run = None, 0
+                        self.utterances += 1
+                        if text:
+                            self._handle(text)
+                        self.profile.save()
+        except Exception as e:
+            self.error = str(e)
+
+def benchmark(paths, backend=None, realtime=True):
+    """
+    Recognise each WAV file as if it were spoken live. end_latency is the
+    time from the last audio frame to the transcript - the wait the user
+    actually feels.
+    """
+    backend = backend or get_backend()
+    results = []
+    for path in paths:
+        source = WavFileSource(path, realtime=realtime)
+        decoder = backend.start(source.sample_rate)
+        started = time.monotonic()
+        for frame in source.frames():
+            decoder.accept(frame)
+        audio_done = time.monotonic()
+        text = decoder.finish()
+        finished = time.monotonic()
+        results.append({
+            "file": path, "text": text, "audio_seconds": round(source.duration, 3),
+            "end_latency": round(finished - audio_done, 3),
+            "real_time_factor": round((finished - started) / source.duration, 3) if source.duration else None,
+        })
+    return results
+
+if __name__ == "__main__":
+    # python speech.py [--backend vosk|google] [--fast] file1.wav file2.wav ...
+    args = sys.argv[1:]
+    backend_name = None
+    if "--backend" in args:
+        i = args.index("--backend")
+        backend_name = args[i + 1]
+        del args[i:i + 2]
+    realtime = "--fast" not in args
+    files = [a for a in args if a != "--fast"]
+    if not files:
+        print("usage: python speech.py [--backend vosk|google] [--fast] file.wav ...")
+        sys.exit(1)
+    backend = get_backend(backend_name)
+    print(f"backend: {backend.name}")
+    for row in benchmark(files, backend, realtime=realtime):
+        print(f"{row['file']}: {row['end_latency'] * 1000:.0f} ms after audio end, "
+              f"RTF {row['real_time_factor']}, text={row['text']!r}")
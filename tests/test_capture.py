@@ -0,0 +1,72 @@
+import threading, time
+
+import pytest
+import speech_recognition as sr
+
+import speech
+from speech import CaptureService
+
+class SilentSource:
+    sample_rate = 16000
+    frame_samples = 480
+
+    def __init__(self, stop_event):
+        self.stop_event = stop_event
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def frames(self):
+        while not self.stop_event.is_set():
+            time.sleep(0.01)
+            yield b"\0\0" * self.frame_samples
+
+class OfflineBackend:
+    offline = True
+    name = "test"
+
+@pytest.fixture
+def service():
+    stop = threading.Event()
+    service = CaptureService(OfflineBackend(), source_factory=lambda: SilentSource(stop))
+    yield service
+    stop.set()
+    service.stop(service.owner)
+
+def test_commands_go_only_to_the_session_that_enabled_capture(service):
+    assert service.start("tab-a")
+    assert not service.start("tab-b")
+    service._handle("echo show files in music")
+    assert service.take_commands("tab-b") == []
+    assert service.take_commands("tab-a") == ["show files in music"]
+    service.stop("tab-b")
+    assert service.running
+
+def test_idle_owner_can_be_taken_over(service, monkeypatch):
+    assert service.start("tab-a")
+    service._handle("echo delete report.pdf")
+    monkeypatch.setattr(service, "owner_seen", time.monotonic() - speech.OWNER_IDLE_SECONDS - 1)
+    assert service.start("tab-b")
+    # band tab ke purane commands naye owner ko nahi milte
+    assert service.take_commands("tab-b") == []
+
+def test_utterance_arriving_at_timeout_is_not_lost(service, monkeypatch):
+    real_get = service.direct.get
+
+    def timed_out(block=True, timeout=None):
+        if not block:
+            return real_get(block=False)
+        # get() timeout ho gaya, lock lene se pehle text aa gaya
+        service._handle("show storage")
+        raise speech.queue.Empty
+
+    monkeypatch.setattr(service.direct, "get", timed_out)
+    assert service.next_utterance(timeout=0) == "show storage"
+    assert service.direct_waiting == 0
+    monkeypatch.setattr(service.direct, "get", real_get)
+    with pytest.raises(sr.WaitTimeoutError):
+        service.next_utterance(timeout=0)
+    assert service.direct_waiting == 0
@@ -0,0 +1,113 @@
+import os
+
+import finalcode
+from finalcode import (HashCache, execute_dedupe_plan, find_duplicate_groups, get_snapshot_store, op_dedupe,
+                       plan_dedupe)
+
+def write(path, data, mtime=None):
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+def test_finds_identical_files(tmp_path):
+    cache = HashCache(str(tmp_path / "cache" / "hashes.db"))
+    folder = tmp_path / "files"
+    folder.mkdir()
+    write(folder / "a.txt", b"same" * 100)
+    write(folder / "b.txt", b"same" * 100)
+    write(folder / "c.txt", b"diff" * 100)
+    assert find_duplicate_groups(str(folder), cache=cache) == [[str(folder / "a.txt"), str(folder / "b.txt")]]
+
+def test_in_place_edit_is_not_served_from_stale_snapshot(tmp_path):
+    cache = HashCache(str(tmp_path / "cache" / "hashes.db"))
+    folder = tmp_path / "files"
+    folder.mkdir()
+    a, b = folder / "a.txt", folder / "b.txt"
+    write(a, b"same" * 100, mtime=1_000_000_000_000_000_000)
+    write(b, b"same" * 100, mtime=1_000_000_000_000_000_000)
+    get_snapshot_store().invalidate()
+    assert len(find_duplicate_groups(str(folder), cache=cache)) == 1
+    dir_mtime = os.stat(folder).st_mtime_ns
+
+    # same size, new content, folder mtime unchanged - the snapshot is still "fresh"
+    write(b, b"edit" * 100, mtime=1_000_000_000_500_000_000)
+    os.utime(folder, ns=(dir_mtime, dir_mtime))
+    assert find_duplicate_groups(str(folder), cache=cache) == []
+
+def test_plan_uses_the_stat_files_were_hashed_under(tmp_path):
+    cache = HashCache(str(tmp_path / "cache" / "hashes.db"))
+    folder = tmp_path / "files"
+    folder.mkdir()
+    write(folder / "a.txt", b"same" * 100)
+    write(folder / "b.txt", b"same" * 100)
+    get_snapshot_store().invalidate()
+    stats = {}
+    groups = find_duplicate_groups(str(folder), cache=cache, stats=stats)
+    write(folder / "b.txt", b"edit" * 100, mtime=1_000_000_000_000_000_000)
+    plan = plan_dedupe(groups, stats)
+    assert plan["actions"][0]["remove"][0]["mtime_ns"] == stats[str(folder / "b.txt")].st_mtime_ns
+
+def test_changed_keep_file_is_never_linked(tmp_path):
+    cache = HashCache(str(tmp_path / "cache" / "hashes.db"))
+    folder = tmp_path / "files"
+    folder.mkdir()
+    for name in ("a.txt", "b.txt", "c.txt"):
+        write(folder / name, b"same" * 100)
+    get_snapshot_store().invalidate()
+    stats = {}
+    groups = find_duplicate_groups(str(folder), cache=cache, stats=stats)
+    plan = plan_dedupe(iter(groups), stats, spill_path=str(tmp_path / "plan.jsonl"))
+    assert plan["files"] == 2
+
+    write(folder / "a.txt", b"edit" * 100, mtime=1_000_000_000_000_000_000)
+    report = execute_dedupe_plan(plan, mode="hardlink")
+    assert report["done"] == []
+    assert sorted(report["skipped"]) == [str(folder / "b.txt"), str(folder / "c.txt")]
+    assert (folder / "b.txt").read_bytes() == b"same" * 100
+
+def test_symlink_is_never_the_kept_copy(tmp_path):
+    cache = HashCache(str(tmp_path / "cache" / "hashes.db"))
+    folder = tmp_path / "files"
+    folder.mkdir()
+    write(folder / "z_real.txt", b"same" * 100)
+    write(folder / "y_copy.txt", b"same" * 100)
+    os.symlink(folder / "z_real.txt", folder / "a_link.txt")
+    get_snapshot_store().invalidate()
+    groups = find_duplicate_groups(str(folder), cache=cache)
+    assert groups == [[str(folder / "y_copy.txt"), str(folder / "z_real.txt")]]
+
+def test_op_dedupe_only_runs_a_given_plan_and_drops_its_spill_file(tmp_path):
+    cache = HashCache(str(tmp_path / "cache" / "hashes.db"))
+    folder = tmp_path / "files"
+    folder.mkdir()
+    write(folder / "a.txt", b"same" * 100)
+    write(folder / "b.txt", b"same" * 100)
+    stats = {}
+    groups = find_duplicate_groups(str(folder), cache=cache, stats=stats)
+    spill = tmp_path / "plan.jsonl"
+    plan = plan_dedupe(groups, stats, spill_path=str(spill))
+    # plan banane se kuch nahi badla
+    assert sorted(os.listdir(folder)) == ["a.txt", "b.txt"]
+    report = op_dedupe(plan, mode="hardlink")
+    assert report["done"] == [str(folder / "b.txt")]
+    assert os.stat(folder / "a.txt").st_ino == os.stat(folder / "b.txt").st_ino
+    assert not spill.exists()
+
+def test_linking_never_touches_a_user_file_with_the_temp_name(tmp_path, monkeypatch):
+    folder = tmp_path / "files"
+    folder.mkdir()
+    write(folder / "a.txt", b"same" * 100)
+    write(folder / "b.txt", b"same" * 100)
+    # purana fixed temp naam, ab user ki file hai
+    write(folder / "b.txt.echo-dedupe.tmp", b"mine")
+    taken = str(folder / ".b.txt.taken.echo-dedupe")
+    write(taken, b"also mine")
+    names = iter([taken])
+    real_name = finalcode._link_temp_name
+    monkeypatch.setattr(finalcode, "_link_temp_name", lambda path: next(names, None) or real_name(path))
+    finalcode._replace_with_link(str(folder / "a.txt"), str(folder / "b.txt"), reflink=False)
+    assert os.stat(folder / "a.txt").st_ino == os.stat(folder / "b.txt").st_ino
+    assert (folder / "b.txt.echo-dedupe.tmp").read_bytes() == b"mine"
+    assert open(taken, "rb").read() == b"also mine"
+    assert sorted(os.listdir(folder)) == [".b.txt.taken.echo-dedupe", "a.txt", "b.txt", "b.txt.echo-dedupe.tmp"]
@@ -0,0 +1,82 @@
+import os
+
+import finalcode
+from finalcode import ExternalDedupe
+
+def make_folders(root):
+    """Three top-level folders, duplicates across them at two sizes, plus empties"""
+    expected = []
+    for size in (10, 20_000):
+        group = []
+        for folder in ("a", "b", "c"):
+            path = root / folder / f"dup{size}.bin"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(bytes([size % 251]) * size)
+            group.append(str(path))
+        expected.append(sorted(group))
+    for folder in ("a", "b", "c"):
+        (root / folder / f"unique-{folder}.bin").write_bytes(folder.encode() * 30)
+        (root / folder / "empty.txt").write_bytes(b"")
+    return sorted(expected)
+
+def stop_after(job, stop, condition):
+    real_save = job._save_checkpoint
+
+    def save():
+        real_save()
+        if condition(job.state):
+            stop.set()
+
+    job._save_checkpoint = save
+
+def test_finds_groups_and_skips_empty_files(tmp_path):
+    root = tmp_path / "disk"
+    expected = make_folders(root)
+    groups = sorted(ExternalDedupe(str(root), str(tmp_path / "work")).run())
+    assert groups == expected
+    with_empty = list(ExternalDedupe(str(root), str(tmp_path / "work2"), include_empty=True).run())
+    assert sorted(str(root / f / "empty.txt") for f in "abc") in with_empty
+
+def test_big_size_group_goes_through_disk_runs(tmp_path):
+    root = tmp_path / "disk"
+    expected = make_folders(root)
+    # har size group run_records se bada - partial runs disk pe
+    job = ExternalDedupe(str(root), str(tmp_path / "work"), run_records=2)
+    assert sorted(job.run()) == expected
+    assert not [name for name in os.listdir(tmp_path / "work") if name.startswith("part-")]
+
+def test_resumes_after_scan_checkpoint(tmp_path, monkeypatch):
+    root = tmp_path / "disk"
+    expected = make_folders(root)
+    work = str(tmp_path / "work")
+    stop = finalcode.threading.Event()
+    job = ExternalDedupe(str(root), work, run_records=2)
+    stop_after(job, stop, lambda state: state["phase"] == "scan" and len(state["done_units"]) >= 2)
+    assert list(job.run(stop)) == []
+    done = ExternalDedupe(str(root), work, run_records=2).state["done_units"]
+    assert done and str(root / "c") not in done
+
+    walked = []
+    real_scan_tree = finalcode.scan_tree
+    monkeypatch.setattr(finalcode, "scan_tree", lambda unit, **kw: walked.append(unit) or real_scan_tree(unit, **kw))
+    assert sorted(ExternalDedupe(str(root), work, run_records=2).run()) == expected
+    assert not set(walked) & set(done)
+
+def test_resumes_after_hash_checkpoint(tmp_path, monkeypatch):
+    root = tmp_path / "disk"
+    expected = make_folders(root)
+    work = str(tmp_path / "work")
+    stop = finalcode.threading.Event()
+    job = ExternalDedupe(str(root), work, run_records=2)
+    stop_after(job, stop, lambda state: state["phase"] == "hash" and state["hash_runs"])
+    assert list(job.run(stop)) == []
+    state = ExternalDedupe(str(root), work, run_records=2).state
+    assert state["phase"] == "hash" and state["hashed_through"] == 10
+
+    hashed = []
+    real_hash = finalcode.hash_file_cached
+    monkeypatch.setattr(finalcode, "hash_file_cached",
+                        lambda path, kind, **kw: hashed.append(path) or real_hash(path, kind, **kw))
+    assert sorted(ExternalDedupe(str(root), work, run_records=2).run()) == expected
+    # size 10 wala group dobara hash nahi hua
+    assert hashed and not any(path.endswith("dup10.bin") for path in hashed)
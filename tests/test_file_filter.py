@@ -0,0 +1,21 @@
+import pytest
+
+from finalcode import parse_file_filter
+
+@pytest.mark.parametrize("text, extensions", [
+    ("pngs", [".png"]),
+    ("mp3s", [".mp3"]),
+    ("jpg files", [".jpg"]),
+    ("pdf, PNGs and gifs", [".gif", ".pdf", ".png"]),
+    ("pdfs", [".pdf"]),
+    ("videos", [".avi", ".mkv", ".mov", ".mp4", ".webm"]),
+    # unknown words are extensions as is - no 's' stripped
+    ("js", [".js"]),
+    ("ts", [".ts"]),
+    (".cs", [".cs"]),
+])
+def test_parse_file_filter_extensions(text, extensions):
+    assert parse_file_filter(text) == ([], extensions)
+
+def test_parse_file_filter_keeps_globs():
+    assert parse_file_filter("report_*, *.log") == (["report_*", "*.log"], [])
@@ -0,0 +1,46 @@
+import os
+
+import finalcode
+from finalcode import FileIndex, TrigramIndex
+
+def test_watcher_changes_update_trigrams_in_place(tmp_path):
+    root = tmp_path / "docs"
+    root.mkdir()
+    (root / "quarterly_report.pdf").write_bytes(b"x")
+    index = FileIndex(str(tmp_path / "index" / "files.db"))
+    index.refresh([str(root)])
+    trigrams = index.fuzzy_index()
+    assert trigrams.search("quartely report.pdf") == [str(root / "quarterly_report.pdf")]
+
+    index.apply_changes([(str(root / "quarterly_report.pdf"), "file_removed"),
+                         (str(root / "budget_summary.xlsx"), "file_added")])
+    assert index.fuzzy_index() is trigrams
+    assert trigrams.search("quartely report.pdf") == []
+    assert trigrams.search("budjet summary.xlsx") == [str(root / "budget_summary.xlsx")]
+
+    index.forget(str(root / "budget_summary.xlsx"))
+    assert index.fuzzy_index() is trigrams
+    assert trigrams.search("budjet summary.xlsx") == []
+
+def test_symlinked_folders_are_not_indexed_as_files(tmp_path):
+    root = tmp_path / "docs"
+    (root / "real").mkdir(parents=True)
+    (root / "real" / "a.txt").write_bytes(b"x")
+    os.symlink(root / "real", root / "shortcut")
+    os.symlink(root / "real" / "a.txt", root / "b.txt")
+    index = FileIndex(str(tmp_path / "index" / "files.db"))
+    index.refresh([str(root)])
+    names = {row[0] for row in index.conn.execute("SELECT name FROM files")}
+    assert names == {"a.txt", "b.txt"}
+    os.symlink(root / "real", root / "later")
+    index.apply_changes([(str(root / "later"), "file_added")])
+    names = {row[0] for row in index.conn.execute("SELECT name FROM files")}
+    assert names == {"a.txt", "b.txt"}
+
+def test_huge_postings_are_skipped(monkeypatch):
+    monkeypatch.setattr(finalcode, "FUZZY_MAX_POSTING", 50)
+    names = [(f"scan_{i:04d}.pdf", f"/d/scan_{i:04d}.pdf") for i in range(500)]
+    trigrams = TrigramIndex(names + [("invoice.pdf", "/d/invoice.pdf")])
+    assert trigrams.search("invoise.pdf") == ["/d/invoice.pdf"]
+    # sirf common grams wali query bhi chalti hai, bas capped list pe
+    assert len(trigrams.candidates(".pdf")) <= finalcode.FUZZY_CANDIDATES
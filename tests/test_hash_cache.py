@@ -0,0 +1,40 @@
+import os
+
+import finalcode
+from finalcode import HashCache, hash_file_cached
+
+def test_unchanged_file_is_cached(tmp_path):
+    cache = HashCache(str(tmp_path / "hashes.db"))
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"x" * 5000)
+    key = HashCache.key_for(os.stat(path))
+    digest = hash_file_cached(str(path), "full", cache=cache)
+    cache.flush()
+    assert cache.get(key, "full") == digest
+
+def test_file_modified_while_hashing_is_not_cached(tmp_path, monkeypatch):
+    cache = HashCache(str(tmp_path / "hashes.db"))
+    path = tmp_path / "a.bin"
+    path.write_bytes(b"x" * 5000)
+    key = HashCache.key_for(os.stat(path))
+    real_hash = finalcode.full_hash
+
+    def hash_then_edit(p):
+        digest = real_hash(p)
+        with open(p, "wb") as f:
+            f.write(b"y" * 6000)
+        return digest
+
+    monkeypatch.setattr(finalcode, "full_hash", hash_then_edit)
+    hash_file_cached(str(path), "full", cache=cache)
+    cache.flush()
+    assert cache.get(key, "full") is None
+    assert cache.get(HashCache.key_for(os.stat(path)), "full") is None
+
+def test_eviction_keeps_max_entries(tmp_path):
+    cache = HashCache(str(tmp_path / "hashes.db"), max_entries=10)
+    for i in range(25):
+        cache.put((1, i + 1, 100, 0), "full", f"digest{i}")
+    cache.flush()
+    assert cache.conn.execute("SELECT COUNT(*) FROM hashes").fetchone()[0] == 10
+    assert cache.rows == 10
@@ -0,0 +1,38 @@
+import pytest
+
+from intents import evaluate, load_corpus, parse
+
+def test_verb_inside_filename_is_not_the_command():
+    command = parse("delete my space trip.jpg")
+    assert command.intent == "delete"
+    assert command.files == ["space trip.jpg"]
+
+def test_folder_word_inside_filename_is_not_a_destination():
+    command = parse("upload music notes.txt")
+    assert command.files == ["music notes.txt"]
+    assert command.destination is None and command.source is None
+
+def test_digits_stay_in_the_filename():
+    command = parse("upload 2024 report.pdf to desktop")
+    assert command.files == ["2024 report.pdf"]
+    assert command.destination == "Desktop"
+    assert command.count is None
+
+def test_folder_after_preposition_is_still_a_slot():
+    command = parse("upload from downloads report.pdf to documents")
+    assert command.files == ["report.pdf"]
+    assert (command.source, command.destination) == ("Downloads", "Documents")
+
+def test_storage_does_not_outrank_delete_once_a_file_is_named():
+    assert parse("delete report.pdf from space").intent == "delete"
+    assert parse("how much space is left in downloads").intent == "storage"
+
+@pytest.mark.parametrize("case", load_corpus(), ids=lambda case: case["text"])
+def test_corpus(case):
+    got = parse(case["text"]).as_dict()
+    assert {k: got.get(k) for k in case["expect"]} == case["expect"]
+
+def test_evaluate_reports_full_accuracy():
+    stats, failures = evaluate(load_corpus(), repeat=1)
+    assert failures == []
+    assert stats["intent_accuracy"] == stats["slot_accuracy"] == 1.0
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import finalcode
+from finalcode import Job, JobManager, ScanCancelled
+
+def test_job_runs_to_done():
+    job = Job("sort", "Sort", lambda job: [1, 2])
+    assert job.status == "queued" and job.active
+    job.run()
+    assert job.status == "done"
+    assert job.result == [1, 2]
+    assert job.started_at and job.finished_at
+
+def test_cancel_while_queued_never_runs():
+    calls = []
+    job = Job("sort", "Sort", lambda job: calls.append(1))
+    job.cancel()
+    assert job.status == "cancelled"
+    job.run()
+    assert calls == []
+    assert job.result is None
+
+def test_cancel_while_running_keeps_partial_result():
+    started, release = threading.Event(), threading.Event()
+
+    def work(job):
+        job.publish("first")
+        started.set()
+        release.wait(5)
+        return ["first"] if job.cancel_event.is_set() else ["first", "second"]
+
+    job = Job("search", "Find", work)
+    t = threading.Thread(target=job.run)
+    t.start()
+    assert started.wait(5)
+    job.cancel()
+    assert job.status == "running"
+    assert job.progress["stage"] == "Cancelling"
+    release.set()
+    t.join(5)
+    assert job.status == "cancelled"
+    assert job.result == ["first"]
+    assert job.partial == ["first"]
+
+def test_scan_cancelled_marks_job_cancelled():
+    def work(job):
+        raise ScanCancelled()
+
+    job = Job("storage", "Storage", work)
+    job.run()
+    assert job.status == "cancelled"
+    assert job.error is None
+
+def test_failure_keeps_the_error():
+    def work(job):
+        raise OSError("disk gone")
+
+    job = Job("upload", "Upload", work)
+    job.run()
+    assert job.status == "failed"
+    assert job.error == "disk gone"
+    assert not job.active
+
+def test_progress_updates_describe():
+    job = Job("dedupe", "Dedupe", lambda job: None)
+    job.update(stage="Hashing", done=2, total=4)
+    assert job.describe().startswith("Hashing")
+    assert "2/4" in job.describe()
+
+def test_manager_runs_jobs_per_session():
+    manager = JobManager(workers=2)
+    mine = manager.submit("sort", "Sort", lambda job: "a", session="s1")
+    other = manager.submit("sort", "Sort", lambda job: "b", session="s2")
+    manager.pool.shutdown(wait=True)
+    assert manager.get(mine.id).result == "a"
+    assert manager.for_session("s1") == [mine]
+    assert other not in manager.for_session("s1")
+
+def test_cancelled_rename_is_not_reported_as_not_found(monkeypatch):
+    monkeypatch.setattr(finalcode, "find_file_deep", lambda *a, **kw: [])
+    stop = threading.Event()
+    stop.set()
+    with pytest.raises(ScanCancelled):
+        finalcode.op_rename("a.txt", "b.txt", stop_event=stop)
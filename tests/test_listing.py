@@ -0,0 +1,65 @@
+import pytest
+
+from finalcode import FileListing
+
+def make_listing():
+    listing = FileListing("/data")
+    listing.add("/data", "b.txt", 300, 2_000_000_000)
+    listing.add("/data/sub", "A.pdf", 100, 3_000_000_000)
+    listing.add("/data", "c.txt", 200, 1_000_000_000)
+    listing.add("/data/sub", "notes", 50, 4_000_000_000)
+    return listing
+
+def names(rows):
+    return [row["Name"] for row in rows]
+
+def test_page_sorts_and_slices():
+    listing = make_listing()
+    rows, matched = listing.page(0, 2, "name")
+    assert names(rows) == ["A.pdf", "b.txt"]
+    assert matched == 4
+    rows, _ = listing.page(2, 2, "name")
+    assert names(rows) == ["c.txt", "notes"]
+    rows, _ = listing.page(0, 4, "size", descending=True)
+    assert names(rows) == ["b.txt", "c.txt", "A.pdf", "notes"]
+    rows, _ = listing.page(0, 1, "modified")
+    assert rows[0]["Path"] == "/data/c.txt"
+
+def test_page_filters_count_only_matches():
+    listing = make_listing()
+    rows, matched = listing.page(0, 10, "name", ext_filter=".txt")
+    assert names(rows) == ["b.txt", "c.txt"] and matched == 2
+    rows, matched = listing.page(0, 10, "name", name_filter="NOT")
+    assert names(rows) == ["notes"] and matched == 1
+    assert listing.page(0, 10, "type", ext_filter=".zip") == ([], 0)
+
+def test_sort_order_is_cached_until_the_listing_changes():
+    listing = make_listing()
+    listing.page(0, 2, "size")
+    order = listing._orders[("size", False, "", "")]
+    listing.page(2, 2, "size")
+    assert listing._orders[("size", False, "", "")] is order
+    listing.add("/data", "d.txt", 10, 5_000_000_000)
+    assert not listing._orders
+    rows, matched = listing.page(0, 1, "size")
+    assert names(rows) == ["d.txt"] and matched == 5
+
+def test_only_the_last_few_orders_are_kept():
+    listing = make_listing()
+    for i in range(FileListing.MAX_ORDERS + 3):
+        listing.page(0, 1, "name", name_filter=str(i))
+    assert len(listing._orders) == FileListing.MAX_ORDERS
+    assert ("name", False, "0", "") not in listing._orders
+
+def test_unknown_sort_key_is_rejected():
+    with pytest.raises(ValueError):
+        make_listing().page(0, 10, "owner")
+
+def test_totals_are_collected_while_adding():
+    listing = make_listing()
+    assert len(listing) == 4
+    assert listing.total_size == 650
+    assert listing.ext_counts[".txt"] == 2
+    assert listing.ext_counts["No extension"] == 1
+    # folder names are stored once
+    assert listing.dirs == ["/data", "/data/sub"]
@@ -0,0 +1,57 @@
+import finalcode
+from finalcode import LookupCache
+
+def make_file(tmp_path, name):
+    path = tmp_path / name
+    path.write_text("x")
+    return str(path)
+
+def test_hit_is_validated_against_the_disk(tmp_path):
+    cache = LookupCache()
+    path = make_file(tmp_path, "Report.pdf")
+    cache.put("  report.PDF ", [path], complete=True)
+    assert cache.get("report.pdf") == [path]
+    (tmp_path / "Report.pdf").unlink()
+    assert cache.get("report.pdf") is None
+    assert cache.stats()["stale"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_incomplete_entry_cannot_answer_a_bigger_request(tmp_path):
+    cache = LookupCache()
+    path = make_file(tmp_path, "a.txt")
+    cache.put("a.txt", [path])
+    assert cache.get("a.txt", max_results=1) == [path]
+    assert cache.get("a.txt", max_results=5) is None
+    cache.put("a.txt", [path], complete=True)
+    assert cache.get("a.txt", max_results=5) == [path]
+
+def test_evict_paths_drops_entries_at_or_below_a_path(tmp_path):
+    cache = LookupCache()
+    (tmp_path / "sub").mkdir()
+    inside = make_file(tmp_path / "sub", "a.txt")
+    outside = make_file(tmp_path, "b.txt")
+    cache.put("a.txt", [inside])
+    cache.put("b.txt", [outside])
+    cache.evict_paths(str(tmp_path / "sub"))
+    assert list(cache.entries) == ["b.txt"]
+    cache.evict_paths(outside)
+    assert not cache.entries
+
+def test_least_recently_used_entry_is_dropped(tmp_path):
+    cache = LookupCache(max_entries=2)
+    paths = {name: make_file(tmp_path, name) for name in ("a", "b", "c")}
+    cache.put("a", [paths["a"]])
+    cache.put("b", [paths["b"]])
+    # a hit makes "a" recent, so "b" goes first
+    assert cache.get("a") == [paths["a"]]
+    cache.put("c", [paths["c"]])
+    assert list(cache.entries) == ["a", "c"]
+
+def test_find_file_deep_answers_from_the_cache(tmp_path, monkeypatch):
+    cache = LookupCache()
+    path = make_file(tmp_path, "a.txt")
+    cache.put("a.txt", [path], complete=True)
+    monkeypatch.setattr(finalcode, "get_lookup_cache", lambda: cache)
+    monkeypatch.setattr(finalcode, "iter_search_file", None)
+    assert finalcode.find_file_deep("A.TXT") == [path]
+    assert cache.stats()["hits"] == 1
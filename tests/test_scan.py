@@ -0,0 +1,146 @@
+import concurrent.futures, os, threading, time, types
+
+import pytest
+
+import finalcode
+from finalcode import scan_tree
+
+@pytest.fixture
+def sixteen_walkers(monkeypatch):
+    # race sirf kai walkers ke saath dikhta hai, cpu count se independent
+    pool = finalcode.WalkerPool(16)
+    monkeypatch.setattr(finalcode, "get_walker_pool", lambda: pool)
+    yield pool
+    pool.shutdown()
+
+def make_tree(root, dirs=60, subdirs=20):
+    expected = set()
+    for d in range(dirs):
+        for s in range(subdirs):
+            folder = os.path.join(root, f"d{d}", f"s{s}")
+            os.makedirs(folder)
+            path = os.path.join(folder, f"f{d}_{s}.txt")
+            with open(path, "w") as f:
+                f.write("x")
+            expected.add(path)
+    return expected
+
+def scanned_files(root, workers):
+    return {entry.path for _, _, files in scan_tree(str(root), workers=workers) for entry in files}
+
+def test_scan_tree_returns_every_file(tmp_path, sixteen_walkers):
+    expected = make_tree(str(tmp_path))
+    # race tha: outstanding zero dikhta tha jab results abhi emit nahi hue the
+    for _ in range(100):
+        assert scanned_files(tmp_path, workers=16) == expected
+
+def test_scan_tree_lists_every_directory(tmp_path):
+    make_tree(str(tmp_path), dirs=5, subdirs=3)
+    dirs = {path for path, _, _ in scan_tree(str(tmp_path), workers=4)}
+    assert len(dirs) == 1 + 5 + 5 * 3
+
+def test_scan_tree_max_depth(tmp_path):
+    make_tree(str(tmp_path), dirs=3, subdirs=2)
+    shallow = {path for path, _, _ in scan_tree(str(tmp_path), workers=4, max_depth=1)}
+    assert len(shallow) == 1 + 3
+
+def test_coordinator_timeout_covers_the_wait_for_a_slot():
+    coordinator = finalcode.ScanCoordinator(slots=1)
+    release = threading.Event()
+    busy = threading.Thread(target=coordinator.run, args=("busy", lambda: release.wait(5)))
+    busy.start()
+    while not coordinator.stats()["running"]:
+        time.sleep(0.01)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        coordinator.run("queued", lambda: "late", timeout=0.2)
+    # the timed-out job was dropped, not left to run later
+    assert coordinator.stats()["queued"] == 0
+    release.set()
+    busy.join()
+    assert coordinator.run("queued", lambda: "now", timeout=1) == "now"
+
+def test_stalled_scan_does_not_starve_a_later_one(tmp_path, sixteen_walkers, monkeypatch):
+    monkeypatch.setattr(finalcode, "SCAN_BACKLOG", 8)
+    big = tmp_path / "big"
+    for d in range(300):
+        (big / f"d{d}").mkdir(parents=True)
+    small = tmp_path / "small"
+    small.mkdir()
+    (small / "only.txt").write_text("x")
+
+    # consumer ek entry ke baad ruk gaya - jaise slow Show Files
+    stalled = scan_tree(str(big))
+    next(stalled)
+    found = [entry.name for _, _, files in scan_tree(str(small), deadline=time.monotonic() + 5) for entry in files]
+    assert found == ["only.txt"]
+    # aur ruka hua scan bhi baad mein poora hota hai
+    assert 1 + sum(1 for _ in stalled) == 301
+
+def test_concurrent_scans_share_the_walkers(tmp_path, sixteen_walkers):
+    expected = {name: make_tree(str(tmp_path / name), dirs=20, subdirs=10) for name in ("a", "b")}
+    results = {}
+
+    def scan(name):
+        results[name] = scanned_files(tmp_path / name, workers=None)
+
+    threads = [threading.Thread(target=scan, args=(name,)) for name in expected]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert results == expected
+
+class GatedScope:
+    """Search scope whose walk lists one directory per opened gate"""
+    key = ("gated",)
+
+    def __init__(self):
+        self.gates = [threading.Event(), threading.Event()]
+        self.walks = 0
+
+    def walk(self, stop_event=None, deadline=None):
+        self.walks += 1
+        for gate, name in zip(self.gates, ("x.txt", "report.pdf")):
+            while not gate.wait(0.01):
+                if stop_event.is_set():
+                    return
+            yield "/d", [], [types.SimpleNamespace(name=name, path="/d/" + name)]
+
+def test_searches_for_one_name_share_a_walk_but_not_their_cancel(monkeypatch):
+    scope = GatedScope()
+    coordinator = finalcode.ScanCoordinator(slots=2)
+    monkeypatch.setattr(finalcode, "get_search_scope", lambda: scope)
+    monkeypatch.setattr(finalcode, "get_scan_coordinator", lambda: coordinator)
+    monkeypatch.setattr(finalcode, "get_lookup_cache", lambda: finalcode.LookupCache())
+    monkeypatch.setattr(finalcode, "lookup_indexed", lambda filename, max_results=1: [])
+    results, progress = {}, {"a": [], "b": []}
+    stops = {"a": threading.Event(), "b": threading.Event()}
+
+    def find(name):
+        results[name] = finalcode.find_file_deep(
+            "report.pdf", stop_event=stops[name], progress=lambda **p: progress[name].append(p))
+
+    threads = {name: threading.Thread(target=find, args=(name,), daemon=True) for name in stops}
+    for thread in threads.values():
+        thread.start()
+    # dono ek hi walk pe attach ho jaayein
+    while sum(len(shared.waiters) for shared in list(coordinator.shared.values())) < 2:
+        time.sleep(0.01)
+    scope.gates[0].set()
+    while not (progress["a"] and progress["b"]):
+        time.sleep(0.01)
+    stops["a"].set()
+    threads["a"].join(5)
+    assert results["a"] == []
+    scope.gates[1].set()
+    threads["b"].join(5)
+    assert results["b"] == ["/d/report.pdf"]
+    assert scope.walks == 1
+
+def test_excluded_folders_hide_the_mounts_below_them(monkeypatch):
+    mounts = ["/", "/boot/efi", "/var/lib/docker/overlay2/abc/merged", "/media/usb", "/home/me/project/node_modules"]
+    monkeypatch.setattr(finalcode, "discover_mount_points", lambda include_network=False: mounts)
+    scope = finalcode.SearchScope(excludes=finalcode.DEFAULT_SEARCH_EXCLUDES)
+    assert scope.roots == ["/", "/media/usb"]
+    # roots given explicitly are left alone
+    assert finalcode.SearchScope(roots=["/boot"]).roots == ["/boot"]
@@ -0,0 +1,172 @@
+import os, threading, time, types
+
+import pytest
+
+import finalcode
+from finalcode import FolderSnapshot, ScanCancelled, ScanCoordinator, SnapshotStore, search_file
+
+@pytest.fixture
+def coordinator(monkeypatch):
+    coordinator = ScanCoordinator(slots=2)
+    monkeypatch.setattr(finalcode, "get_scan_coordinator", lambda: coordinator)
+    return coordinator
+
+def slow_builds(monkeypatch, gate):
+    """iter_build that counts its walks and waits on gate after the first directory"""
+    builds = []
+    real = FolderSnapshot.iter_build.__func__
+
+    def iter_build(cls, folder_path, stop_event=None):
+        builds.append(folder_path)
+        for i, snapshot in enumerate(real(cls, folder_path, stop_event=stop_event)):
+            yield snapshot
+            if i == 1:
+                while not gate.wait(0.01):
+                    if stop_event is not None and stop_event.is_set():
+                        raise ScanCancelled()
+
+    monkeypatch.setattr(FolderSnapshot, "iter_build", classmethod(iter_build))
+    return builds
+
+def start_get(store, folder, result):
+    getter = threading.Thread(target=lambda: result.setdefault("snapshot", store.get(folder)), daemon=True)
+    getter.start()
+    return getter
+
+def first_rows(stream):
+    for found, preview in stream:
+        if found:
+            return found, preview
+
+def make_folder(root, files=5):
+    for i in range(files):
+        (root / f"f{i}.txt").write_text("x")
+    return str(root)
+
+def test_stream_joins_a_build_already_running(tmp_path, coordinator, monkeypatch):
+    folder = make_folder(tmp_path)
+    gate = threading.Event()
+    builds = slow_builds(monkeypatch, gate)
+    store = SnapshotStore()
+    result = {}
+    getter = start_get(store, folder, result)
+    while not builds:
+        time.sleep(0.01)
+    stream = store.stream(folder)
+    found, preview = first_rows(stream)
+    assert found == 5 and len(preview) == 5
+    gate.set()
+    assert list(stream)[-1][0] == 5
+    getter.join(5)
+    assert len(result["snapshot"]) == 5
+    assert builds == [folder]
+
+def test_stream_stop_event_cancels_the_build(tmp_path, coordinator, monkeypatch):
+    folder = make_folder(tmp_path)
+    builds = slow_builds(monkeypatch, threading.Event())
+    store = SnapshotStore()
+    stop = threading.Event()
+    stream = store.stream(folder, stop_event=stop)
+    first_rows(stream)
+    stop.set()
+    with pytest.raises(ScanCancelled):
+        list(stream)
+    assert builds == [folder]
+    assert coordinator.inflight == {}
+    assert store.snapshots == {}
+
+def test_one_caller_cancelling_keeps_the_shared_build_for_the_other(tmp_path, coordinator, monkeypatch):
+    folder = make_folder(tmp_path)
+    gate = threading.Event()
+    builds = slow_builds(monkeypatch, gate)
+    store = SnapshotStore()
+    result = {}
+    getter = start_get(store, folder, result)
+    while not builds:
+        time.sleep(0.01)
+    stop = threading.Event()
+    stream = store.stream(folder, stop_event=stop)
+    first_rows(stream)
+    stop.set()
+    with pytest.raises(ScanCancelled):
+        list(stream)
+    gate.set()
+    getter.join(5)
+    assert len(result["snapshot"]) == 5
+    assert builds == [folder]
+
+def test_snapshot_is_served_until_a_folder_changes(tmp_path, coordinator, monkeypatch):
+    folder = make_folder(tmp_path)
+    store = SnapshotStore()
+    first = store.get(folder)
+    assert store.get(folder) is first
+    # past the TTL a snapshot is kept while no directory mtime moved
+    first.created_at -= finalcode.SNAPSHOT_TTL + 1
+    assert store.get(folder) is first
+    (tmp_path / "new.txt").write_text("x")
+    os.utime(tmp_path, ns=(0, first.dir_mtimes[folder] + 10**9))
+    second = store.get(folder)
+    assert second is not first
+    assert len(second) == 6
+
+def test_change_in_the_top_folder_shows_up_within_the_ttl(tmp_path, coordinator):
+    folder = make_folder(tmp_path)
+    store = SnapshotStore()
+    first = store.get(folder)
+    (tmp_path / "new.txt").write_text("x")
+    os.utime(tmp_path, ns=(0, first.dir_mtimes[folder] + 10**9))
+    assert len(store.get(folder)) == 6
+
+def test_snapshot_is_rebuilt_after_max_age(tmp_path, coordinator):
+    folder = make_folder(tmp_path)
+    store = SnapshotStore()
+    first = store.get(folder)
+    first.created_at -= finalcode.SNAPSHOT_MAX_AGE + 1
+    assert store.get(folder) is not first
+
+def test_invalidate_drops_snapshots_above_and_below_a_path(tmp_path, coordinator):
+    outer = make_folder(tmp_path)
+    (tmp_path / "sub").mkdir()
+    inner = make_folder(tmp_path / "sub", files=1)
+    (tmp_path / "other").mkdir()
+    other = make_folder(tmp_path / "other", files=1)
+    store = SnapshotStore()
+    for folder in (outer, inner, other):
+        store.get(folder)
+    store.invalidate(os.path.join(inner, "f0.txt"))
+    assert set(store.snapshots) == {other}
+    store.get(inner)
+    store.invalidate(str(tmp_path))
+    assert store.snapshots == {}
+
+def test_store_keeps_only_max_folders(tmp_path, coordinator):
+    store = SnapshotStore(max_folders=2)
+    folders = []
+    for name in "abc":
+        (tmp_path / name).mkdir()
+        folders.append(make_folder(tmp_path / name, files=1))
+        store.get(folders[-1])
+    assert list(store.snapshots) == folders[1:]
+
+def fake_scope(tree):
+    def walk(stop_event=None, deadline=None):
+        for root, names in tree:
+            if stop_event is not None and stop_event.is_set():
+                return
+            entries = [types.SimpleNamespace(name=n, path=os.path.join(root, n)) for n in names]
+            yield root, [], entries
+    return types.SimpleNamespace(walk=walk)
+
+def test_search_reports_complete_and_partial(monkeypatch):
+    tree = [("/a", ["x.txt", "report.pdf"]), ("/b", ["report.pdf"])]
+    monkeypatch.setattr(finalcode, "lookup_indexed", lambda filename, max_results=1: [])
+    monkeypatch.setattr(finalcode, "get_search_scope", lambda: fake_scope(tree))
+    assert search_file("report.pdf", max_results=2) == (["/a/report.pdf", "/b/report.pdf"], True)
+
+    stop = threading.Event()
+    stream = finalcode.iter_search_file("report.pdf", max_results=2, stop_event=stop)
+    assert next(stream) == "/a/report.pdf"
+    stop.set()
+    with pytest.raises(StopIteration) as done:
+        next(stream)
+    assert done.value.value is False
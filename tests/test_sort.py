@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import finalcode
+from finalcode import ScanCoordinator, SnapshotStore, sort_files_by_date
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    coordinator = ScanCoordinator(slots=2)
+    store = SnapshotStore()
+    monkeypatch.setattr(finalcode, "get_scan_coordinator", lambda: coordinator)
+    monkeypatch.setattr(finalcode, "get_snapshot_store", lambda: store)
+
+def make_files(tmp_path, count=10):
+    # mtime ke hisaab se f0 sabse purana
+    for i in range(count):
+        path = tmp_path / f"f{i}.txt"
+        path.write_text("x")
+        os.utime(path, ns=(0, (1_600_000_000 + i * 60) * 10**9))
+    return str(tmp_path)
+
+def names(rows):
+    return [row["Name"] for row in rows]
+
+def test_sort_without_limit_returns_everything(tmp_path):
+    folder = make_files(tmp_path)
+    assert names(sort_files_by_date(folder)) == [f"f{i}.txt" for i in reversed(range(10))]
+    assert names(sort_files_by_date(folder, newest_first=False)) == [f"f{i}.txt" for i in range(10)]
+
+def test_limit_keeps_only_the_newest_or_oldest(tmp_path):
+    folder = make_files(tmp_path)
+    assert names(sort_files_by_date(folder, limit=3)) == ["f9.txt", "f8.txt", "f7.txt"]
+    assert names(sort_files_by_date(folder, newest_first=False, limit=3)) == ["f0.txt", "f1.txt", "f2.txt"]
+    assert len(sort_files_by_date(folder, limit=50)) == 10
+
+def test_rows_are_only_formatted_for_what_is_returned(tmp_path, monkeypatch):
+    folder = make_files(tmp_path)
+    formatted = []
+    real_row = finalcode.file_row
+    monkeypatch.setattr(finalcode, "file_row", lambda *args: formatted.append(args[0]) or real_row(*args))
+    sort_files_by_date(folder, limit=2)
+    assert formatted == ["f9.txt", "f8.txt"]
@@ -0,0 +1,153 @@
+import json, math, wave
+from array import array
+
+import pytest
+import speech_recognition as sr
+
+import speech
+from speech import CalibrationProfile, EnergyVad, WavFileSource, listen
+
+RATE = 16000
+
+def write_wav(path, segments, channels=1, width=2):
+    """segments: (seconds, amplitude) pairs - 0 is silence, anything else a 440 Hz tone"""
+    samples = array("h")
+    for seconds, amplitude in segments:
+        for n in range(int(seconds * RATE)):
+            value = int(amplitude * math.sin(2 * math.pi * 440 * n / RATE))
+            samples.extend([value] * channels)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(RATE)
+        wav.writeframes(samples.tobytes() if width == 2 else bytes(len(samples)))
+    return str(path)
+
+class RecordingBackend:
+    """Decoder that keeps every frame and 'understands' any audio it got"""
+    name = "test"
+
+    def __init__(self, text="hello"):
+        self.text = text
+        self.frames = []
+
+    def start(self, sample_rate):
+        backend = self
+
+        class Decoder:
+            def accept(self, frame):
+                backend.frames.append(frame)
+
+            def finish(self):
+                return backend.text if backend.frames else ""
+
+        return Decoder()
+
+def run_listen(path, backend=None, **kwargs):
+    source = WavFileSource(path)
+    profile = CalibrationProfile(path=None)
+    backend = backend or RecordingBackend()
+    text = listen(source, backend, profile=profile, vad=EnergyVad(profile), **kwargs)
+    return text, source, backend
+
+def test_listen_stops_200ms_after_speech_ends(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(0.3, 0), (0.5, 3000), (1.0, 0), (0.5, 3000)])
+    text, source, backend = run_listen(path)
+    assert text == "hello"
+    stopped_at = source.position / 2 / RATE
+    # tone ends at 0.8s, 0.2s of silence ends it - the second tone is never read
+    assert 1.0 <= stopped_at <= 1.1
+
+def test_short_pause_does_not_end_the_phrase(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(0.3, 3000), (0.1, 0), (0.3, 3000), (0.5, 0)])
+    _, source, _ = run_listen(path)
+    assert source.position / 2 / RATE >= 0.9
+
+def test_pre_roll_frames_reach_the_decoder(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(0.6, 0), (0.3, 3000), (0.4, 0)])
+    _, source, backend = run_listen(path)
+    spoken = 0.3 + speech.END_SILENCE_SECONDS
+    heard = len(backend.frames) * source.frame_samples / RATE
+    # the frames before START_FRAMES were met are replayed, not dropped
+    assert heard >= spoken + (speech.PRE_ROLL_FRAMES - speech.START_FRAMES) * speech.FRAME_MS / 1000
+
+def test_silence_times_out(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(2.0, 0)])
+    with pytest.raises(sr.WaitTimeoutError):
+        run_listen(path, timeout=0.5)
+
+def test_nothing_understood_raises_unknown_value(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(0.3, 3000), (0.5, 0)])
+    with pytest.raises(sr.UnknownValueError):
+        run_listen(path, backend=RecordingBackend(text=""))
+
+def test_calibration_profile_is_saved_and_loaded(tmp_path):
+    wav = write_wav(tmp_path / "noise.wav", [(1.0, 400)])
+    profile_path = str(tmp_path / "profile" / "voice.json")
+    profile = CalibrationProfile(path=profile_path)
+    assert not profile.calibrated
+    threshold = profile.calibrate(WavFileSource(wav))
+    assert threshold == pytest.approx(400 / math.sqrt(2) * speech.NOISE_RATIO, rel=0.05)
+
+    loaded = CalibrationProfile(path=profile_path)
+    assert loaded.calibrated
+    assert loaded.noise_floor == profile.noise_floor
+    assert loaded.energy_threshold == threshold
+
+def test_profile_saves_are_throttled(tmp_path):
+    profile_path = tmp_path / "voice.json"
+    profile = CalibrationProfile(path=str(profile_path))
+    profile.observe(50, rate=1.0)
+    profile.save(force=True)
+    profile.observe(5000, rate=1.0)
+    profile.save()
+    assert json.loads(profile_path.read_text())["noise_floor"] == 50
+    profile.save(force=True)
+    assert json.loads(profile_path.read_text())["noise_floor"] == 5000
+
+def test_broken_profile_falls_back_to_defaults(tmp_path):
+    profile_path = tmp_path / "voice.json"
+    profile_path.write_text("{not json")
+    profile = CalibrationProfile(path=str(profile_path))
+    assert not profile.calibrated
+    assert profile.energy_threshold == speech.ENERGY_THRESHOLD
+
+def test_wav_source_reads_stereo_as_mono_and_resumes(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(0.3, 3000)], channels=2)
+    source = WavFileSource(path)
+    assert source.duration == pytest.approx(0.3)
+    frames = source.frames()
+    first = next(frames)
+    assert len(first) == source.frame_samples * 2
+    # a new frames() call carries on where the last one stopped
+    rest = list(source.frames())
+    assert len(first) + sum(len(f) for f in rest) == int(0.3 * RATE) * 2
+
+def test_wav_source_rejects_8_bit_audio(tmp_path):
+    path = write_wav(tmp_path / "a.wav", [(0.1, 0)], width=1)
+    with pytest.raises(ValueError):
+        WavFileSource(path)
+
+def test_backend_selection(monkeypatch):
+    monkeypatch.delenv("ECHO_SPEECH_BACKEND", raising=False)
+    monkeypatch.setattr(speech, "vosk_available", lambda model_path=None: False)
+    assert isinstance(speech.get_backend(), speech.GoogleBackend)
+
+    def broken_vosk():
+        raise OSError("no model")
+
+    monkeypatch.setattr(speech, "vosk_available", lambda model_path=None: True)
+    monkeypatch.setattr(speech, "VoskBackend", broken_vosk)
+    # auto falls back to Google, asking for vosk by name does not
+    assert isinstance(speech.get_backend(), speech.GoogleBackend)
+    monkeypatch.setenv("ECHO_SPEECH_BACKEND", "vosk")
+    with pytest.raises(OSError):
+        speech.get_backend()
+    assert isinstance(speech.get_backend("google"), speech.GoogleBackend)
+
+def test_fake_mic_env_opens_the_file_device(tmp_path, monkeypatch):
+    path = write_wav(tmp_path / "a.wav", [(0.1, 0)])
+    monkeypatch.setenv("ECHO_FAKE_MIC", path)
+    device = speech.open_input_device()
+    assert isinstance(device, speech.FileAudioDevice)
+    assert device.path == path
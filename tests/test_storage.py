@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import finalcode
+from finalcode import ScanCoordinator, SnapshotStore, analyze_storage
+
+@pytest.fixture(autouse=True)
+def fresh_store(monkeypatch):
+    coordinator = ScanCoordinator(slots=2)
+    store = SnapshotStore()
+    monkeypatch.setattr(finalcode, "get_scan_coordinator", lambda: coordinator)
+    monkeypatch.setattr(finalcode, "get_snapshot_store", lambda: store)
+    return store
+
+def allocated(*paths):
+    return sum(os.stat(p).st_blocks * 512 for p in paths)
+
+def test_hard_links_and_symlinks_take_space_once(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    big = data / "big.bin"
+    big.write_bytes(b"x" * 10000)
+    os.link(big, tmp_path / "same.bin")
+    os.symlink(big, tmp_path / "link.bin")
+    report = analyze_storage(str(tmp_path))
+    assert report["apparent_bytes"] == 10000
+    assert report["files"] == 1
+    assert report["allocated_bytes"] == allocated(big)
+
+def test_subfolders_roll_up_into_their_parents(tmp_path):
+    (tmp_path / "a" / "deep").mkdir(parents=True)
+    (tmp_path / "b").mkdir()
+    (tmp_path / "top.txt").write_bytes(b"t" * 100)
+    (tmp_path / "a" / "one.txt").write_bytes(b"1" * 1000)
+    (tmp_path / "a" / "deep" / "two.txt").write_bytes(b"2" * 2000)
+    (tmp_path / "b" / "three.txt").write_bytes(b"3" * 300)
+    report = analyze_storage(str(tmp_path), top_n=2)
+    assert report["apparent_bytes"] == 3400
+    assert report["tree"][str(tmp_path / "a")][0] == 3000
+    assert report["tree"][str(tmp_path / "a")][2] == 2
+    assert [c["Folder"] for c in report["children"]] == [str(tmp_path / "a"), str(tmp_path / "b")]
+    assert [size for size, _ in report["largest_files"]] == [2000, 1000]
+    assert report["largest_dirs"][0] == (3000, str(tmp_path / "a"))
+    files = [tmp_path / "top.txt", tmp_path / "a" / "one.txt", tmp_path / "a" / "deep" / "two.txt",
+             tmp_path / "b" / "three.txt"]
+    assert report["allocated_bytes"] == allocated(*files)
+
+def test_report_is_served_from_the_snapshot(tmp_path, fresh_store):
+    (tmp_path / "a.txt").write_bytes(b"x" * 10)
+    first = analyze_storage(str(tmp_path))
+    assert analyze_storage(str(tmp_path)) is first
+    fresh_store.invalidate(str(tmp_path / "a.txt"))
+    assert analyze_storage(str(tmp_path)) is not first
@@ -0,0 +1,82 @@
+import threading
+
+from tts import SpeechWorker, URGENT, NORMAL, BACKGROUND
+
+class FakeEngine:
+    """Records what was spoken, runAndWait blocks until the test opens the gate"""
+
+    def __init__(self):
+        self.spoken = []
+        self.pending = None
+        self.gate = threading.Event()
+        self.speaking = threading.Event()
+
+    def getProperty(self, name):
+        return "fake"
+
+    def connect(self, topic, callback):
+        pass
+
+    def say(self, text):
+        self.pending = text
+
+    def runAndWait(self):
+        self.speaking.set()
+        self.gate.wait(5)
+        self.spoken.append(self.pending)
+
+    def stop(self):
+        pass
+
+def make_worker(tmp_path):
+    engine = FakeEngine()
+    worker = SpeechWorker(engine_factory=lambda: engine, cache_dir=str(tmp_path))
+    return worker, engine
+
+def hold_first(worker, engine):
+    """Keep the worker busy on one message so the rest stay queued"""
+    worker.say("busy", priority=BACKGROUND)
+    assert engine.speaking.wait(5)
+
+def test_urgent_jumps_the_queue(tmp_path):
+    worker, engine = make_worker(tmp_path)
+    hold_first(worker, engine)
+    worker.say("later", priority=BACKGROUND)
+    worker.say("normal", priority=NORMAL)
+    done = worker.say("urgent", priority=URGENT)
+    engine.gate.set()
+    assert done.wait(5)
+    worker.say("end", priority=BACKGROUND).wait(5)
+    assert engine.spoken == ["busy", "urgent", "normal", "later", "end"]
+
+def test_stale_message_is_dropped(tmp_path):
+    worker, engine = make_worker(tmp_path)
+    hold_first(worker, engine)
+    stale = worker.say("too old", max_age=0)
+    fresh = worker.say("still fresh")
+    engine.gate.set()
+    assert stale.wait(5) and fresh.wait(5)
+    assert "too old" not in engine.spoken
+    assert "still fresh" in engine.spoken
+    assert worker.stats["dropped"] == 1
+
+def test_newer_message_with_same_key_replaces_pending(tmp_path):
+    worker, engine = make_worker(tmp_path)
+    hold_first(worker, engine)
+    worker.say("10 percent", key="progress")
+    last = worker.say("20 percent", key="progress")
+    engine.gate.set()
+    assert last.wait(5)
+    assert engine.spoken == ["busy", "20 percent"]
+
+def test_interrupt_drops_waiting_messages_and_speaks_next(tmp_path):
+    worker, engine = make_worker(tmp_path)
+    hold_first(worker, engine)
+    old = worker.say("old news")
+    urgent = worker.say("Upload failed!", priority=URGENT, interrupt=True)
+    assert old.wait(5)
+    assert worker.stop_playback.is_set()
+    engine.gate.set()
+    assert urgent.wait(5)
+    assert engine.spoken == ["busy", "Upload failed!"]
+    assert worker.stats["interrupted"] == 1
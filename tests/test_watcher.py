@@ -0,0 +1,62 @@
+import os, shutil, time
+
+import pytest
+
+from finalcode import InotifyWatcher
+
+pytestmark = pytest.mark.skipif(not InotifyWatcher.available(), reason="inotify is linux only")
+
+def wait_for(condition, timeout=5):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+@pytest.fixture
+def watched(tmp_path):
+    root = tmp_path / "docs"
+    root.mkdir()
+    watcher = InotifyWatcher([str(root)], coalesce_interval=0.05)
+    changes = []
+    watcher.add_listener(changes.extend)
+    watcher.start()
+    assert watcher.ready.wait(5)
+    yield root, watcher, changes
+    watcher.stop()
+
+def test_deleted_root_is_untrusted_until_watched_again(watched):
+    root, watcher, changes = watched
+    assert watcher.trusted
+    shutil.rmtree(root)
+    assert wait_for(lambda: (str(root), "dir_removed") in changes)
+    assert not watcher.trusted
+
+    root.mkdir()
+    assert wait_for(lambda: (str(root), "dir_added") in changes)
+    (root / "new.txt").write_text("x")
+    assert wait_for(lambda: any(path == str(root / "new.txt") for path, kind in changes))
+    watcher.mark_resynced(watcher.generation)
+    assert watcher.trusted
+
+def test_moved_root_stops_reporting_the_old_tree(watched, tmp_path):
+    root, watcher, changes = watched
+    (root / "sub").mkdir()
+    assert wait_for(lambda: (str(root / "sub"), "dir_added") in changes)
+    os.rename(root, tmp_path / "elsewhere")
+    assert wait_for(lambda: (str(root), "dir_removed") in changes)
+    assert not watcher.trusted
+    (tmp_path / "elsewhere" / "sub" / "a.txt").write_text("x")
+    time.sleep(0.2)
+    assert not any(path.startswith(str(root) + os.sep) and kind.startswith("file") for path, kind in changes)
+
+def test_resync_does_not_hide_events_lost_during_refresh(watched):
+    root, watcher, changes = watched
+    generation = watcher.generation
+    # refresh chal raha hai, isi beech queue overflow
+    watcher._events_lost()
+    watcher.mark_resynced(generation)
+    assert not watcher.trusted
+    watcher.mark_resynced(watcher.generation)
+    assert watcher.trusted
@@ -0,0 +1,246 @@
+import os, errno, hashlib, json, shutil, time
+
+# chunk per kernel copy call, journal sync interval
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+JOURNAL_EVERY_BYTES = 64 * 1024 * 1024
+PART_SUFFIX = ".echo-part"
+JOURNAL_SUFFIX = ".echo-journal"
+
+class TransferError(Exception):
+    """Copy finished but the destination does not match the source"""
+
+class TransferCancelled(Exception):
+    """stop_event was set, the journal keeps the offset for a later resume"""
+
+def _journal_path(destination):
+    folder, name = os.path.split(destination)
+    return os.path.join(folder, "." + name + JOURNAL_SUFFIX)
+
+def _part_path(destination):
+    folder, name = os.path.split(destination)
+    return os.path.join(folder, "." + name + PART_SUFFIX)
+
+def _read_journal(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_journal(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _fsync_dir(path):
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _hash_range(f, digest, start, end):
+    """Feed [start, end) of an open file to digest - seek + read, os.pread is not on Windows"""
+    f.seek(start)
+    offset = start
+    while offset < end:
+        block = f.read(min(COPY_CHUNK_BYTES, end - offset))
+        if not block:
+            break
+        digest.update(block)
+        offset += len(block)
+    return offset
+
+def _verified_digest(source, copy, size):
+    """
+    Read source and its copy side by side; the source's digest when every
+    block matches, None otherwise. One pass over each file.
+    """
+    digest = hashlib.blake2b()
+    with open(source, "rb", buffering=0) as a, open(copy, "rb", buffering=0) as b:
+        offset = 0
+        while offset < size:
+            want = min(COPY_CHUNK_BYTES, size - offset)
+            block = a.read(want)
+            if not block or block != b.read(len(block)):
+                return None
+            digest.update(block)
+            offset += len(block)
+        if b.read(1):
+            return None
+    return digest.hexdigest()
+
+def _file_digest(path, size):
+    digest = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as f:
+        _hash_range(f, digest, 0, size)
+    return digest.hexdigest()
+
+class _Copier:
+    """
+    Picks the cheapest copy primitive that works for this pair of files:
+    copy_file_range, then sendfile, then a plain read / write loop.
+    """
+
+    def __init__(self, src, dst):
+        self.src = src
+        self.dst = dst
+        self.methods = [m for m in ("copy_file_range", "sendfile") if hasattr(os, m)] + ["stream"]
+
+    def copy(self, offset, count):
+        while True:
+            method = self.methods[0]
+            try:
+                if method == "copy_file_range":
+                    return os.copy_file_range(self.src.fileno(), self.dst.fileno(), count, offset, offset)
+                if method == "sendfile":
+                    # sendfile writes at the current position of dst
+                    os.lseek(self.dst.fileno(), offset, os.SEEK_SET)
+                    return os.sendfile(self.dst.fileno(), self.src.fileno(), offset, count)
+                return self._stream(offset, count)
+            except OSError as e:
+                # old kernels / filesystems reject copy_file_range across devices etc.
+                if method != "stream" and e.errno in (errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                                      errno.EOPNOTSUPP, errno.EBADF):
+                    self.methods.pop(0)
+                    continue
+                raise
+
+    def _stream(self, offset, count):
+        self.src.seek(offset)
+        block = self.src.read(count)
+        if not block:
+            return 0
+        self.dst.seek(offset)
+        view = memoryview(block)
+        written = 0
+        while written < len(view):
+            written += self.dst.write(view[written:])
+        return len(block)
+
+def _source_id(st):
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "dev": st.st_dev, "ino": st.st_ino}
+
+def move_file(source, destination, progress=None, stop_event=None, verify=True):
+    """
+    Move one file, resumable across filesystems. Same filesystem is a plain
+    rename; otherwise the data is copied into a hidden part file next to the
+    destination by copy_file_range / sendfile (no copy through Python), with
+    a read / write loop as fallback. With verify the source and the part
+    file are then read side by side once and compared before the part file
+    is renamed into place - the source is removed only after that commit,
+    and the source's digest is kept in the journal. A journal next to the
+    part file records the offset so calling move_file again after a crash
+    or cancel continues where it stopped. progress(done_bytes, total_bytes).
+    Returns the destination path.
+    """
+    source = os.path.abspath(source)
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    destination = os.path.abspath(destination)
+    if source == destination:
+        return destination
+    journal_path = _journal_path(destination)
+    part_path = _part_path(destination)
+    state = _read_journal(journal_path)
+
+    # pichli baar commit ho gaya tha par source delete se pehle ruk gaye
+    if state and state.get("phase") == "committed" and state.get("source") == source:
+        intact = os.path.exists(destination) and os.path.getsize(destination) == state["size"]
+        if intact and state.get("digest"):
+            intact = _file_digest(destination, state["size"]) == state["digest"]
+        if intact:
+            if os.path.exists(source):
+                os.remove(source)
+            os.remove(journal_path)
+            return destination
+        if not os.path.exists(source):
+            raise TransferError("Destination does not match the committed copy and the source is gone")
+        # destination kharab hai par source abhi bacha hai - poora move dobara
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.remove(journal_path)
+        state = None
+
+    src_stat = os.stat(source)
+    if not state or not os.path.exists(part_path):
+        try:
+            os.rename(source, destination)
+            if progress:
+                progress(src_stat.st_size, src_stat.st_size)
+            return destination
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+
+    total = src_stat.st_size
+    resume = (state is not None and state.get("source") == source and state.get("phase") == "copying"
+              and state.get("id") == _source_id(src_stat) and os.path.exists(part_path))
+    offset = state["offset"] if resume else 0
+    state = {"source": source, "destination": destination, "phase": "copying",
+             "id": _source_id(src_stat), "size": total, "offset": offset}
+
+    with open(source, "rb", buffering=0) as src, open(part_path, "r+b" if resume else "wb", buffering=0) as dst:
+        dst.truncate(offset)
+        _write_journal(journal_path, state)
+        copier = _Copier(src, dst)
+        synced = offset
+        while offset < total:
+            if stop_event is not None and stop_event.is_set():
+                os.fsync(dst.fileno())
+                state["offset"] = offset
+                _write_journal(journal_path, state)
+                raise TransferCancelled(f"Stopped at {offset} of {total} bytes")
+            copied = copier.copy(offset, min(COPY_CHUNK_BYTES, total - offset))
+            if copied == 0:
+                raise TransferError("Source shrank during the copy")
+            offset += copied
+            if offset - synced >= JOURNAL_EVERY_BYTES:
+                os.fsync(dst.fileno())
+                state["offset"] = synced = offset
+                _write_journal(journal_path, state)
+            if progress:
+                progress(offset, total)
+        os.fsync(dst.fileno())
+
+    if _source_id(os.stat(source)) != state["id"]:
+        os.remove(part_path)
+        os.remove(journal_path)
+        raise TransferError("Source changed during the copy")
+    source_digest = _verified_digest(source, part_path, total) if verify else None
+    if verify and source_digest is None:
+        os.remove(part_path)
+        os.remove(journal_path)
+        raise TransferError("Checksum mismatch after copy")
+
+    shutil.copystat(source, part_path)
+    os.replace(part_path, destination)
+    _fsync_dir(os.path.dirname(destination))
+    state["phase"] = "committed"
+    state["digest"] = source_digest
+    _write_journal(journal_path, state)
+    os.remove(source)
+    os.remove(journal_path)
+    return destination
+
+def move_path(source, destination, progress=None, stop_event=None):
+    """move_file for files, shutil.move for whole folders"""
+    if os.path.isdir(source) and not os.path.islink(source):
+        return shutil.move(source, destination)
+    return move_file(source, destination, progress=progress, stop_event=stop_event)
+
+def format_progress(done, total, started_at):
+    """'120.0/800.0 MB, 45.2 MB/s, ~15s left' for console output"""
+    elapsed = max(time.monotonic() - started_at, 1e-6)
+    rate = done / elapsed
+    left = (total - done) / rate if rate else 0
+    mb = 1024 * 1024
+    return f"{done / mb:.1f}/{total / mb:.1f} MB, {rate / mb:.1f} MB/s, ~{left:.0f}s left"
@@ -0,0 +1,189 @@
+import os, sys, time, wave, queue, hashlib, shutil, subprocess, threading, itertools
+import pyttsx3
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".echo_file_assistant", "tts_cache")
+STALE_SECONDS = 10
+
+# priorities - chhota number pehle bolta hai
+URGENT, NORMAL, BACKGROUND = 0, 1, 2
+
+def default_engine():
+    """pyttsx3 engine with the app's voice settings"""
+    engine = pyttsx3.init()
+    engine.setProperty('rate', 160)
+    engine.setProperty('volume', 1.0)
+    for voice in engine.getProperty('voices'):
+        if "en-us" in voice.id.lower() or "english" in voice.name.lower():
+            engine.setProperty('voice', voice.id)
+            break
+    return engine
+
+class _Player:
+    """Plays a cached WAV in a way that can be stopped halfway"""
+
+    def __init__(self):
+        self.process = None
+        self.command = None
+        if sys.platform == "win32":
+            import winsound
+            self.winsound = winsound
+        else:
+            self.winsound = None
+            for name, args in (("afplay", []), ("paplay", []), ("aplay", ["-q"])):
+                path = shutil.which(name)
+                if path:
+                    self.command = [path] + args
+                    break
+
+    @property
+    def available(self):
+        return self.winsound is not None or self.command is not None
+
+    def play(self, path, stop_event):
+        if self.winsound is not None:
+            self.winsound.PlaySound(path, self.winsound.SND_FILENAME | self.winsound.SND_ASYNC)
+            # PlaySound async hai, duration wav header se
+            end = time.monotonic() + _wav_seconds(path)
+            while time.monotonic() < end:
+                if stop_event.wait(0.05):
+                    self.winsound.PlaySound(None, self.winsound.SND_PURGE)
+                    return
+            return
+        self.process = subprocess.Popen(self.command + [path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while self.process.poll() is None:
+                if stop_event.wait(0.05):
+                    self.process.terminate()
+                    return
+        finally:
+            self.process = None
+
+def _wav_seconds(path):
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except Exception:
+        return 2.0
+
+class SpeechWorker:
+    """
+    One thread owns the TTS engine so callers never block on it. Messages
+    go through a priority queue; ones that waited longer than their max_age
+    are dropped, a newer message with the same key replaces a pending one,
+    and interrupt() cuts off whatever is playing. Fixed phrases are
+    synthesised once to WAV files and replayed from disk.
+    """
+
+    def __init__(self, engine_factory=default_engine, phrases=(), cache_dir=CACHE_DIR):
+        self.engine_factory = engine_factory
+        self.cache_dir = cache_dir
+        self.phrases = set(phrases)
+        self.queue = queue.PriorityQueue()
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.stop_playback = threading.Event()
+        self.engine = None
+        self.voice_key = ""
+        self.player = _Player()
+        self.stats = {"spoken": 0, "cached": 0, "dropped": 0, "interrupted": 0}
+        self.thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self.thread.start()
+        for phrase in self.phrases:
+            self.say(phrase, priority=BACKGROUND, max_age=None, prerender=True)
+
+    def say(self, text, priority=NORMAL, max_age=STALE_SECONDS, key=None, interrupt=False, prerender=False):
+        """Queue text and return at once; the returned Event is set when it was spoken or dropped"""
+        if not text:
+            return None
+        if interrupt:
+            self.interrupt()
+        done = threading.Event()
+        seq = next(self.seq)
+        if key is not None:
+            with self.lock:
+                self.latest[key] = seq
+        self.queue.put((priority, seq, time.monotonic(), max_age, key, text, prerender, done))
+        return done
+
+    def interrupt(self):
+        """Stop the current message and throw away everything still waiting"""
+        drained = []
+        while True:
+            try:
+                drained.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        for item in drained:
+            if item[6]:
+                # prerender kaam chalta rahe, woh bolta nahi hai
+                self.queue.put(item)
+            else:
+                self.stats["dropped"] += 1
+                item[7].set()
+        self.stop_playback.set()
+        self.stats["interrupted"] += 1
+
+    def cache_path(self, text):
+        digest = hashlib.sha1((self.voice_key + "\0" + text).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + ".wav")
+
+    def _ensure_engine(self):
+        if self.engine is None:
+            self.engine = self.engine_factory()
+            self.voice_key = f"{self.engine.getProperty('voice')}|{self.engine.getProperty('rate')}"
+            self.engine.connect("started-word", self._on_word)
+        return self.engine
+
+    def _on_word(self, name, location, length):
+        # pyttsx3 ka engine sirf isi callback se roka ja sakta hai
+        if self.stop_playback.is_set():
+            self.engine.stop()
+
+    def _render(self, text):
+        """Synthesise a phrase to the disk cache, returns the path or None"""
+        engine = self._ensure_engine()
+        path = self.cache_path(text)
+        if os.path.exists(path):
+            return path
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = path + ".tmp.wav"
+            engine.save_to_file(text, tmp)
+            engine.runAndWait()
+            if os.path.getsize(tmp) > 44:
+                os.replace(tmp, path)
+                return path
+        except Exception:
+            pass
+        return None
+
+    def _speak(self, text):
+        engine = self._ensure_engine()
+        path = self.cache_path(text) if text in self.phrases else None
+        if path and self.player.available and (os.path.exists(path) or self._render(text)):
+            self.player.play(path, self.stop_playback)
+            self.stats["cached"] += 1
+            return
+        engine.say(text)
+        engine.runAndWait()
+
+    def _run(self):
+        while True:
+            priority, seq, queued_at, max_age, key, text, prerender, done = self.queue.get()
+            try:
+                stale = max_age is not None and time.monotonic() - queued_at > max_age
+                with self.lock:
+                    superseded = key is not None and self.latest.get(key) != seq
+                if prerender:
+                    self._render(text)
+                elif stale or superseded:
+                    self.stats["dropped"] += 1
+                else:
+                    self.stop_playback.clear()
+                    self._speak(text)
+                    self.stats["spoken"] += 1
+            except Exception:
+                pass
+            finally:
+                done.set()